@@ -0,0 +1,151 @@
+"""
+Time-to-solution benchmark of the p-multiplier engines across bit widths.
+
+For every bit width a set of seeded semiprimes is drawn, and every engine is run on each of them for a number of
+trials until it factors the target or runs out of sweeps. A sweep is one JK_Multiplier.loop(), or one
+Onizawa_Multiplier.stochastic_iteration() / deterministic_iteration() over a batch of replicas, which solves the
+trial as soon as any replica is solved. Per width and engine the report has:
+
+    sweeps_per_second: throughput over every trial
+    success_probability: fraction of trials solved within the sweep budget
+    median/p90/p99 time and sweeps to solution over the solved trials
+    tts99_seconds: expected time to reach 99% success by restarting, from the mean trial time and success rate
+
+Usage:
+    python benchmark.py --widths 8,12,16 --trials 20 --max-sweeps 5000 --out bench.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# The multipliers live in subdirectories of the repository
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (os.path.join(_here, "jung_kim_multiplier"), os.path.join(_here, "onizawa_IM")) if path not in sys.path)
+
+from factor import bits_for
+from folded_onizawa_pmultiplier import Onizawa_Multiplier
+from jung_kim_pmultiplier import JK_Multiplier
+from semiprimes import generate_semiprime
+
+ENGINES = ("jk", "onizawa_stochastic", "onizawa_deterministic")
+
+
+def run_trial(engine: str, N: int, max_sweeps: int, seed: int, replicas: int = 64) -> dict:
+
+    """
+    Runs one engine on N until it is solved or max_sweeps have passed. The Onizawa engines advance replicas
+    independent chains per sweep, as factor does, and a trial is solved when any of them is.
+    """
+
+    n = bits_for(N)
+
+    if engine == "jk":
+        solver = JK_Multiplier(n, N, rng=seed)
+        step = solver.loop
+        solved = lambda found: found
+    elif engine in ("onizawa_stochastic", "onizawa_deterministic"):
+        solver = Onizawa_Multiplier(n, N, rng=seed, replicas=replicas)
+        step = solver.stochastic_iteration if engine == "onizawa_stochastic" else solver.deterministic_iteration
+        solved = lambda found: np.any(solver.solved())
+    else:
+        raise ValueError(f"engine={engine} must be one of {ENGINES}")
+
+    start = time.perf_counter()
+    for sweeps in range(1, max_sweeps + 1):
+        if solved(step()):
+            return {"solved": True, "sweeps": sweeps, "seconds": time.perf_counter() - start}
+
+    return {"solved": False, "sweeps": max_sweeps, "seconds": time.perf_counter() - start}
+
+
+def summarize(runs: list) -> dict:
+
+    seconds = np.array([r["seconds"] for r in runs])
+    sweeps = np.array([r["sweeps"] for r in runs])
+    solved = np.array([r["solved"] for r in runs])
+
+    p = float(np.mean(solved))
+    summary = {
+        "trials": len(runs),
+        "sweeps_per_second": float(np.sum(sweeps) / np.sum(seconds)),
+        "success_probability": p,
+    }
+
+    if p > 0:
+        for q in (50, 90, 99):
+            name = "median" if q == 50 else f"p{q}"
+            summary[f"{name}_seconds"] = float(np.percentile(seconds[solved], q))
+            summary[f"{name}_sweeps"] = float(np.percentile(sweeps[solved], q))
+
+        summary["tts99_seconds"] = (
+            float(np.mean(seconds)) if p >= 0.99 else float(np.mean(seconds) * np.log(0.01) / np.log(1 - p))
+        )
+
+    return summary
+
+
+def benchmark(widths, engines = ENGINES, targets: int = 4, trials: int = 5, max_sweeps: int = 10000,
+              seed: int = 0, replicas: int = 64) -> dict:
+
+    """
+    Runs every engine on `targets` seeded semiprimes per width, `trials` times each, with `replicas` chains per
+    Onizawa trial, and returns the summaries keyed by width and engine.
+    """
+
+    report = {}
+
+    for width in widths:
+
+        semiprimes = [generate_semiprime(width, seed=f"{seed}-{width}-{t}")[2] for t in range(targets)]
+        report[str(width)] = {"semiprimes": semiprimes}
+
+        for engine in engines:
+
+            trial_seeds = np.random.SeedSequence([seed, width, ENGINES.index(engine)]).generate_state(targets * trials)
+            runs = [
+                run_trial(engine, N, max_sweeps, int(trial_seeds[idx * trials + t]), replicas)
+                for idx, N in enumerate(semiprimes)
+                for t in range(trials)
+            ]
+            report[str(width)][engine] = summarize(runs)
+
+    return report
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Time-to-solution benchmark of the p-multipliers")
+    parser.add_argument("--widths", default="8,12,16", help="comma separated bit widths of the semiprimes")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma separated engines to run")
+    parser.add_argument("--targets", type=int, default=4, help="semiprimes per width")
+    parser.add_argument("--trials", type=int, default=5, help="trials per semiprime")
+    parser.add_argument("--max-sweeps", type=int, default=10000, help="sweep budget of every trial")
+    parser.add_argument("--replicas", type=int, default=64, help="chains per Onizawa trial")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the semiprimes and the trials")
+    parser.add_argument("--out", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = benchmark(
+        [int(w) for w in args.widths.split(",")],
+        tuple(args.engines.split(",")),
+        args.targets,
+        args.trials,
+        args.max_sweeps,
+        args.seed,
+        args.replicas,
+    )
+
+    if args.out is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
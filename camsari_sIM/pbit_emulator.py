@@ -0,0 +1,165 @@
+"""
+Bit-exact NumPy emulator of the lfsr5_galois and p_bit modules in pbit.v.
+
+Every array of P p-bits is emulated cycle for cycle, following the clocking of the RTL:
+
+1. On the rising edge each LFSR shifts left, feeding back lfsr[4] ^ lfsr[2], or holds its reset state 5'b00001
+   while reset is high. At the same edge shifted_A latches input_val scaled by bit_shift and saturated to 4 bits:
+   00 keeps it, 01 is >>> 1, 10 is <<< 1 and 11 is <<< 2.
+2. On the falling edge out latches shifted_A < rng_val, where rng_val is lfsr[3:0] read as a signed number.
+
+The LFSR width, its feedback taps, its reset state and the activation width are parameters, so the same code
+explores variants of the hardware, eg. a wider LFSR or per-p-bit seeds, at a fraction of the cost of RTL simulation.
+The defaults reproduce pbit.v, and verification/pbit_test.py checks the emulator against the testbench.
+"""
+
+import numpy as np
+
+# Shift applied by each bit_shift setting, negative shifts are arithmetic right shifts
+BIT_SHIFTS = np.array([0, -1, 1, 2])
+
+
+def to_signed(value: np.array, bits: int) -> np.array:
+
+    # Reads the low bits of value as a two's complement number
+    value = np.asarray(value, dtype=np.int64) & ((1 << bits) - 1)
+    return np.where(value >= 1 << (bits - 1), value - (1 << bits), value)
+
+
+def saturate(value: np.array, bits: int) -> np.array:
+
+    # Clips to the range of a signed number of the given width
+    return np.clip(value, -(1 << (bits - 1)), (1 << (bits - 1)) - 1)
+
+
+def shift_activation(input_val: np.array, bit_shift: np.array, bits: int = 4) -> np.array:
+
+    """
+    Scales signed activations by their bit_shift setting and saturates them, as the shifted_A case statement does.
+    The shift is done at full width before saturating, like the 32-bit comparisons in the RTL.
+    """
+
+    input_val = np.asarray(input_val, dtype=np.int64)
+    shift = BIT_SHIFTS[np.asarray(bit_shift)]
+
+    shifted = np.where(shift >= 0, input_val << np.maximum(shift, 0), input_val >> np.maximum(-shift, 0))
+
+    return saturate(shifted, bits)
+
+
+class LFSR:
+    def __init__(self, size: int = 1, width: int = 5, taps = (4, 2), seed = 1):
+
+        """
+        An array of size shift registers of the given width. Each clock shifts the register left by one and feeds
+        back the XOR of the tapped bits, which for the defaults is lfsr5_galois. seed is the reset state, either one
+        for every register or one per register.
+        """
+
+        self.size = size
+        self.width = width
+        self.taps = tuple(taps)
+        self.seed = np.broadcast_to(np.asarray(seed, dtype=np.int64), (size,)).copy()
+
+        if np.any(self.seed == 0):
+            raise ValueError("seed must be non-zero, the all-zero state never leaves itself")
+
+        # Next state of every possible state, so that a clock is one table lookup
+        states = np.arange(1 << width, dtype=np.int64)
+        feedback = np.zeros_like(states)
+        for tap in self.taps:
+            feedback ^= (states >> tap) & 1
+        self._next = ((states << 1) & ((1 << width) - 1)) | feedback
+
+        self.reset()
+
+    def reset(self):
+
+        self.state = self.seed.copy()
+
+    def clock(self, reset = False) -> np.array:
+
+        # Registers with reset high hold their reset state
+        self.state = np.where(reset, self.seed, self._next[self.state])
+
+        return self.state
+
+    def sequence(self, cycles: int, reset = None) -> np.array:
+
+        """
+        Clocks the registers cycles times and returns their states after every clock as a (cycles, size) array.
+        reset optionally gives the reset level of every cycle, broadcastable to (cycles, size).
+        """
+
+        reset = np.broadcast_to(False if reset is None else reset, (cycles, self.size))
+        out = np.empty((cycles, self.size), dtype=np.int64)
+
+        for t in range(cycles):
+            out[t] = self.clock(reset[t])
+
+        return out
+
+
+class PBit_Emulator:
+    def __init__(self, size: int = 1, bits: int = 4, lfsr_width: int = 5, lfsr_taps = (4, 2), lfsr_seed = 1):
+
+        """
+        An array of size p_bit modules, each with its own LFSR. bits is the width of input_val, shifted_A and
+        rng_val, which are the low bits of the LFSR.
+        """
+
+        if lfsr_width < bits:
+            raise ValueError(f"lfsr_width={lfsr_width} must be at least bits={bits}")
+
+        self.size = size
+        self.bits = bits
+        self.lfsr = LFSR(size, lfsr_width, lfsr_taps, lfsr_seed)
+
+        # Registers of the RTL, out is undefined until the first falling edge
+        self.shifted_A = np.zeros(size, dtype=np.int64)
+        self.out = np.zeros(size, dtype=np.uint8)
+
+    def reset(self):
+
+        self.lfsr.reset()
+
+    def rng_val(self, state: np.array = None) -> np.array:
+
+        # The low bits of the LFSR read as a signed number
+        return to_signed(self.lfsr.state if state is None else state, self.bits)
+
+    def clock(self, input_val, bit_shift = 0, reset = False) -> np.array:
+
+        """
+        One full clock cycle, the rising edge then the falling edge, returning out for every p-bit.
+        """
+
+        # Rising edge
+        self.lfsr.clock(reset)
+        self.shifted_A = shift_activation(np.broadcast_to(input_val, (self.size,)), bit_shift, self.bits)
+
+        # Falling edge
+        self.out = (self.shifted_A < self.rng_val()).astype(np.uint8)
+
+        return self.out
+
+    def run(self, input_val, bit_shift = 0, reset = None, cycles: int = None) -> np.array:
+
+        """
+        Runs many clock cycles at once and returns out for every cycle and p-bit as a (cycles, size) array.
+
+        input_val, bit_shift and reset are broadcastable to (cycles, size). The LFSRs do not depend on the inputs,
+        so their states are clocked first and every comparison is then done in a single vectorized step.
+        """
+
+        input_val = np.asarray(input_val)
+        cycles = cycles if cycles is not None else (len(input_val) if input_val.ndim == 2 else 1)
+
+        states = self.lfsr.sequence(cycles, reset)
+        shifted = shift_activation(np.broadcast_to(input_val, (cycles, self.size)), bit_shift, self.bits)
+
+        self.shifted_A = shifted[-1]
+        outputs = (shifted < self.rng_val(states)).astype(np.uint8)
+        self.out = outputs[-1]
+
+        return outputs
@@ -0,0 +1,411 @@
+"""
+Vectorized system-level emulator of the sparse p-bit fabric described by systems.v and rows.v.
+
+A Netlist is a list of gates from gates.v (COPY, NOT, AND, OR, HA and FA), each connecting its terminals to named
+nets. As in the *_system modules every gate owns one p_bit per terminal, and a terminal that shares its net with
+terminals of other gates fuses their p-bits into its activation:
+
+    unsafe_gate_fusion: act + (2 * b_node - 1), wrapping around in 4 bits
+    safe_gate_fusion: act + b_node, saturated to 4 bits
+
+where by default the carry outputs (C of HA, Cout of FA) fuse safely and every other terminal unsafely, as in
+systems.v. The gate activations are the hard coded 4-bit fixed point formulas of gates.v, and the p-bits are the
+LFSR-driven p_bit of pbit.v, see pbit_emulator.py. That p_bit outputs 1 when shifted_A < rng_val, so its
+probability of a 1 falls as its activation grows, the opposite of what the gate formulas assume. Passing invert=True
+feeds every comparator the bitwise NOT of shifted_A (-shifted_A - 1) instead, to explore the fabric with the
+comparator flipped.
+
+The p-bits run on a multi-phase clock: the p-bits of a gate with phase offset c use clk[(c + t) % phases] for
+terminal t, as in rows.v, and every phase latches its activations on its rising edge and updates its outputs on
+its falling edge half a period later. All replicas are emulated at once along a leading axis.
+
+Note that the RTL is a work in progress, so the wiring follows the port names: the systems pass {A, B, C} to the
+gates, which puts A on in[2] while the gates read A from in[0], and safe_gate_fusion drives out_reg rather than
+out. Here every terminal reads and drives the p-bit of its name and safe fusion behaves as its testbench expects.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# The p-bit emulator sits next to this module, wherever it is imported from
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (_here,) if path not in sys.path)
+
+from pbit_emulator import LFSR, saturate, shift_activation, to_signed
+
+# The gates of gates.v as linear forms over their terminals' spins s = 2 * out - 1, act = weights @ s + bias,
+# saturated to 4 bits (only the carry outputs can leave the range)
+GATES = {
+    "COPY": {"terminals": ("A", "B"), "weights": [[0, 1], [1, 0]], "bias": [0, 0]},
+    "NOT": {"terminals": ("A", "B"), "weights": [[0, -1], [-1, 0]], "bias": [0, 0]},
+    "AND": {
+        "terminals": ("A", "B", "C"),
+        "weights": [[0, -1, 2], [-1, 0, 2], [2, 2, 0]],
+        "bias": [1, 1, -2],
+    },
+    "OR": {
+        "terminals": ("A", "B", "C"),
+        "weights": [[0, 1, 2], [1, 0, 2], [2, 2, 0]],
+        "bias": [-1, -1, 2],
+    },
+    "HA": {
+        "terminals": ("A", "B", "S", "C"),
+        "weights": [[0, -1, 1, 2], [-1, 0, 1, 2], [-1, -1, 0, 2], [2, 2, 0, -2]],
+        "bias": [-1, -1, 1, 2],
+    },
+    "FA": {
+        "terminals": ("A", "B", "Cin", "S", "Cout"),
+        "weights": [
+            [0, -1, -1, 1, 2],
+            [-1, 0, -1, 1, 2],
+            [-1, -1, 0, 1, 2],
+            [1, 1, -1, 0, -2],
+            [2, 2, 2, -2, 0],
+        ],
+        "bias": [-1, -1, -1, 1, 2],
+    },
+}
+
+# Terminals that fuse through safe_gate_fusion in systems.v
+SAFE_TERMINALS = {("HA", "C"), ("FA", "Cout")}
+
+MAX_TERMINALS = max(len(g["terminals"]) for g in GATES.values())
+
+
+class Netlist:
+    def __init__(self):
+
+        # (kind, nets, phase offset) of every gate
+        self.gates = []
+
+        # Net name to the (gate, terminal) pairs on it, in the order they were connected
+        self.nets = {}
+
+        # Nets held at a fixed output, 0 or 1
+        self.clamps = {}
+
+    def add_gate(self, kind: str, nets, offset: int = 0) -> int:
+
+        """
+        Adds a gate of the given kind whose terminals, in the order of GATES[kind]["terminals"], connect to nets.
+        A net of None leaves that terminal unconnected. Returns the index of the gate.
+        """
+
+        if kind not in GATES:
+            raise ValueError(f"kind={kind} must be one of {list(GATES)}")
+
+        nets = tuple(nets)
+        if len(nets) != len(GATES[kind]["terminals"]):
+            raise ValueError(f"a {kind} gate has terminals {GATES[kind]['terminals']}, got {len(nets)} nets")
+
+        idx = len(self.gates)
+        self.gates.append((kind, nets, offset))
+
+        for t, net in enumerate(nets):
+            if net is not None:
+                self.nets.setdefault(net, []).append((idx, t))
+
+        return idx
+
+    def clamp(self, net, value: int):
+
+        if net not in self.nets:
+            raise KeyError(f"net {net} is not connected to any gate")
+
+        self.clamps[net] = int(value)
+
+    def unclamp(self, net):
+
+        self.clamps.pop(net, None)
+
+
+def multiplier_netlist(n: int):
+
+    """
+    Builds the sparse array multiplier of two n // 2 bit numbers into an n bit product, as started in rows.v: an
+    AND gate per partial product, then one row of adders per bit of b, each with a half adder in its first column
+    and full adders after, rippling the carry along the row.
+
+    Returns the netlist and the lists of nets of a, b and the product, least significant bit first.
+    """
+
+    if n % 2 or n < 4:
+        raise ValueError(f"n={n} must be even and at least 4")
+
+    m = n // 2
+    net = Netlist()
+    a = [f"a{j}" for j in range(m)]
+    b = [f"b{i}" for i in range(m)]
+
+    # Partial products, offset by their column like the systems of rows.v
+    pp = [[f"pp{i}_{j}" for j in range(m)] for i in range(m)]
+    for i in range(m):
+        for j in range(m):
+            net.add_gate("AND", (a[j], b[i], pp[i][j]), offset=i + j)
+
+    product = [pp[0][0]]
+    sums, top = pp[0], None
+
+    for i in range(1, m):
+
+        row, carry = [], None
+
+        for j in range(m):
+
+            # The partial product of this row and the running sum of the same weight
+            y = sums[j + 1] if j + 1 < m else top
+            s, c = f"s{i}_{j}", f"c{i}_{j}"
+
+            terms = [t for t in (pp[i][j], y, carry) if t is not None]
+            if len(terms) == 2:
+                net.add_gate("HA", (terms[0], terms[1], s, c), offset=i + j)
+            else:
+                net.add_gate("FA", (terms[0], terms[1], terms[2], s, c), offset=i + j)
+
+            row.append(s)
+            carry = c
+
+        product.append(row[0])
+        sums, top = row, carry
+
+    product += sums[1:] + [top]
+
+    return net, a, b, product
+
+
+class System_Emulator:
+    def __init__(self, netlist: Netlist, replicas: int = 1, phases: int = 5, bit_shift = 0, fusion: str = "rtl",
+                 bits: int = 4, lfsr_width: int = 5, lfsr_taps = (4, 2), lfsr_seed = None, invert: bool = False,
+                 rng = None):
+
+        """
+        Emulates every p-bit of the netlist for the given number of replicas.
+
+        fusion is "rtl" for the fusion of systems.v, or "safe" / "unsafe" to fuse every terminal that way.
+        bit_shift is the p_bit setting of every p-bit. lfsr_seed is the reset state of the LFSRs, by default a random
+        non-zero state per p-bit and replica drawn from rng, a np.random.Generator or a seed, so that the replicas
+        differ. Passing 1 reproduces the RTL reset, where every LFSR starts at 5'b00001.
+        """
+
+        if fusion not in ("rtl", "safe", "unsafe"):
+            raise ValueError(f"fusion={fusion} must be 'rtl', 'safe' or 'unsafe'")
+
+        self.netlist = netlist
+        self.replicas = replicas
+        self.phases = phases
+        self.bits = bits
+        self.invert = invert
+        self.rng = np.random.default_rng(rng)
+
+        # One p-bit per gate terminal, numbered gate by gate
+        sizes = [len(GATES[kind]["terminals"]) for kind, _, _ in netlist.gates]
+        first = np.concatenate(([0], np.cumsum(sizes)))[:-1].astype(int)
+        self.size = int(np.sum(sizes))
+
+        # Gate activations as a gather over the other terminals of the same gate
+        self._src = np.zeros((self.size, MAX_TERMINALS), dtype=int)
+        self._coef = np.zeros((self.size, MAX_TERMINALS), dtype=np.int64)
+        self._bias = np.zeros(self.size, dtype=np.int64)
+        self.phase = np.zeros(self.size, dtype=int)
+        self.safe = np.zeros(self.size, dtype=bool)
+
+        for g, (kind, _, offset) in enumerate(netlist.gates):
+            gate = GATES[kind]
+            T = len(gate["terminals"])
+            pbits = first[g] + np.arange(T)
+
+            self._src[pbits, :T] = pbits
+            self._coef[pbits, :T] = gate["weights"]
+            self._bias[pbits] = gate["bias"]
+            self.phase[pbits] = (offset + np.arange(T)) % phases
+
+            for t, name in enumerate(gate["terminals"]):
+                self.safe[pbits[t]] = fusion == "safe" or (fusion == "rtl" and (kind, name) in SAFE_TERMINALS)
+
+        # The p-bits of every net, and the other p-bits each one fuses
+        self.net_pbits = {
+            name: np.array([first[g] + t for g, t in members], dtype=int) for name, members in netlist.nets.items()
+        }
+        neighbors = [[] for _ in range(self.size)]
+        for members in self.net_pbits.values():
+            for p in members:
+                neighbors[p] = [q for q in members if q != p]
+
+        # Clamped p-bits hold their value and are never updated
+        self.clamped = np.zeros(self.size, dtype=bool)
+        self.clamp_values = np.zeros(self.size, dtype=np.uint8)
+        for name, value in netlist.clamps.items():
+            self.clamped[self.net_pbits[name]] = True
+            self.clamp_values[self.net_pbits[name]] = value
+
+        # Per phase, the free p-bits it clocks and how each of them fuses its neighbors
+        self._phases = []
+        for k in range(phases):
+            idx = np.nonzero((self.phase == k) & ~self.clamped)[0]
+            degree = np.array([len(neighbors[p]) for p in idx], dtype=int)
+
+            # Unsafe fusions wrap around, so a chain of them is a single sum over the neighbors wrapped once
+            unsafe = np.nonzero(~self.safe[idx] & (degree > 0))[0]
+            width = max(degree[unsafe], default=0)
+            unsafe_nbrs = np.zeros((len(unsafe), width), dtype=int)
+            unsafe_mask = np.zeros((len(unsafe), width), dtype=np.int64)
+            for r, row in enumerate(unsafe):
+                unsafe_nbrs[r, : degree[row]] = neighbors[idx[row]]
+                unsafe_mask[r, : degree[row]] = 1
+
+            # Safe fusions saturate at every step and are applied one neighbor at a time
+            safe_steps = []
+            safe = np.nonzero(self.safe[idx] & (degree > 0))[0]
+            for d in range(max(degree[safe], default=0)):
+                rows = safe[degree[safe] > d]
+                safe_steps.append((rows, np.array([neighbors[idx[r]][d] for r in rows], dtype=int)))
+
+            if lfsr_seed is None:
+                seed = self.rng.integers(1, 1 << lfsr_width, size=replicas * len(idx))
+            else:
+                seed = lfsr_seed
+
+            lfsr = LFSR(replicas * len(idx), lfsr_width, lfsr_taps, seed)
+            shift = np.broadcast_to(bit_shift, (self.size,))[idx]
+
+            self._phases.append({
+                "idx": idx,
+                "src": self._src[idx],
+                "coef": self._coef[idx],
+                "bias": self._bias[idx],
+                "unsafe": (unsafe, unsafe_nbrs, unsafe_mask, degree[unsafe]),
+                "safe_steps": safe_steps,
+                "lfsr": lfsr,
+                "bit_shift": shift,
+                "shifted_A": None,
+            })
+
+        # Rising edge of phase k at 2k and falling edge at 2k + phases, in units of half a phase, over one period
+        # Falling edges go first when both land on the same instant
+        events = [(2 * k, 1, k) for k in range(phases)] + [((2 * k + phases) % (2 * phases), 0, k) for k in range(phases)]
+        self._events = [(rising == 1, k) for _, rising, k in sorted(events)]
+
+        # Random initial outputs
+        self.out = self.rng.integers(0, 2, size=(replicas, self.size), dtype=np.uint8)
+        self.out[:, self.clamped] = self.clamp_values[self.clamped]
+        self.cycles = 0
+
+    def activations(self, k: int) -> np.array:
+
+        """
+        Returns the fused 4-bit activations of the free p-bits of phase k for every replica from the current outputs,
+        as a chain of *_gate_fusion modules after each gate would compute them.
+        """
+
+        phase = self._phases[k]
+
+        s = 2 * self.out[:, phase["src"]].astype(np.int64) - 1
+        act = saturate(np.sum(phase["coef"] * s, axis=-1) + phase["bias"], self.bits)
+
+        # act + sum(2 * b_node - 1), wrapped
+        rows, nbrs, mask, degree = phase["unsafe"]
+        if len(rows):
+            b = np.sum(self.out[:, nbrs] * mask, axis=-1)
+            act[:, rows] = to_signed(act[:, rows] + 2 * b - degree, self.bits)
+
+        # act + b_node, saturated after every neighbor
+        for rows, nbrs in phase["safe_steps"]:
+            act[:, rows] = saturate(act[:, rows] + self.out[:, nbrs], self.bits)
+
+        return act
+
+    def _rising_edge(self, k: int):
+
+        phase = self._phases[k]
+        phase["lfsr"].clock()
+        shifted = shift_activation(self.activations(k), phase["bit_shift"], self.bits)
+
+        phase["shifted_A"] = ~shifted if self.invert else shifted
+
+    def _falling_edge(self, k: int):
+
+        phase = self._phases[k]
+        rng_val = to_signed(phase["lfsr"].state.reshape(self.replicas, -1), self.bits)
+        self.out[:, phase["idx"]] = phase["shifted_A"] < rng_val
+
+    def step(self):
+
+        """
+        Emulates one clock period: every phase's rising and falling edge in the order they occur.
+        """
+
+        for rising, k in self._events:
+
+            if rising:
+                self._rising_edge(k)
+
+            # A falling edge before the phase's first rising edge has nothing latched yet
+            elif self._phases[k]["shifted_A"] is not None:
+                self._falling_edge(k)
+
+        self.cycles += 1
+
+    def values(self, nets) -> np.array:
+
+        """
+        Returns the outputs of the given nets for every replica as a (replicas, len(nets)) array, reading each net
+        from the p-bit of the first terminal connected to it.
+        """
+
+        return self.out[:, [self.net_pbits[name][0] for name in nets]]
+
+
+class Multiplier_Emulator(System_Emulator):
+    def __init__(self, n: int, output: int = 0, replicas: int = 1, **kwargs):
+
+        """
+        The sparse multiplier of multiplier_netlist with its product clamped to output, see System_Emulator for the
+        remaining arguments.
+        """
+
+        if output < 0 or output >= 2 ** n:
+            raise ValueError(f"output={output} must be between 0 and {2 ** n - 1}")
+
+        netlist, self.a_nets, self.b_nets, self.product_nets = multiplier_netlist(n)
+        for k, name in enumerate(self.product_nets):
+            netlist.clamp(name, (output >> k) & 1)
+
+        self.n = n
+        self.target = output
+
+        super().__init__(netlist, replicas, **kwargs)
+
+        self._weights = 2 ** np.arange(n // 2, dtype=np.int64)
+
+    def get_inputs(self):
+
+        A = self.values(self.a_nets).astype(np.int64) @ self._weights
+        B = self.values(self.b_nets).astype(np.int64) @ self._weights
+
+        return A, B
+
+    def solved(self) -> np.array:
+
+        # Per-replica mask of replicas whose inputs multiply out to the target
+        A, B = self.get_inputs()
+
+        return A * B == self.target
+
+    def run(self, cycles: int) -> np.array:
+
+        """
+        Steps up to cycles clock periods and returns the first cycle at which each replica was solved, -1 for
+        replicas that never were. Stops early once every replica has been solved.
+        """
+
+        first = -np.ones(self.replicas, dtype=int)
+
+        for _ in range(cycles):
+            self.step()
+            first[(first < 0) & self.solved()] = self.cycles
+            if np.all(first >= 0):
+                break
+
+        return first
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from pbit_emulator import LFSR, PBit_Emulator, saturate, shift_activation, to_signed
+
+
+def _lfsr5_galois(state):
+
+    # r_lfsr <= {r_lfsr[3:0], r_lfsr[4] ^ r_lfsr[2]}
+    return ((state << 1) & 0b11111) | (((state >> 4) ^ (state >> 2)) & 1)
+
+
+def test_lfsr_follows_the_rtl():
+
+    lfsr = LFSR()
+    state = 1
+    for cycle in range(100):
+        state = _lfsr5_galois(state)
+        assert lfsr.clock()[0] == state, f"cycle {cycle}"
+
+
+def test_lfsr_has_full_period():
+
+    # Every non-zero state is visited once before the sequence repeats
+    states = LFSR().sequence(31)[:, 0]
+    assert sorted(states) == list(range(1, 32))
+    assert states[-1] == 1
+
+
+def test_lfsr_reset_holds_the_seed():
+
+    lfsr = LFSR(size=3, seed=[1, 5, 17])
+    reset = np.zeros((6, 3), dtype=bool)
+    reset[2:4, 1] = True
+    states = lfsr.sequence(6, reset)
+
+    np.testing.assert_array_equal(states[2:4, 1], [5, 5])
+    assert states[4, 1] == _lfsr5_galois(5)
+    np.testing.assert_array_equal(states[:, 0], LFSR().sequence(6)[:, 0])
+
+    lfsr.reset()
+    np.testing.assert_array_equal(lfsr.state, [1, 5, 17])
+
+    with pytest.raises(ValueError):
+        LFSR(size=2, seed=[1, 0])
+
+
+def test_signed_arithmetic():
+
+    np.testing.assert_array_equal(to_signed(np.arange(16), 4), list(range(8)) + list(range(-8, 0)))
+    assert to_signed(0b10111, 4) == 7
+    np.testing.assert_array_equal(saturate([-20, -8, 0, 7, 20], 4), [-8, -8, 0, 7, 7])
+
+
+def test_shift_activation_matches_the_testbench():
+
+    # The expected transforms of verification/pbit_test.py
+    mm = lambda x: max(min(7, x), -8)
+    transforms = {0: mm, 1: lambda x: mm(x // 2), 2: lambda x: mm(x * 2), 3: lambda x: mm(x * 4)}
+
+    input_val, bit_shift = np.meshgrid(np.arange(-8, 8), np.arange(4), indexing="ij")
+    shifted = shift_activation(input_val, bit_shift)
+    expected = [[transforms[s](x) for s in range(4)] for x in range(-8, 8)]
+
+    np.testing.assert_array_equal(shifted, expected)
+
+
+def test_out_compares_the_activation_to_the_lfsr():
+
+    emulator = PBit_Emulator()
+    for state in LFSR().sequence(31)[:, 0]:
+        input_val = 3
+        out = emulator.clock(input_val)[0]
+        assert emulator.lfsr.state[0] == state
+        assert out == int(input_val < to_signed(state, 4))
+
+
+def test_run_matches_clock():
+
+    # The vectorized run gives the same outputs as clocking cycle by cycle, per-p-bit seeds and resets included
+    rng = np.random.default_rng(0)
+    cycles, size = 200, 4
+    input_val = rng.integers(-8, 8, size=(cycles, size))
+    bit_shift = rng.integers(4, size=(cycles, size))
+    reset = rng.random((cycles, size)) < 0.05
+
+    stepped, vectorized = (PBit_Emulator(size, lfsr_seed=[1, 2, 3, 31]) for _ in range(2))
+    expected = np.array([stepped.clock(input_val[t], bit_shift[t], reset[t]) for t in range(cycles)])
+    outputs = vectorized.run(input_val, bit_shift, reset)
+
+    np.testing.assert_array_equal(outputs, expected)
+    np.testing.assert_array_equal(vectorized.lfsr.state, stepped.lfsr.state)
+    np.testing.assert_array_equal(vectorized.shifted_A, stepped.shifted_A)
+    np.testing.assert_array_equal(vectorized.out, stepped.out)
+
+
+def test_lfsr_must_cover_the_activation():
+
+    with pytest.raises(ValueError):
+        PBit_Emulator(bits=6, lfsr_width=5)
+
+    # A wider variant still runs, with a longer period
+    states = PBit_Emulator(lfsr_width=7, lfsr_taps=(6, 5)).lfsr.sequence(127)[:, 0]
+    assert len(set(states)) == 127
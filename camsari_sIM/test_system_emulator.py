@@ -0,0 +1,179 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pbit_emulator import saturate, shift_activation, to_signed
+from system_emulator import GATES, Multiplier_Emulator, Netlist, System_Emulator, multiplier_netlist
+
+
+def _spins(values):
+    return [2 * v - 1 for v in values]
+
+
+@pytest.mark.parametrize("kind", ["COPY", "NOT", "AND", "OR"])
+def test_gate_forms_match_the_testbench(kind):
+
+    # The activations verification/gates_test.py expects of gates.v, from the spins of the other terminals
+    expected = {
+        "COPY": lambda A, B: (B, A),
+        "NOT": lambda A, B: (-B, -A),
+        "AND": lambda A, B, C: (-B + 2 * C + 1, -A + 2 * C + 1, 2 * A + 2 * B - 2),
+        "OR": lambda A, B, C: (B + 2 * C - 1, A + 2 * C - 1, 2 * A + 2 * B + 2),
+    }[kind]
+    gate = GATES[kind]
+
+    for values in itertools.product([0, 1], repeat=len(gate["terminals"])):
+        s = _spins(values)
+        act = np.array(gate["weights"]) @ s + gate["bias"]
+        assert tuple(act) == expected(*s)
+
+
+def _evaluate(netlist, a, b):
+
+    # Propagates the boolean values of a and b through the gates, which multiplier_netlist adds in order
+    values = {f"a{j}": (a >> j) & 1 for j in range(16)} | {f"b{i}": (b >> i) & 1 for i in range(16)}
+
+    for kind, nets, _ in netlist.gates:
+        x = [values[net] for net in nets[:-2 if kind in ("HA", "FA") else -1]]
+        if kind == "AND":
+            values[nets[2]] = x[0] & x[1]
+        else:
+            values[nets[-2]] = sum(x) & 1
+            values[nets[-1]] = sum(x) >> 1
+
+    return values
+
+
+@pytest.mark.parametrize("n", [4, 6, 8])
+def test_multiplier_netlist_multiplies(n):
+
+    m = n // 2
+    netlist, a, b, product = multiplier_netlist(n)
+    kinds = [kind for kind, _, _ in netlist.gates]
+
+    # m - 1 rows of m adders, each starting on a half adder, and the first row ends on one as it has no sum above
+    assert (kinds.count("AND"), kinds.count("HA"), kinds.count("FA")) == (m * m, m, m * (m - 2))
+    assert len(a) == len(b) == m and len(product) == n
+
+    for A, B in itertools.product(range(2 ** m), repeat=2):
+        values = _evaluate(netlist, A, B)
+        assert sum(values[net] << k for k, net in enumerate(product)) == A * B
+
+
+def _reference(emulator, netlist, out, cycles, fusion, bit_shift, invert, phases=5):
+
+    # One p-bit and one 5-bit LFSR at a time, straight from the netlist and the RTL
+    gates = [(kind, g, t) for g, (kind, _, _) in enumerate(netlist.gates) for t in range(len(GATES[kind]["terminals"]))]
+    first = {}
+    for p, (_, g, t) in enumerate(gates):
+        first.setdefault(g, p)
+
+    nets = {name: [first[g] + t for g, t in members] for name, members in netlist.nets.items()}
+    net_of = {p: name for name, members in nets.items() for p in members}
+    clamped = {p for name in netlist.clamps for p in nets[name]}
+    phase_of = [(netlist.gates[g][2] + t) % phases for _, g, t in gates]
+
+    # The LFSRs start from the emulator's random seeds, which are per phase in p-bit order
+    lfsr = {}
+    for k, phase in enumerate(emulator._phases):
+        seeds = phase["lfsr"].seed.reshape(emulator.replicas, -1)
+        for r in range(emulator.replicas):
+            for i, p in enumerate(phase["idx"]):
+                lfsr[r, p] = int(seeds[r, i])
+
+    # Rising edges at 2k and falling edges at 2k + phases half phases, falling first on a tie
+    rising = [(2 * k, 1, k) for k in range(phases)]
+    falling = [((2 * k + phases) % (2 * phases), 0, k) for k in range(phases)]
+    events = sorted(rising + falling)
+    out = out.astype(np.int64)
+    shifted_A = {}
+
+    for _ in range(cycles):
+        for _, rising, k in events:
+            free = [p for p in range(len(gates)) if phase_of[p] == k and p not in clamped]
+
+            for r in range(emulator.replicas):
+                if rising:
+                    latched = {}
+                    for p in free:
+                        kind, g, t = gates[p]
+                        terminal = GATES[kind]["terminals"][t]
+                        s = _spins(out[r, first[g] : first[g] + len(GATES[kind]["terminals"])])
+                        act = int(saturate(np.dot(GATES[kind]["weights"][t], s) + GATES[kind]["bias"][t], 4))
+
+                        rtl_safe = (kind, terminal) in (("HA", "C"), ("FA", "Cout"))
+                        safe = fusion == "safe" or (fusion == "rtl" and rtl_safe)
+                        for q in nets.get(net_of.get(p), []):
+                            if q != p and safe:
+                                act = int(saturate(act + out[r, q], 4))
+                            elif q != p:
+                                act = int(to_signed(act + 2 * out[r, q] - 1, 4))
+
+                        latched[p] = int(shift_activation(act, bit_shift, 4))
+                        latched[p] = ~latched[p] if invert else latched[p]
+                        state = lfsr[r, p]
+                        lfsr[r, p] = ((state << 1) & 0b11111) | (((state >> 4) ^ (state >> 2)) & 1)
+                    shifted_A[r, k] = latched
+
+                elif (r, k) in shifted_A:
+                    for p in free:
+                        out[r, p] = int(shifted_A[r, k][p] < to_signed(lfsr[r, p], 4))
+
+    return out
+
+
+@pytest.mark.parametrize("fusion, bit_shift, invert", [("rtl", 0, False), ("safe", 1, True), ("unsafe", 2, False)])
+def test_vectorized_step_matches_a_scalar_reference(fusion, bit_shift, invert):
+
+    netlist, _, _, product = multiplier_netlist(6)
+    for k, name in enumerate(product):
+        netlist.clamp(name, (15 >> k) & 1)
+
+    emulator = System_Emulator(netlist, replicas=3, fusion=fusion, bit_shift=bit_shift, invert=invert, rng=0)
+    expected = _reference(emulator, netlist, emulator.out, 6, fusion, bit_shift, invert)
+    assert np.any(expected != emulator.out)
+
+    for _ in range(6):
+        emulator.step()
+
+    np.testing.assert_array_equal(emulator.out, expected)
+
+
+def test_clamped_nets_hold():
+
+    emulator = Multiplier_Emulator(6, 15, replicas=8, rng=1)
+    product = emulator.values(emulator.product_nets)
+
+    for _ in range(20):
+        emulator.step()
+
+    np.testing.assert_array_equal(emulator.values(emulator.product_nets), product)
+    np.testing.assert_array_equal(product[0], [(15 >> k) & 1 for k in range(6)])
+
+
+def test_rtl_reset_seeds_every_lfsr_alike():
+
+    # With the RTL reset every replica draws the same numbers, so replicas that start alike stay alike
+    emulator = Multiplier_Emulator(6, 15, replicas=4, lfsr_seed=1, rng=2)
+    emulator.out[:] = emulator.out[0]
+    emulator.run(10)
+
+    assert np.all(emulator.out == emulator.out[0])
+
+
+def test_netlist_checks():
+
+    netlist = Netlist()
+    netlist.add_gate("AND", ("x", "y", "z"))
+
+    with pytest.raises(ValueError):
+        netlist.add_gate("XOR", ("x", "y", "z"))
+    with pytest.raises(ValueError):
+        netlist.add_gate("HA", ("x", "y", "z"))
+    with pytest.raises(KeyError):
+        netlist.clamp("w", 1)
+    with pytest.raises(ValueError):
+        System_Emulator(netlist, fusion="wired")
+    with pytest.raises(ValueError):
+        Multiplier_Emulator(4, 16)
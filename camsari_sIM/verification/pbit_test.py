@@ -1,7 +1,17 @@
+import os
+import sys
+
 import cocotb
-from cocotb.triggers import RisingEdge, FallingEdge, Timer
+import numpy as np
+from cocotb.triggers import RisingEdge, FallingEdge, ReadOnly, Timer
 from cocotb.regression import TestFactory
 
+# The emulators live in the directory above, wherever this is imported from
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (os.path.dirname(_here),) if path not in sys.path)
+
+from pbit_emulator import PBit_Emulator
+
 
 @cocotb.test()
 async def test_tb_p_bit(dut):
@@ -46,4 +56,38 @@ async def test_tb_p_bit(dut):
     dut.reset = 1
     await RisingEdge(dut.clk)
     assert dut.out.value.integer == 0, "Reset test failed"
-    dut.reset = 0
\ No newline at end of file
+    dut.reset = 0
+
+
+@cocotb.test()
+async def test_p_bit_emulator(dut):
+    """Check the NumPy emulator against the p_bit module cycle for cycle."""
+
+    emulator = PBit_Emulator()
+    rng = np.random.default_rng(0)
+
+    # Hold reset over a rising edge so that the LFSR sits at its reset state
+    dut.reset = 1
+    await RisingEdge(dut.clk)
+    dut.reset = 0
+    emulator.reset()
+
+    for cycle in range(4 * 31):
+
+        input_val = int(rng.integers(-8, 8))
+        bit_shift = int(rng.integers(4))
+
+        dut.input_val = input_val
+        dut.bit_shift = bit_shift
+        expected_output = int(emulator.clock(input_val, bit_shift)[0])
+
+        await RisingEdge(dut.clk)
+        await FallingEdge(dut.clk)
+        await ReadOnly()
+
+        assert (
+            dut.UUT.lfsr.value.integer == emulator.lfsr.state[0]
+        ), f"LFSR mismatch at cycle {cycle}: {dut.UUT.lfsr.value.integer} != {emulator.lfsr.state[0]}"
+        assert (
+            dut.out.value.integer == expected_output
+        ), f"p-bit emulator mismatch at cycle {cycle} for input_val={input_val}, bit_shift={bit_shift}"
@@ -0,0 +1,258 @@
+"""
+Parallel, cached regression runner for the camsari_sIM cocotb testbenches, built on cocotb-test.
+
+Every testbench is compiled once into a build directory keyed by a hash of its Verilog sources, including every file
+they pull in through `include, so rebuilding only happens when the RTL actually changes and switching back to an
+earlier revision finds its build still in the cache. The test modules are then parsed for their @cocotb.test
+coroutines, and every test runs as its own simulation against the cached build, fanned out over a process pool.
+Wall time and the status of every test are reported as they finish, followed by a summary.
+
+Usage:
+    python regression.py                       # every test of every testbench
+    python regression.py --benches pbit -j 4   # only the p_bit testbench, on 4 processes
+    python regression.py --tests test_p_AND_gate,test_p_OR_gate --json report.json
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.etree import ElementTree as ET
+
+VERIFICATION_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(VERIFICATION_DIR, "sim_build")
+
+# The testbenches of the Makefile
+TESTBENCHES = {
+    "pbit": {"toplevel": "tb_p_bit", "module": "pbit_test", "verilog_sources": ["pbit_tb.v"]},
+    "gates": {"toplevel": "tb_gates", "module": "gates_test", "verilog_sources": ["gates_tb.v"]},
+}
+
+_INCLUDE = re.compile(r'^\s*`include\s+"([^"]+)"', re.MULTILINE)
+
+
+def source_closure(sources: list) -> list:
+
+    """
+    Returns the absolute paths of the given Verilog sources and every file they `include, recursively, with include
+    paths resolved relative to the including file as Icarus does.
+    """
+
+    seen, stack = [], [os.path.abspath(s) for s in sources]
+
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+
+        with open(path) as f:
+            text = f.read()
+        stack.extend(os.path.normpath(os.path.join(os.path.dirname(path), inc)) for inc in _INCLUDE.findall(text))
+
+    return seen
+
+
+def build_key(bench: dict, simulator: str) -> str:
+
+    """
+    Hashes the contents of every source of a testbench together with its toplevel and the simulator. Relative
+    sources are resolved against this directory, wherever the runner is started from.
+    """
+
+    digest = hashlib.sha256(f"{simulator}:{bench['toplevel']}".encode())
+    sources = [os.path.join(VERIFICATION_DIR, s) for s in bench["verilog_sources"]]
+
+    for path in sorted(source_closure(sources)):
+        digest.update(os.path.relpath(path, VERIFICATION_DIR).encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+
+    return digest.hexdigest()[:16]
+
+
+def discover_tests(module: str) -> list:
+
+    """
+    Returns the names of the @cocotb.test coroutines of a test module, without importing it.
+    """
+
+    with open(os.path.join(VERIFICATION_DIR, module + ".py")) as f:
+        tree = ast.parse(f.read())
+
+    def is_test(decorator):
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        return isinstance(target, ast.Attribute) and target.attr == "test"
+
+    return [
+        node.name
+        for node in tree.body
+        if isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef)) and any(map(is_test, node.decorator_list))
+    ]
+
+
+def _run_kwargs(name: str, simulator: str) -> dict:
+
+    bench = TESTBENCHES[name]
+
+    return {
+        "simulator": simulator,
+        "toplevel": bench["toplevel"],
+        "module": bench["module"],
+        "verilog_sources": [os.path.join(VERIFICATION_DIR, s) for s in bench["verilog_sources"]],
+        "python_search": [VERIFICATION_DIR],
+        "sim_build": os.path.join(CACHE_DIR, f"{name}-{build_key(bench, simulator)}"),
+    }
+
+
+def compile_bench(name: str, simulator: str = "icarus") -> dict:
+
+    """
+    Compiles a testbench into its cache directory unless a build for the same sources is already there.
+    """
+
+    from cocotb_test.simulator import run
+
+    kwargs = _run_kwargs(name, simulator)
+    marker = os.path.join(kwargs["sim_build"], ".built")
+    start = time.perf_counter()
+
+    if os.path.exists(marker):
+        return {"bench": name, "cached": True, "seconds": 0.0, "sim_build": kwargs["sim_build"]}
+
+    run(compile_only=True, **kwargs)
+
+    # The build is keyed by content, so mark it fresh for cocotb-test's modification time check
+    for entry in os.scandir(kwargs["sim_build"]):
+        os.utime(entry.path)
+    open(marker, "w").close()
+
+    return {"bench": name, "cached": False, "seconds": time.perf_counter() - start, "sim_build": kwargs["sim_build"]}
+
+
+def run_test(name: str, test: str, simulator: str = "icarus") -> dict:
+
+    """
+    Runs a single test of a testbench against its cached build and returns its status and timings.
+    """
+
+    from cocotb_test.simulator import run
+
+    kwargs = _run_kwargs(name, simulator)
+
+    # Every test gets its own working directory so that parallel simulations do not share files
+    work_dir = os.path.join(kwargs["sim_build"], test)
+    os.makedirs(work_dir, exist_ok=True)
+
+    result = {"bench": name, "test": test, "passed": False, "message": None}
+    start = time.perf_counter()
+
+    try:
+        results_file = run(testcase=test, work_dir=work_dir, **kwargs)
+        result["passed"] = True
+
+        # Simulated time as reported by cocotb
+        for case in ET.parse(results_file).iter("testcase"):
+            if case.get("name") == test:
+                result["sim_time_ns"] = float(case.get("sim_time_ns", "nan"))
+
+    except (SystemExit, Exception) as e:
+        result["message"] = str(e)
+
+    result["seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def regression(benches = None, tests = None, jobs: int = None, simulator: str = "icarus", log = print) -> dict:
+
+    """
+    Compiles every selected testbench, then runs each of their tests, optionally only those named in tests, across
+    jobs processes and returns the per-test results with a summary.
+    """
+
+    benches = list(TESTBENCHES) if benches is None else list(benches)
+    start = time.perf_counter()
+
+    builds, results = [], []
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+
+        # Compile the testbenches side by side
+        compiled = []
+        for future in as_completed([pool.submit(compile_bench, b, simulator) for b in benches]):
+            try:
+                build = future.result()
+            except (SystemExit, Exception) as e:
+                log(f"build failed: {e}")
+                continue
+            builds.append(build)
+            compiled.append(build["bench"])
+            log(f"{build['bench']:>8} {'cached' if build['cached'] else 'built':>9} {build['seconds']:8.2f}s")
+
+        # Then fan every test out
+        futures = [
+            pool.submit(run_test, b, t, simulator)
+            for b in compiled
+            for t in discover_tests(TESTBENCHES[b]["module"])
+            if tests is None or t in tests
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "PASS" if result["passed"] else "FAIL"
+            log(f"{result['bench']:>8} {status:>9} {result['seconds']:8.2f}s  {result['test']}")
+
+    failed = [r for r in results if not r["passed"]]
+    summary = {
+        "tests": len(results),
+        "passed": len(results) - len(failed),
+        "failed": len(failed),
+        "builds": builds,
+        "wall_seconds": time.perf_counter() - start,
+        "test_seconds": sum(r["seconds"] for r in results),
+    }
+
+    return {"results": sorted(results, key=lambda r: (r["bench"], r["test"])), "summary": summary}
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Run the camsari_sIM cocotb regression in parallel")
+    parser.add_argument("--benches", default=",".join(TESTBENCHES), help="comma separated testbenches to run")
+    parser.add_argument("--tests", default=None, help="comma separated test names, defaults to all of them")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes, defaults to the core count")
+    parser.add_argument("--sim", default="icarus", help="simulator for cocotb-test")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    report = regression(
+        args.benches.split(","),
+        None if args.tests is None else set(args.tests.split(",")),
+        args.jobs,
+        args.sim,
+    )
+
+    summary = report["summary"]
+    print(
+        f"{summary['passed']}/{summary['tests']} passed in {summary['wall_seconds']:.2f}s "
+        f"({summary['test_seconds']:.2f}s of simulation across workers)"
+    )
+    for r in report["results"]:
+        if not r["passed"]:
+            print(f"FAILED {r['bench']}::{r['test']}: {r['message']}")
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(1 if summary["failed"] or not summary["tests"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+
+import regression
+
+
+def _write(path, text):
+
+    with open(path, "w") as f:
+        f.write(text)
+
+    return str(path)
+
+
+def test_source_closure_follows_includes(tmp_path):
+
+    (tmp_path / "rtl").mkdir()
+    _write(tmp_path / "rtl" / "leaf.v", "module leaf; endmodule\n")
+    _write(tmp_path / "rtl" / "mid.v", '`include "leaf.v"\n')
+    top = _write(tmp_path / "top.v", '`include "rtl/mid.v"\n  `include "rtl/leaf.v"\n')
+
+    # Includes resolve against the including file and every file is listed once
+    closure = regression.source_closure([top])
+    assert sorted(closure) == sorted(str(tmp_path / p) for p in ("top.v", "rtl/mid.v", "rtl/leaf.v"))
+
+
+def test_build_key_tracks_included_sources(tmp_path):
+
+    leaf = _write(tmp_path / "leaf.v", "module leaf; endmodule\n")
+    bench = {"toplevel": "top", "verilog_sources": [_write(tmp_path / "top.v", '`include "leaf.v"\n')]}
+    key = regression.build_key(bench, "icarus")
+
+    assert regression.build_key(bench, "icarus") == key
+    assert regression.build_key(bench, "verilator") != key
+    assert regression.build_key(dict(bench, toplevel="other"), "icarus") != key
+
+    # Touching a file without changing it keeps the build, editing an included file invalidates it
+    os.utime(leaf)
+    assert regression.build_key(bench, "icarus") == key
+    _write(leaf, "module leaf(input a); endmodule\n")
+    assert regression.build_key(bench, "icarus") != key
+
+
+def test_build_keys_of_the_testbenches():
+
+    # The keys hash pbit.v and gates.v through the testbench includes, so the two benches differ
+    keys = {name: regression.build_key(bench, "icarus") for name, bench in regression.TESTBENCHES.items()}
+    assert len(set(keys.values())) == len(keys)
+    assert all(len(key) == 16 for key in keys.values())
+
+    closure = regression.source_closure([os.path.join(regression.VERIFICATION_DIR, "pbit_tb.v")])
+    assert len(closure) > 1
+
+
+def test_discover_tests():
+
+    assert regression.discover_tests("pbit_test") == ["test_tb_p_bit", "test_p_bit_emulator"]
+
+    gates = regression.discover_tests("gates_test")
+    assert {"test_safe_gate_fusion", "test_p_AND_gate", "test_p_FA_gate"} <= set(gates)
+    assert "TestFactory" not in gates
+
+
+def _fake_compile(name, simulator = "icarus"):
+    return {"bench": name, "cached": True, "seconds": 0.0, "sim_build": name}
+
+
+def _fake_run(name, test, simulator = "icarus"):
+    return {"bench": name, "test": test, "passed": test != "test_p_OR_gate", "message": None, "seconds": 1.0}
+
+
+def test_regression_fans_out_and_summarizes(monkeypatch):
+
+    # The simulator is replaced so that only the scheduling and the report are exercised, the workers are forked
+    monkeypatch.setattr(regression, "compile_bench", _fake_compile)
+    monkeypatch.setattr(regression, "run_test", _fake_run)
+
+    lines = []
+    tests = {"test_p_AND_gate", "test_p_OR_gate", "test_missing"}
+    report = regression.regression(["gates"], tests, 2, log=lines.append)
+
+    assert [r["test"] for r in report["results"]] == ["test_p_AND_gate", "test_p_OR_gate"]
+    summary = report["summary"]
+    assert (summary["tests"], summary["passed"], summary["failed"], summary["test_seconds"]) == (2, 1, 1, 2.0)
+    assert len(lines) == 3 and "cached" in lines[0]
+
+    report = regression.regression(None, None, 2, log=lines.append)
+    modules = [bench["module"] for bench in regression.TESTBENCHES.values()]
+    assert report["summary"]["tests"] == sum(len(regression.discover_tests(m)) for m in modules)
@@ -0,0 +1,56 @@
+"""
+Checkpoints of the solver state, so that long factoring runs survive a crash or a preemption.
+
+A checkpoint is a single compressed .npz file. Every solver describes its state as a flat dict of arrays and plain
+values, the arrays being stored as they are and everything else, eg. the state of a np.random.Generator, as one JSON
+document inside the same file. Files are written next to their destination and renamed over it, so an interrupted
+save leaves the previous checkpoint in place.
+
+The solver is rebuilt from its constructor arguments and then restored, which checks that the checkpoint belongs to a
+solver of the same kind and shape. A restored solver continues bit for bit as the saved one would have, including the
+uniform numbers left over in its Uniform_Buffer, which are drawn again rather than stored.
+"""
+
+import json
+import os
+
+import numpy as np
+
+# Key of the JSON document holding the values that are not arrays
+_META = "__meta__"
+
+
+def save(path: str, state: dict):
+
+    """
+    Writes a flat dict of arrays and JSON serializable values to path, atomically.
+    """
+
+    arrays = {k: v for k, v in state.items() if isinstance(v, np.ndarray)}
+    meta = {k: v for k, v in state.items() if not isinstance(v, np.ndarray)}
+
+    if _META in arrays:
+        raise ValueError(f"{_META} is a reserved key")
+
+    # Write then rename, np.savez appends .npz to names without it
+    temp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(temp, **arrays, **{_META: np.array(json.dumps(meta))})
+    os.replace(temp, path)
+
+
+def load(path: str) -> dict:
+
+    # The flat dict written by save
+    with np.load(path, allow_pickle=False) as f:
+        state = {k: f[k] for k in f.files if k != _META}
+        state.update(json.loads(str(f[_META])))
+
+    return state
+
+
+def check(state: dict, **expected):
+
+    # Raises if the checkpoint was taken from a different solver
+    for key, value in expected.items():
+        if state.get(key) != value:
+            raise ValueError(f"checkpoint has {key}={state.get(key)!r}, expected {value!r}")
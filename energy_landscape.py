@@ -0,0 +1,203 @@
+"""
+This module verifies Ising gate Hamiltonians exactly, by enumerating their whole energy landscape.
+
+Rather than sampling a gate a few hundred times, the energy
+
+    H(m) = - sum_i h_i m_i - sum_{i<j} J_ij m_i m_j
+
+of every one of its 2^n spin states is computed, in blocks of consecutive states that are turned into a spin matrix
+and multiplied by J. A single streaming pass over the blocks gathers:
+
+1. The ground energy, every ground state and the gap to the first excited level.
+2. The spurious minima, states that no single spin flip can lower but which sit above the ground energy, where a
+   p-bit network gets stuck.
+3. The exact Boltzmann marginals P(m_i = +1) at a pseudotemperature T, accumulated relative to the lowest energy
+   seen so far so that they never overflow.
+4. Given the truth table of the gate, whether its ground states are exactly the valid ones, the energy margin of
+   the invalid ones and the exact probability of sampling a valid state.
+
+States are numbered as in gate_synthesis, the first p-bit being the most significant, so truth tables from there
+apply directly, with any auxiliary p-bits after the visible ones. Blocks keep memory flat, so gates of up to ~24
+spins take a few seconds.
+"""
+
+import numpy as np
+
+# Default number of states per block
+CHUNK_SIZE = 2 ** 16
+
+
+def spins(start: int, stop: int, n: int) -> np.array:
+
+    # The states start to stop of n spins as a float matrix of -1/+1
+    bits = (np.arange(start, stop)[:, None] >> np.arange(n - 1, -1, -1)) & 1
+    return 2.0 * bits - 1.0
+
+
+def energy_blocks(J: np.array, h: np.array, chunk_size: int = CHUNK_SIZE):
+
+    """
+    Yields (start, states, energies, flips) for consecutive blocks of the 2^n states, where flips[s, i] is the energy
+    change of flipping spin i of state s.
+    """
+
+    J = np.asarray(J, dtype=float)
+    h = np.asarray(h, dtype=float).reshape(-1)
+    n = len(h)
+
+    if J.shape != (n, n):
+        raise ValueError(f"J has shape {J.shape}, expected ({n}, {n})")
+    if not np.allclose(J, J.T) or np.any(np.diag(J) != 0):
+        raise ValueError("J must be symmetric with a zero diagonal")
+
+    for start in range(0, 2 ** n, chunk_size):
+        states = spins(start, min(start + chunk_size, 2 ** n), n)
+        coupling = states @ J
+
+        # H(m) = - sum_i m_i (h_i + (J m)_i / 2), and a flip of m_i changes it by 2 m_i (h_i + (J m)_i)
+        energies = -np.einsum("si,si->s", states, 0.5 * coupling + h)
+        yield start, states, energies, 2 * states * (coupling + h)
+
+
+def verify(
+    J: np.array,
+    h: np.array,
+    valid: np.array = None,
+    T: float = 1.0,
+    chunk_size: int = CHUNK_SIZE,
+    tol: float = 1e-9,
+    max_minima: int = 64,
+) -> dict:
+
+    """
+    Enumerates the energy landscape of a gate in one pass.
+
+    Args:
+        J: Symmetric coupling matrix with a zero diagonal.
+        h: Biases.
+        valid: Optional boolean truth table over the 2^v visible states, the remaining n - v p-bits being auxiliary.
+        T: Pseudotemperature of the marginals, or None to skip them.
+        chunk_size: States per block, rounded up to cover whole visible states.
+        tol: Energies closer than tol are the same level.
+        max_minima: Number of the lowest spurious minima to report.
+
+    Returns:
+        A dict with the ground_energy, the ground_states and their degeneracy, the gap to the first excited level,
+        the number of spurious_minima and the lowest_spurious_minima as (state, energy) pairs. With a temperature,
+        the marginals P(m_i = +1). With a truth table, the visible missing_states and invalid_ground_states, the
+        valid_gap of the lowest invalid state, whether the gate is correct and, with a temperature, p_valid.
+    """
+
+    h = np.asarray(h, dtype=float).reshape(-1)
+    n = len(h)
+
+    if valid is not None:
+        valid = np.asarray(valid, dtype=bool)
+        visible = int(len(valid)).bit_length() - 1
+        if len(valid) != 2 ** visible or visible > n:
+            raise ValueError(f"truth table has {len(valid)} rows, which does not match {n} p-bits")
+        block = 2 ** (n - visible)
+        chunk_size = -(-chunk_size // block) * block
+        visible_min = np.full(len(valid), np.inf)
+        visible_weight = np.zeros(len(valid))
+
+    ground, excited = np.inf, np.inf
+    ground_states, ground_local = [], []
+    minima_count, minima = 0, (np.empty(0, dtype=np.int64), np.empty(0))
+
+    # Boltzmann weights are kept relative to the running ground energy
+    Z, magnetization = 0.0, np.zeros(n)
+
+    for start, states, energies, flips in energy_blocks(J, h, chunk_size):
+
+        index = np.arange(start, start + len(energies))
+        low = energies.min()
+        above = energies[energies > low + tol]
+
+        # Local minima under single flips, ground states among them
+        local = np.all(flips >= -tol, axis=1)
+
+        if low < ground - tol:
+
+            # A new ground level demotes the old ground states that are local minima to spurious minima
+            if ground_states:
+                old = np.concatenate(ground_states)[np.concatenate(ground_local)]
+                minima_count += len(old)
+                minima = (np.concatenate([minima[0], old]), np.concatenate([minima[1], np.full(len(old), ground)]))
+
+            if T is not None and np.isfinite(ground):
+                scale = np.exp(-(ground - low) / T)
+                Z *= scale
+                magnetization *= scale
+                if valid is not None:
+                    visible_weight *= scale
+
+            excited = min(ground, excited, above.min(initial=np.inf))
+            at_ground = energies <= low + tol
+            ground, ground_states, ground_local = low, [index[at_ground]], [local[at_ground]]
+
+        elif low <= ground + tol:
+            at_ground = energies <= ground + tol
+            ground_states.append(index[at_ground])
+            ground_local.append(local[at_ground])
+            excited = min(excited, above.min(initial=np.inf))
+
+        else:
+            excited = min(excited, low)
+
+        # Spurious minima of this block, keeping only the lowest few
+        spurious = local & (energies > ground + tol)
+        minima_count += int(np.count_nonzero(spurious))
+        idx = np.concatenate([minima[0], index[spurious]])
+        energy = np.concatenate([minima[1], energies[spurious]])
+        keep = np.argsort(energy, kind="stable")[:max_minima]
+        minima = (idx[keep], energy[keep])
+
+        if T is not None:
+            weights = np.exp(-(energies - ground) / T)
+            Z += weights.sum()
+            magnetization += weights @ states
+
+        if valid is not None:
+            rows = slice(start // block, (start + len(energies)) // block)
+            visible_min[rows] = energies.reshape(-1, block).min(axis=1)
+            if T is not None:
+                visible_weight[rows] = weights.reshape(-1, block).sum(axis=1)
+
+    ground_states = np.concatenate(ground_states)
+
+    report = {
+        "spins": n,
+        "ground_energy": float(ground),
+        "ground_states": ground_states,
+        "degeneracy": len(ground_states),
+        "gap": float(excited - ground),
+        "spurious_minima": minima_count,
+        "lowest_spurious_minima": list(zip(minima[0].tolist(), minima[1].tolist())),
+    }
+
+    if T is not None:
+        report["marginals"] = 0.5 * (1 + magnetization / Z)
+
+    if valid is not None:
+        at_ground = visible_min <= ground + tol
+        report["missing_states"] = np.nonzero(valid & ~at_ground)[0]
+        report["invalid_ground_states"] = np.nonzero(~valid & at_ground)[0]
+        report["valid_gap"] = float(visible_min[~valid].min(initial=np.inf) - ground)
+        report["correct"] = bool(np.all(at_ground == valid))
+        if T is not None:
+            report["p_valid"] = float(visible_weight[valid].sum() / Z)
+
+    return report
+
+
+def is_valid_gate(J: np.array, h: np.array, valid: np.array, gap: float = 1, chunk_size: int = CHUNK_SIZE) -> bool:
+
+    """
+    Whether the ground states of J and h are exactly the valid states of the truth table, with every invalid state at
+    least gap above them.
+    """
+
+    report = verify(J, h, valid, T=None, chunk_size=chunk_size, max_minima=0)
+
+    return report["correct"] and report["valid_gap"] >= gap - 1e-9
@@ -0,0 +1,301 @@
+"""
+Portfolio factoring driver over the JK and Onizawa p-multipliers.
+
+A pool of worker processes each runs an independently seeded solver with its own settings, ie. JK populations with
+different sieves and annealing schedules, and Onizawa replicas at different pseudotemperatures, or Onizawa replicas
+swapping pseudotemperatures along a parallel tempering ladder with the "tempering" engine. The first worker to find a
+factor reports back and the rest are cancelled, which puts every core to use and, over repeated trials, gives
+time-to-solution statistics rather than a single lucky run.
+
+With a checkpoint directory, every worker saves its solver there every --checkpoint-every iterations and resumes from
+its checkpoint when it is started again with the same seed, so a run on preemptible machines picks up where it
+stopped and continues exactly as it would have without the interruption.
+
+Usage:
+    python factor.py 3233 --workers 8 --trials 10
+    python factor.py 3233 --seed 1 --checkpoint-dir checkpoints
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+import traceback
+import warnings
+
+import numpy as np
+
+# The multipliers live in subdirectories of the repository
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (os.path.join(_here, "jung_kim_multiplier"), os.path.join(_here, "onizawa_IM")) if path not in sys.path)
+
+from annealing import Adaptive_Schedule, Cyclic_Schedule, Geometric_Schedule, Linear_Schedule
+from folded_onizawa_pmultiplier import Onizawa_Multiplier
+from jung_kim_pmultiplier import JK_Population
+
+# Seconds between checks that the workers are still alive
+POLL = 0.1
+
+# Annealing schedules of the JK workers by name, the ramps restart every 2000 loops
+SCHEDULES = {
+    "cyclic": Cyclic_Schedule,
+    "geometric": lambda: Geometric_Schedule(steps=1000, period=2000),
+    "linear": lambda: Linear_Schedule(steps=1000, period=2000),
+    "adaptive": Adaptive_Schedule,
+}
+
+
+def bits_for(N: int) -> int:
+
+    # Both multipliers take an even number of product bits
+    n = max(N.bit_length(), 4)
+    return n + n % 2
+
+
+def portfolio(workers: int, engines = ("jk", "onizawa"), seed: int = None) -> list:
+
+    """
+    Builds one solver configuration per worker, cycling through the engines and spreading their settings,
+    each with its own seed drawn from a common SeedSequence.
+    """
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    temperatures = np.geomspace(0.2, 1.0, max(1, -(-workers // len(engines))))
+    sieves = [(3, 5, 7), (3, 5, 7, 11), (3, 5, 7, 11, 13)]
+    schedules = list(SCHEDULES)
+
+    configs = []
+    for idx in range(workers):
+        engine = engines[idx % len(engines)]
+        rank = idx // len(engines)
+        config = {"engine": engine, "seed": int(seeds[idx].generate_state(1)[0])}
+
+        if engine == "jk":
+            config.update({
+                "population": 256,
+                "sieve_primes": sieves[rank % len(sieves)],
+                "schedule": schedules[rank % len(schedules)],
+            })
+        elif engine == "onizawa":
+            config.update({"replicas": 256, "pseudotemperature": float(temperatures[rank % len(temperatures)])})
+        elif engine == "tempering":
+            config.update({"replicas": 256, "pseudotemperatures": np.geomspace(0.1, 1.0, 16).tolist()})
+        else:
+            raise ValueError(f"engine={engine} must be 'jk', 'onizawa' or 'tempering'")
+
+        configs.append(config)
+
+    return configs
+
+
+def checkpoint_path(checkpoint_dir: str, N: int, config: dict) -> str:
+
+    # One file per target and worker, the seed tells the workers of a portfolio apart
+    return os.path.join(checkpoint_dir, f"{N}-{config['engine']}-{config['seed']}.npz")
+
+
+def solve(N: int, config: dict, stop = None, max_iterations: int = None, checkpoint: str = None,
+          checkpoint_every: int = 1000) -> dict:
+
+    """
+    Runs a single solver until it finds a factor, stop is set or max_iterations is reached.
+    Returns the result, or None if no factor was found.
+
+    With a checkpoint path the solver resumes from it when it exists, and saves to it every checkpoint_every
+    iterations and when it is stopped.
+    """
+
+    n = bits_for(N)
+    start = time.perf_counter()
+    iterations = 0
+    elapsed = 0.0
+
+    if config["engine"] == "jk":
+        solver = JK_Population(
+            n, N, P=config["population"], sieve_primes=config["sieve_primes"], rng=config["seed"],
+            schedule=SCHEDULES[config.get("schedule", "cyclic")](),
+        )
+    elif config["engine"] == "tempering":
+        solver = Onizawa_Multiplier(
+            n, N, pseudotemperatures=config["pseudotemperatures"], replicas=config["replicas"], rng=config["seed"]
+        )
+    else:
+        solver = Onizawa_Multiplier(
+            n, N, pseudotemperature=config["pseudotemperature"], replicas=config["replicas"], rng=config["seed"]
+        )
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        progress = solver.load_checkpoint(checkpoint)
+        iterations, elapsed = progress["iterations"], progress["seconds"]
+
+    def save():
+        if checkpoint is not None:
+            solver.save_checkpoint(checkpoint, iterations=iterations, seconds=elapsed + time.perf_counter() - start)
+
+    while max_iterations is None or iterations < max_iterations:
+
+        if stop is not None and stop.is_set():
+            save()
+            return None
+
+        if iterations and iterations % checkpoint_every == 0:
+            save()
+
+        iterations += 1
+
+        if config["engine"] == "jk":
+            if solver.loop():
+                found = solver.factor
+                break
+        else:
+            if config["engine"] == "tempering":
+                solver.tempering_iteration()
+            else:
+                solver.stochastic_iteration()
+            solved = solver.solved()
+            if np.any(solved):
+                A, B = solver.get_inputs()
+                winner = int(np.argmax(solved))
+                found = int(A[winner]) if A[winner] > 1 else int(B[winner])
+                break
+    else:
+        save()
+        return None
+
+    return {
+        "N": N,
+        "factor": found,
+        "cofactor": N // found,
+        "config": config,
+        "iterations": iterations,
+        "seconds": elapsed + time.perf_counter() - start,
+    }
+
+
+def _worker(N, config, stop, results, max_iterations, checkpoint, checkpoint_every):
+
+    # Report exactly once whatever happens, so that factor never waits on a worker that failed
+    result = None
+    try:
+        result = solve(N, config, stop, max_iterations, checkpoint, checkpoint_every)
+    except Exception:
+        result = {"N": N, "config": config, "error": traceback.format_exc()}
+    finally:
+        results.put(result)
+
+
+def factor(N: int, workers: int = None, engines = ("jk", "onizawa"), timeout: float = None,
+           seed: int = None, max_iterations: int = None, checkpoint_dir: str = None,
+           checkpoint_every: int = 1000) -> dict:
+
+    """
+    Races a portfolio of solvers over worker processes and returns the first factor found, together with the
+    winning configuration and the wall time, or None if every worker gave up, failed or the timeout passed. Workers
+    that fail are reported with a warning. Without a timeout or max_iterations the race only ends with a factor.
+
+    With a checkpoint_dir every worker checkpoints its solver there, see solve. Resuming takes the same seed, since
+    the seed picks the configurations and so the names of the checkpoints.
+    """
+
+    workers = workers or os.cpu_count()
+    configs = portfolio(workers, engines, seed)
+
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    ctx = mp.get_context()
+    stop = ctx.Event()
+    results = ctx.Queue()
+
+    start = time.perf_counter()
+    procs = [
+        ctx.Process(
+            target=_worker,
+            args=(
+                N, c, stop, results, max_iterations,
+                None if checkpoint_dir is None else checkpoint_path(checkpoint_dir, N, c), checkpoint_every,
+            ),
+            daemon=True,
+        )
+        for c in configs
+    ]
+    for p in procs:
+        p.start()
+
+    result = None
+    pending = len(procs)
+    try:
+        while pending and result is None:
+            remaining = None if timeout is None else timeout - (time.perf_counter() - start)
+            if remaining is not None and remaining <= 0:
+                break
+
+            # Workers flush their result before they exit, so once none is alive the queue holds all there will be
+            alive = any(p.is_alive() for p in procs)
+            try:
+                result = results.get(timeout=POLL if remaining is None else min(POLL, remaining))
+            except queue.Empty:
+                if not alive:
+                    break
+                continue
+            pending -= 1
+
+            if result is not None and "error" in result:
+                warnings.warn(f"worker {result['config']} failed:\n{result['error']}")
+                result = None
+    finally:
+        # Cancel the rest of the portfolio
+        stop.set()
+        for p in procs:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+
+    if result is not None:
+        result["wall_seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Factor a semiprime with a portfolio of p-multipliers")
+    parser.add_argument("N", type=int, help="semiprime to factor")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the core count")
+    parser.add_argument("--engines", default="jk,onizawa", help="comma separated engines to race")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a trial gives up")
+    parser.add_argument("--trials", type=int, default=1, help="independent races for time-to-solution statistics")
+    parser.add_argument("--max-iterations", type=int, default=None, help="iterations before a worker gives up")
+    parser.add_argument("--seed", type=int, default=None, help="base seed of the portfolio")
+    parser.add_argument("--checkpoint-dir", default=None, help="checkpoint the workers here, and resume from it")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="iterations between checkpoints")
+    args = parser.parse_args()
+
+    engines = tuple(args.engines.split(","))
+    seeds = np.random.SeedSequence(args.seed).generate_state(args.trials)
+
+    runs = []
+    for trial in range(args.trials):
+        result = factor(
+            args.N, args.workers, engines, args.timeout, int(seeds[trial]), args.max_iterations,
+            checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every,
+        )
+        runs.append(result)
+        print(json.dumps(result))
+
+    times = np.array([r["wall_seconds"] for r in runs if r is not None])
+    summary = {"trials": args.trials, "solved": len(times)}
+    if len(times):
+        summary.update({
+            "median_seconds": float(np.median(times)),
+            "p90_seconds": float(np.percentile(times, 90)),
+            "max_seconds": float(np.max(times)),
+        })
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+This module packages the linear programs of the Onizawa gate design notebook as a reusable, cached gate library.
+
+A gate on n p-bits is a truth table over all 2^n spin states: the states that are valid must all sit at the minimum
+energy E and every other state at least gap above it, where the energy of a state m is
+
+    H(m) = - sum_i h_i m_i - sum_{i<j} J_ij m_i m_j.
+
+As in the notebook, J and h are bounded integers found by an integer program with pulp. Rather than building one
+pulp expression per state in nested Python loops, the spin states and their pairwise products are enumerated as a
+single NumPy matrix, so each constraint is read straight off one of its rows.
+
+Truth tables that no Hamiltonian on the visible p-bits can realize, such as XOR, take auxiliary p-bits. Each valid
+visible state then only needs one auxiliary assignment at the minimum energy, which is picked by a binary
+variable per assignment, while all the others stay at or above it.
+
+Solving is slow, since the counters grow exponentially, so every result is written to an on-disk cache keyed by a hash
+of the truth table and the problem settings, and independent gates are solved side by side in a process pool. A gate
+is never solved twice.
+
+Attributes:
+    CACHE_DIR (str): Default directory of the cached gates.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gate_cache")
+
+
+def spin_states(n: int) -> np.array:
+
+    """
+    Returns all 2^n spin states as a (2^n, n) int8 array of -1/+1, with state i spelling i in binary, most significant
+    p-bit first, as the notebook does.
+    """
+
+    bits = (np.arange(2 ** n)[:, None] >> np.arange(n - 1, -1, -1)) & 1
+    return (2 * bits - 1).astype(np.int8)
+
+
+def truth_table(function, inputs: int, outputs: int) -> np.array:
+
+    """
+    Returns the valid states of a gate as a boolean mask over spin_states(inputs + outputs), with the inputs first.
+
+    function is vectorized: it maps a (states, inputs) boolean array to a (states, outputs) boolean array.
+    """
+
+    bits = spin_states(inputs + outputs) > 0
+    expected = np.asarray(function(bits[:, :inputs])).reshape(len(bits), outputs)
+
+    return np.all(bits[:, inputs:] == expected, axis=1)
+
+
+def AND(k: int = 2) -> np.array:
+    return truth_table(lambda x: np.all(x, axis=1), k, 1)
+
+
+def OR(k: int = 2) -> np.array:
+    return truth_table(lambda x: np.any(x, axis=1), k, 1)
+
+
+def XOR(k: int = 2) -> np.array:
+    return truth_table(lambda x: np.sum(x, axis=1) % 2 == 1, k, 1)
+
+
+def half_adder() -> np.array:
+
+    # A, B, S, C
+    return truth_table(lambda x: np.stack([x[:, 0] ^ x[:, 1], x[:, 0] & x[:, 1]], axis=1), 2, 2)
+
+
+def full_adder() -> np.array:
+
+    # A, B, Cin, S, Cout
+    return truth_table(lambda x: _binary(np.sum(x, axis=1), 2), 3, 2)
+
+
+def counter(k: int) -> np.array:
+
+    """
+    k inputs followed by the binary count of the inputs that are on, least significant bit first, as in the notebook.
+    """
+
+    outputs = max(1, int(k).bit_length())
+    return truth_table(lambda x: _binary(np.sum(x, axis=1), outputs), k, outputs)
+
+
+def _binary(values: np.array, bits: int) -> np.array:
+
+    # Bits of values, least significant first
+    return (values[:, None] >> np.arange(bits)) & 1 == 1
+
+
+def energies(J: np.array, h: np.array, states: np.array) -> np.array:
+
+    # H(m) for every row of states
+    states = states.astype(float)
+    return -states @ h - 0.5 * np.sum((states @ J) * states, axis=1)
+
+
+def cache_key(valid: np.array, aux: int = 0, gap: float = 1, bound: int = 100) -> str:
+
+    """
+    Hashes a truth table together with the problem settings that change its solution.
+    """
+
+    valid = np.asarray(valid, dtype=bool)
+    digest = hashlib.sha256(f"{len(valid)}:{aux}:{gap}:{bound}:".encode())
+    digest.update(np.packbits(valid).tobytes())
+
+    return digest.hexdigest()
+
+
+def synthesize(valid: np.array, aux: int = 0, gap: float = 1, bound: int = 100, time_limit: float = None) -> dict:
+
+    """
+    Solves for the couplings and biases of a truth table, uncached.
+
+    Args:
+        valid: Boolean mask over spin_states(n) of the valid visible states.
+        aux: Number of auxiliary p-bits, appended after the visible ones.
+        gap: Minimum energy of the invalid states above the ground state.
+        bound: Bound on the magnitude of every coupling and bias.
+        time_limit: Optional time limit of the solver, in seconds.
+
+    Returns:
+        A dict with the status of the solver and, when it found a solution, J, h and the ground energy E.
+    """
+
+    import pulp
+
+    valid = np.asarray(valid, dtype=bool)
+    visible = int(len(valid)).bit_length() - 1
+    n = visible + aux
+
+    if len(valid) != 2 ** visible:
+        raise ValueError(f"truth table has {len(valid)} rows, which is not a power of two")
+    if not np.any(valid):
+        raise ValueError("truth table has no valid states")
+
+    # Rows of [m_i, m_i m_j] for every state, visible bits varying slowest so that each visible state is a block
+    states = spin_states(n)
+    i, j = np.triu_indices(n, 1)
+    coefs = -np.concatenate([states, states[:, i] * states[:, j]], axis=1).astype(int)
+    valid = np.repeat(valid, 2 ** aux)
+
+    problem = pulp.LpProblem("gate", pulp.LpMinimize)
+
+    E = pulp.LpVariable("E", -1e12, 1e12, "Continuous")
+    h = [pulp.LpVariable(f"h_{a}", -bound, bound, "Integer") for a in range(n)]
+    J = [pulp.LpVariable(f"J_{a}_{b}", -bound, bound, "Integer") for a, b in zip(i, j)]
+    variables = h + J
+
+    def H(row):
+        return pulp.LpAffineExpression(zip(variables, row.tolist()))
+
+    # Largest possible energy difference between two states, for the auxiliary selections
+    big_m = 2 * bound * len(variables) + gap
+
+    for row, ok in zip(coefs, valid):
+        problem += H(row) - E >= (0 if ok else gap)
+
+    if aux == 0:
+        for row in coefs[valid]:
+            problem += H(row) - E <= 0
+    else:
+        for block in np.nonzero(valid[:: 2 ** aux])[0]:
+            rows = range(block * 2 ** aux, (block + 1) * 2 ** aux)
+            chosen = [pulp.LpVariable(f"z_{s}", cat="Binary") for s in rows]
+            for s, z in zip(rows, chosen):
+                problem += H(coefs[s]) - E <= big_m * (1 - z)
+            problem += pulp.lpSum(chosen) >= 1
+
+    # Same objective as the notebook, the summed energy of all states less E
+    problem += H(np.sum(coefs, axis=0)) - E
+
+    problem.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+    status = pulp.LpStatus[problem.status]
+
+    if status != "Optimal":
+        return {"status": status}
+
+    couplings = np.zeros((n, n), dtype=int)
+    couplings[i, j] = [round(v.varValue) for v in J]
+    couplings += couplings.T
+
+    return {
+        "status": status,
+        "J": couplings,
+        "h": np.array([round(v.varValue) for v in h], dtype=int),
+        "E": float(E.varValue),
+    }
+
+
+def _load(path: str) -> dict:
+
+    with open(path) as f:
+        result = json.load(f)
+
+    for name in ("J", "h"):
+        if name in result:
+            result[name] = np.array(result[name], dtype=int)
+
+    return result
+
+
+def _store(path: str, result: dict):
+
+    # Write then rename, so that concurrent writers never leave a partial file behind
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w") as f:
+        json.dump({k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in result.items()}, f)
+    os.replace(temp, path)
+
+
+def _solve(valid: np.array, aux: int, gap: float, bound: int, time_limit: float, path: str) -> dict:
+
+    result = synthesize(valid, aux, gap, bound, time_limit)
+
+    # Only conclusive results are cached, a timed out solve should be retried with more time
+    if result["status"] in ("Optimal", "Infeasible"):
+        _store(path, result)
+
+    return result
+
+
+def synthesize_all(
+    gates: dict,
+    aux: int = 0,
+    gap: float = 1,
+    bound: int = 100,
+    time_limit: float = None,
+    processes: int = None,
+    cache_dir: str = CACHE_DIR,
+) -> dict:
+
+    """
+    Synthesizes many gates, given as a dict of name to truth table, or to a (truth table, aux) pair to override aux
+    per gate. Cached gates are loaded from cache_dir and the rest are solved in a pool of processes, then cached.
+
+    Returns a dict of name to the result of synthesize.
+    """
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    results, pending = {}, {}
+
+    for name, gate in gates.items():
+        valid, gate_aux = gate if isinstance(gate, tuple) else (gate, aux)
+        path = os.path.join(cache_dir, cache_key(valid, gate_aux, gap, bound) + ".json")
+
+        if os.path.exists(path):
+            results[name] = _load(path)
+        else:
+            pending[name] = (np.asarray(valid, dtype=bool), gate_aux, gap, bound, time_limit, path)
+
+    if len(pending) == 1:
+        name, args = pending.popitem()
+        results[name] = _solve(*args)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {name: pool.submit(_solve, *args) for name, args in pending.items()}
+            results.update({name: future.result() for name, future in futures.items()})
+
+    return {name: results[name] for name in gates}
+
+
+def gate(valid: np.array, aux: int = 0, gap: float = 1, bound: int = 100, cache_dir: str = CACHE_DIR) -> dict:
+
+    """
+    Synthesizes a single gate through the cache, eg. gate(AND()) or gate(XOR(), aux=1).
+    """
+
+    return synthesize_all({"gate": valid}, aux, gap, bound, cache_dir=cache_dir)["gate"]
+
+
+def library(cache_dir: str = CACHE_DIR, processes: int = None) -> dict:
+
+    """
+    The gates of the p-multipliers and notebooks: AND, OR, half and full adders and counters of 2 to 8 inputs.
+    """
+
+    gates = {"AND": AND(), "OR": OR(), "OR3": OR(3), "HA": half_adder(), "FA": full_adder()}
+    gates.update({f"counter{k}": counter(k) for k in range(2, 9)})
+
+    return synthesize_all(gates, processes=processes, cache_dir=cache_dir)
+
+
+if __name__ == "__main__":
+
+    for name, result in library().items():
+        print(name, result["status"])
+        if result["status"] == "Optimal":
+            print("J =", result["J"].tolist())
+            print("h =", result["h"].tolist())
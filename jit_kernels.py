@@ -0,0 +1,182 @@
+"""
+Optional compiled sweep kernels for the p-multipliers.
+
+Even vectorized, a sweep of a p-multiplier at n <= 32 is a few dozen NumPy calls on arrays of tens of elements, so its
+time goes into call overhead rather than arithmetic. The kernels below run many whole sweeps per call, on the random
+numbers of those sweeps handed in up front from the solver's Uniform_Buffer, taken with draw_steps exactly as the NumPy
+path draws them, and are compiled with Numba when it is installed. Without Numba they are still plain Python, which is
+correct but slow, so the multipliers keep their NumPy code path unless Numba is there.
+
+Kernels:
+    onizawa_sweeps: Onizawa_Multiplier.stochastic_iteration, with the local fields as a precompiled sparse affine map
+        of the flat state.
+    jk_loops: JK_Multiplier.loop / JK_Population.loop with the paper's cyclic annealing, on uint64 integer lanes.
+"""
+
+import warnings
+
+import numpy as np
+
+try:
+    import numba
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+def jit(function):
+
+    # Compile with Numba when it is available, otherwise leave the function as Python
+    return numba.njit(cache=True)(function) if HAVE_NUMBA else function
+
+
+BACKENDS = ("numpy", "numba")
+
+
+def select_backend(backend: str) -> str:
+
+    """
+    Checks a backend name, falling back to "numpy" with a warning when "numba" is asked for but not installed.
+    """
+
+    if backend not in BACKENDS:
+        raise ValueError(f"backend={backend!r} must be one of {BACKENDS}")
+
+    if backend == "numba" and not HAVE_NUMBA:
+        warnings.warn("numba is not installed, falling back to the numpy backend")
+        return "numpy"
+
+    return backend
+
+
+@jit
+def onizawa_sweeps(state, T, indptr, indices, data, offset, u_base, u_stride, dst_ptr, dst, uniforms, a_bits,
+                   b_bits, target):
+
+    """
+    Runs len(uniforms) stochastic iterations of a batch of Onizawa multipliers in place.
+
+    state is the (replicas, state size) flat state and T the pseudotemperature of every replica. The fields of the
+    parameters are indptr/indices/data, a CSR matrix over the state, plus offset. Parameter p of replica r samples
+    against uniforms[sweep, u_base[p] + r * u_stride[p]] and writes the state cells dst[dst_ptr[p]:dst_ptr[p + 1]].
+    a and b are the state cells a_bits and b_bits. When target is non-negative the kernel stops after the first
+    sweep at which a replica multiplies out to it.
+
+    Returns the number of sweeps that were run.
+    """
+
+    replicas = state.shape[0]
+    params = len(offset)
+    new = np.empty(params)
+
+    for sweep in range(uniforms.shape[0]):
+
+        for r in range(replicas):
+
+            # Synchronous update, every field is read before any p-bit is written
+            for p in range(params):
+                field = offset[p]
+                for k in range(indptr[p], indptr[p + 1]):
+                    field += data[k] * state[r, indices[k]]
+                new[p] = np.sign(uniforms[sweep, u_base[p] + r * u_stride[p]] + np.tanh(T[r] * field))
+
+            for p in range(params):
+                for k in range(dst_ptr[p], dst_ptr[p + 1]):
+                    state[r, dst[k]] = new[p]
+
+        if target >= 0:
+            for r in range(replicas):
+                A, B = 0, 0
+                for k in range(len(a_bits)):
+                    if state[r, a_bits[k]] > 0:
+                        A += 1 << k
+                    if state[r, b_bits[k]] > 0:
+                        B += 1 << k
+                if A * B == target:
+                    return sweep + 1
+
+    return uniforms.shape[0]
+
+
+@jit
+def jk_loops(X, Y, N, count, is_X, const_1, const_2, period, low, high, modulus, down, up, limit, uniforms,
+             test_next):
+
+    """
+    Runs len(uniforms) loops of a population of JK candidates in place, with the cyclic annealing schedule.
+
+    X and Y are uint64 lanes of the odd candidates, uniforms[loop] holds the (candidates, bits) uniform numbers of a
+    loop and the sieve is given by its modulus and its down and up distance tables. With test_next the test that
+    starts the following loop is run as well, since a loop that finds a factor stops before it takes any numbers.
+
+    Returns the loops that were run, the count and is_X flag after them, and the index of the winning candidate and
+    its factor, or -1 and 0 when no candidate divides N.
+    """
+
+    P, bits = uniforms.shape[1], uniforms.shape[2]
+    I = np.empty(bits)
+
+    for loop in range(uniforms.shape[0] + test_next):
+
+        count += 1
+
+        # Test
+        for c in range(P):
+            if X[c] > 1 and N % X[c] == 0:
+                return loop + 1, count, is_X, c, X[c]
+            if Y[c] > 1 and N % Y[c] == 0:
+                return loop + 1, count, is_X, c, Y[c]
+
+        # The following loop is run by the next call
+        if loop == uniforms.shape[0]:
+            count -= 1
+            break
+
+        for c in range(P):
+
+            fixed = Y[c] if is_X else X[c]
+            moving = X[c] if is_X else Y[c]
+
+            # N - X * Y as a float, without wrapping the unsigned lanes
+            XY = X[c] * Y[c]
+            residual = float(N - XY) if XY <= N else -float(XY - N)
+            square = float(fixed * fixed)
+
+            # Activation, annealed on the Y half of the loop
+            for k in range(bits):
+                bit = (moving >> np.uint64(k + 1)) & np.uint64(1)
+                I[k] = const_1[k] * residual * float(fixed)
+                I[k] += (2.0 * float(bit) - 1.0) * const_2[k] * square
+                if not is_X:
+                    I[k] *= low if count % period == 0 else high
+
+            # Sample the bits of the candidate
+            value = np.uint64(0)
+            for k in range(bits):
+                if uniforms[loop, c, k] < 1.0 / (1.0 + np.exp(-1.0 * I[k])):
+                    value |= np.uint64(1) << np.uint64(k)
+            value = np.uint64(2) * value + np.uint64(1)
+
+            # Snap to the wheel, going down on ties and staying within [1, limit]
+            r = value % modulus
+            d, u = np.uint64(down[r]), np.uint64(up[r])
+            go_up = u < d
+            if go_up and value + u > limit:
+                go_up = False
+            if value <= d:
+                go_up = True
+            value = value + u if go_up else value - d
+
+            # Candidates of 1 are kept as 3, as the bit conversion does
+            if value <= 1:
+                value = np.uint64(3)
+
+            if is_X:
+                X[c] = value
+            else:
+                Y[c] = value
+
+        is_X = not is_X
+
+    return uniforms.shape[0], count, is_X, -1, np.uint64(0)
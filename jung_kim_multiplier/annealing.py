@@ -0,0 +1,171 @@
+"""
+Annealing schedules for the JK p-multipliers.
+
+Probabilistic annealing scales the activation I of every p-bit before it is sampled. A schedule decides that scale
+from the loop count and the residual N - X * Y of each candidate, so that trying a schedule is a constructor
+argument rather than an edit of JK_Multiplier.loop. As in the paper, the scale is applied when Y is updated.
+
+Every schedule is called as schedule(count, residual), where residual is a float for a JK_Multiplier and one float per
+candidate for a JK_Population, and returns a scale of the same shape. Parameters may be arrays with one value per
+candidate, and Mixed_Schedule hands slices of a population to different schedules, so a whole sweep of schedules
+runs as one population in a single process.
+
+Schedules:
+    Cyclic_Schedule: The paper's schedule, a low scale once every period loops and a high one otherwise.
+    Geometric_Schedule: Geometric ramp from start to end over steps loops, optionally restarting every period loops.
+    Linear_Schedule: Linear ramp from start to end over steps loops, optionally restarting every period loops.
+    Adaptive_Schedule: Per candidate, grows the scale while the residual improves and drops it after patience loops
+        without improvement.
+    Mixed_Schedule: Different schedules over consecutive slices of a population.
+
+Schedules with state of their own, ie. Adaptive_Schedule, carry it through checkpoints with get_state and set_state.
+"""
+
+import abc
+
+import numpy as np
+
+
+class Schedule(abc.ABC):
+
+    @abc.abstractmethod
+    def __call__(self, count: int, residual):
+
+        """
+        Scale of the activations at loop count, of the shape of residual.
+        """
+
+    def get_state(self, prefix: str = "schedule/") -> dict:
+
+        # Only the adaptive schedules change as they run
+        return {}
+
+    def set_state(self, state: dict, prefix: str = "schedule/"):
+        pass
+
+    def _shaped(self, scale, residual):
+
+        # Broadcast a scalar or per-candidate scale to the shape of the residual
+        return np.broadcast_to(scale, np.shape(residual)) if np.ndim(residual) else scale
+
+
+class Cyclic_Schedule(Schedule):
+    def __init__(self, period: int = 8, low: float = 2.0 ** -4, high: float = 2.0 ** 1):
+
+        self.period = period
+        self.low = low
+        self.high = high
+
+    def __call__(self, count, residual):
+
+        return self._shaped(self.low if count % self.period == 0 else self.high, residual)
+
+
+class Geometric_Schedule(Schedule):
+    def __init__(self, start: float = 2.0 ** -4, end: float = 2.0 ** 1, steps: int = 1000, period: int = None):
+
+        self.start = np.asarray(start, dtype=float)
+        self.end = np.asarray(end, dtype=float)
+        self.steps = np.asarray(steps)
+        self.period = period
+
+    def _progress(self, count):
+
+        # Fraction of the ramp done, restarting every period loops
+        t = count if self.period is None else count % self.period
+        return np.minimum(t / self.steps, 1.0)
+
+    def __call__(self, count, residual):
+        return self._shaped(self.start * (self.end / self.start) ** self._progress(count), residual)
+
+
+class Linear_Schedule(Geometric_Schedule):
+
+    def __call__(self, count, residual):
+        return self._shaped(self.start + (self.end - self.start) * self._progress(count), residual)
+
+
+class Adaptive_Schedule(Schedule):
+    def __init__(self, low: float = 2.0 ** -4, high: float = 2.0 ** 1, growth: float = 2.0 ** 0.5,
+                 patience: int = 16):
+
+        self.low = low
+        self.high = high
+        self.growth = growth
+        self.patience = patience
+
+        # Per candidate state, sized on the first call
+        self.scale = None
+
+    def __call__(self, count, residual):
+
+        residual = np.abs(np.asarray(residual, dtype=float))
+
+        if self.scale is None:
+            self.scale = np.full(residual.shape, self.low)
+            self.best = residual.copy()
+            self.stall = np.zeros(residual.shape, dtype=int)
+
+        improved = residual < self.best
+        self.best = np.minimum(self.best, residual)
+        self.stall = np.where(improved, 0, self.stall + 1)
+
+        # Sharpen towards the high scale, and reheat candidates that have stopped improving
+        reheat = self.stall >= self.patience
+        self.scale = np.where(reheat, self.low, np.minimum(self.scale * self.growth, self.high))
+        self.stall[reheat] = 0
+
+        return self.scale if self.scale.ndim else float(self.scale)
+
+    def get_state(self, prefix: str = "schedule/") -> dict:
+
+        if self.scale is None:
+            return {}
+
+        return {prefix + "scale": self.scale, prefix + "best": self.best, prefix + "stall": self.stall}
+
+    def set_state(self, state: dict, prefix: str = "schedule/"):
+
+        if prefix + "scale" in state:
+            self.scale = np.array(state[prefix + "scale"])
+            self.best = np.array(state[prefix + "best"])
+            self.stall = np.array(state[prefix + "stall"])
+
+
+class Mixed_Schedule(Schedule):
+    def __init__(self, schedules: list, sizes: list):
+
+        """
+        Runs schedules[k] on the next sizes[k] candidates of a population, whose size must be sum(sizes).
+        """
+
+        self.schedules = list(schedules)
+        self.bounds = np.concatenate(([0], np.cumsum(sizes)))
+
+    def owner(self, candidate: int) -> int:
+
+        # Index of the schedule that drives a candidate, eg. the winner of a JK_Population
+        return int(np.searchsorted(self.bounds, candidate, side="right") - 1)
+
+    def get_state(self, prefix: str = "schedule/") -> dict:
+
+        state = {}
+        for k, schedule in enumerate(self.schedules):
+            state.update(schedule.get_state(f"{prefix}{k}/"))
+
+        return state
+
+    def set_state(self, state: dict, prefix: str = "schedule/"):
+
+        for k, schedule in enumerate(self.schedules):
+            schedule.set_state(state, f"{prefix}{k}/")
+
+    def __call__(self, count, residual):
+
+        if np.shape(residual) != (self.bounds[-1],):
+            raise ValueError(f"residual has shape {np.shape(residual)}, expected ({self.bounds[-1]},)")
+
+        return np.concatenate([
+            schedule(count, residual[a:b])
+            for schedule, a, b in zip(self.schedules, self.bounds[:-1], self.bounds[1:])
+        ])
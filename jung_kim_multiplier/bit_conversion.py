@@ -0,0 +1,71 @@
+"""
+Conversions between little endian bit arrays and integers for the JK multipliers.
+
+Both directions work along the last axis, so a single candidate (1D bits <-> int) and a population of candidates
+(2D bits <-> 1D integer lanes) go through the same code. Widths of up to 63 bits are a dot product with powers of
+two one way and shifts the other, giving int64 lanes. Wider integers are exact Python ints built from the bytes of
+np.packbits / np.unpackbits, so no string formatting is needed at any width.
+"""
+
+import numpy as np
+
+# Widest bit array that still fits in a signed 64-bit lane
+MAX_LANE_BITS = 63
+
+
+def bits_to_int(bits: np.array):
+
+    """
+    Converts little endian bits along the last axis to integers: a Python int for a single bit array,
+    otherwise an int64 lane array, or an object array of Python ints for widths past MAX_LANE_BITS.
+    """
+
+    bits = np.asarray(bits)
+    width = bits.shape[-1]
+
+    if width <= MAX_LANE_BITS:
+        out = bits.astype(np.int64) @ (np.int64(1) << np.arange(width, dtype=np.int64))
+        return int(out) if out.ndim == 0 else out
+
+    packed = np.packbits(bits.astype(np.uint8), axis=-1, bitorder="little")
+
+    if packed.ndim == 1:
+        return int.from_bytes(packed.tobytes(), "little")
+
+    out = np.empty(packed.shape[:-1], dtype=object)
+    for idx in np.ndindex(out.shape):
+        out[idx] = int.from_bytes(packed[idx].tobytes(), "little")
+
+    return out
+
+
+def int_to_bits(value, width: int) -> np.array:
+
+    """
+    Converts an integer, or an array of integer lanes, to little endian uint8 bits of the given width along a new
+    last axis. Bits above the width are dropped.
+    """
+
+    mask = (1 << width) - 1
+
+    if width <= MAX_LANE_BITS:
+        value = np.asarray(value & mask if isinstance(value, int) else value)
+
+        if value.dtype == object:
+            value = (value & mask).astype(np.int64)
+
+        shifts = np.arange(width, dtype=value.dtype)
+        return ((value[..., np.newaxis] >> shifts) & 1).astype(np.uint8)
+
+    nbytes = (width + 7) // 8
+
+    if isinstance(value, int):
+        raw = np.frombuffer((value & mask).to_bytes(nbytes, "little"), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder="little")[:width]
+
+    value = np.asarray(value, dtype=object)
+    raw = np.frombuffer(
+        b"".join(int(v & mask).to_bytes(nbytes, "little") for v in value.ravel()), dtype=np.uint8
+    ).reshape(value.shape + (nbytes,))
+
+    return np.unpackbits(raw, axis=-1, bitorder="little")[..., :width]
@@ -25,8 +25,12 @@ Attributes:
     const_1 (numpy.array): Multiplication constant 1.
     const_2 (numpy.array): Multiplication constant 2.
     is_X_flag (bool): Flag to indicate whether X or Y is being updated.
-    panneal_flag (bool): Flag to indicate whether Probabilistic Annealing is being used.
     count (int): Counter for loop iterations.
+    residual (float): N - X * Y at the last activation.
+    schedule (Schedule): Probabilistic annealing schedule, the paper's Cyclic_Schedule unless one is passed in.
+    rng (numpy.random.Generator): Generator behind every random draw, from the rng argument (a Generator or a seed).
+    uniforms (Uniform_Buffer): Pre-filled block of uniform numbers that sample_distribution consumes chunk by chunk.
+    backend (str): "numpy", or "numba" for run to advance many loops per call in the jk_loops kernel.
 
 Methods:
     _bin_to_int(X): Converts a binary numpy array to an integer.
@@ -34,28 +38,52 @@ Methods:
     compute_activation(): Computes the activation of the Boltzmann Machine.
     _sigmoid(x): Computes the sigmoid function.
     sample_distribution(): Samples from the distribution of potential factors.
-    sieve(): Applies a sieve to eliminate non-prime numbers.
+    sieve(): Snaps the sampled candidate to the nearest number coprime with the sieve primes that do not divide N.
     test(): Tests whether the current candidates are factors of the target number.
     loop(): Main loop of the algorithm.
+    run(loops): Runs up to loops loops, in one compiled kernel when the backend allows it.
+    save_checkpoint(path): Saves the candidates, counters, schedule and random state to an .npz checkpoint.
+    load_checkpoint(path): Restores a checkpoint into a multiplier built with the same arguments.
+
+JK_Population runs P independent candidate pairs of the same algorithm at once, with the integer arithmetic of every
+step vectorized across the population.
 
 This approach can make probabilistic computing more cost-effective and can be used to solve various large non-deterministic polynomial (NP) searching problems in the future.
 """
 
+import os
+import sys
+
 import numpy as np
 
+# Siblings in this directory and the shared modules at the top of the repository, wherever this is imported from
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (_here, os.path.dirname(_here)) if path not in sys.path)
+
+import checkpoint
+from annealing import Cyclic_Schedule
+from bit_conversion import bits_to_int, int_to_bits
+from jit_kernels import jk_loops, select_backend
+from random_buffer import Uniform_Buffer
+from wheel_sieve import Wheel_Sieve
+
 class JK_Multiplier:
 
-    def __init__(self, n = 64, N = 0):
+    def __init__(self, n = 64, N = 0, sieve_primes = (3, 5, 7), rng = None, schedule = None, backend = "numpy"):
 
         #  Number of bits
         self.n = n
 
+        #  Uniform numbers in [0, 1) for sampling, drawn from the multiplier's own generator
+        self.uniforms = Uniform_Buffer(rng)
+        self.rng = self.uniforms.rng
+
         #  Randomly initialize factorization candidates X and Y
-        self.X = np.random.choice([0.0,1.0], size=self.n//2-1)
-        self.Y = np.random.choice([0.0,1.0], size=self.n//2-1)
+        self.X = self.rng.choice([0.0,1.0], size=self.n//2-1)
+        self.Y = self.rng.choice([0.0,1.0], size=self.n//2-1)
 
         #  Activation
-        self.I = np.zeros(n//2-1, dtype=np.float)
+        self.I = np.zeros(n//2-1, dtype=float)
 
         # Factorization target
         self.N = N
@@ -64,33 +92,42 @@ class JK_Multiplier:
         self.const_1 = 2.0 ** (3 + np.arange(1,n//2) - 2 * n )
         self.const_2 = 2.0 ** (1 + 2 * np.arange(1,n//2) - 2 * n )
 
+        #  Sieve over the small primes, largest candidate that fits in n//2 bits
+        #  A prime that divides N is a factor itself, so it is left out rather than never sampled
+        self.wheel = Wheel_Sieve([p for p in sieve_primes if N % p])
+        self.limit = 2 ** (n//2) - 1
+
+        #  Probabilistic annealing schedule
+        self.schedule = Cyclic_Schedule() if schedule is None else schedule
+        self.residual = 0.0
+
         #  Control flags
         self.is_X_flag = True
-        self.panneal_flag = False
         self.count = 0
 
+        #  Compiled loops, only for uint64 lanes and the paper's schedule
+        self.backend = select_backend(backend)
+
     def _bin_to_int(self,X):
 
-        # From numpy array to int (little endian)
-        return int(''.join(map(str, X.astype(int)[::-1]))+"1", 2)
+        # From numpy array to int (little endian), with the implicit last bit set
+        return 2 * bits_to_int(X) + 1
     
     def _int_to_bin(self, X):
 
-        # From int to binary string (little endian)
+        # From int to numpy array (little endian), dropping the implicit last bit
 
         if X <= 1:
-            # If X is 0, return a string of length 1
-            binary_str = '1'
+            # If X is 0 or 1, return a single set bit
+            X = 1
 
         else:
-            # We start from index 2 to skip the '0b' prefix and remove the last character
-            binary_str = bin(X)[:-1][2:]
+            X >>= 1
 
-        # Convert the string to a numpy array and reverse it
-        binary_array = np.array([int(bit) for bit in binary_str][::-1],dtype=np.float)
-        # Pad the array with zeros to make its length self.n//2 - 1
-        padded_array = np.pad(binary_array, (0, self.n//2 - 1 - len(binary_array)), 'constant')
-        return padded_array
+        if X >> (self.n//2 - 1):
+            raise ValueError(f"X={X} does not fit in {self.n//2 - 1} bits")
+
+        return int_to_bits(X, self.n//2 - 1).astype(float)
 
     def compute_activation(self):
 
@@ -99,6 +136,8 @@ class JK_Multiplier:
         # Convert X and Y to int
         X = self._bin_to_int(self.X)
         Y = self._bin_to_int(self.Y)
+
+        self.residual = float(self.N - X * Y)
     
         # Compute I_k
         if self.is_X_flag:
@@ -110,14 +149,14 @@ class JK_Multiplier:
 
 
     def _sigmoid(self,x):
-        x = np.array(x, dtype=np.float)
+        x = np.array(x, dtype=float)
         return 1.0/(1+np.exp(-1.0 * x))
 
     def sample_distribution(self):
 
         """Sample from the distribution"""
 
-        out = (np.random.uniform(0,1,self.n//2-1) < self._sigmoid(self.I)).astype(np.float)
+        out = (self.uniforms.draw(self.n//2-1) < self._sigmoid(self.I)).astype(float)
 
         # Update X or Y
         if self.is_X_flag:
@@ -127,39 +166,12 @@ class JK_Multiplier:
 
     def sieve(self):
 
-        #TODO: Possibly expand this to an arbitrary amount
-
+        # Snap the candidate that was just sampled to the nearest number that
+        # is not divisible by any of the sieve primes
         if self.is_X_flag:
-
-            X = self._bin_to_int(self.X)
-
-            arr = [X-4, X-2, X, X+2, X+4]
-
-             # Check each number in the array
-            for num in arr:
-                # If the number is not divisible by 3, 5, or 7, return it
-                if num % 3 != 0 and num % 5 != 0 and num % 7 != 0:
-                    self.X = self._int_to_bin(num)
-                    return
-            
-            # If no such number is found, return None
-            self.X = self._int_to_bin(X-4)
-
+            self.X = self._int_to_bin(self.wheel.snap(self._bin_to_int(self.X), self.limit))
         else:
-
-            Y = self._bin_to_int(self.Y)
-
-            arr = [Y-4, Y-2, Y, Y+2, Y+4]
-
-             # Check each number in the array
-            for num in arr:
-                # If the number is not divisible by 3, 5, or 7, return it
-                if num % 3 != 0 and num % 5 != 0 and num % 7 != 0:
-                    self.Y = self._int_to_bin(num)
-                    return
-            
-            # If no such number is found, return None
-            self.Y = self._int_to_bin(Y-4)
+            self.Y = self._int_to_bin(self.wheel.snap(self._bin_to_int(self.Y), self.limit))
 
     def test(self):
 
@@ -178,7 +190,6 @@ class JK_Multiplier:
 
         # Count and loop
         self.count += 1
-        self.count %= 8
 
         # Check if we have found the factors
         if self.test():
@@ -187,21 +198,11 @@ class JK_Multiplier:
         # Compute vanilla I_k
         self.compute_activation()
         
-        # Probabilistic Annealing
+        # Probabilistic Annealing, one scale per candidate for a population
         if not self.is_X_flag:
 
-            if self.count == 0:
-                self.panneal_flag = True
-
-            if self.panneal_flag:
-
-                self.I *= 2.0 ** -4
-
-            else:
-
-                self.I *= 2.0 ** 1
-
-            self.panneal_flag = False
+            scale = self.schedule(self.count, self.residual)
+            self.I *= scale[..., np.newaxis] if np.ndim(scale) else scale
 
         # Sample from the distribution
         self.sample_distribution()
@@ -209,4 +210,276 @@ class JK_Multiplier:
         
         self.is_X_flag = not self.is_X_flag
 
-        return False
\ No newline at end of file
+        return False
+
+    def _compiled(self):
+
+        return self.backend == "numba" and self.n <= 64 and type(self.schedule) is Cyclic_Schedule
+
+    def _lanes(self):
+
+        # X and Y as uint64 integer lanes, one per candidate
+        X, Y = np.atleast_2d(self.X), np.atleast_2d(self.Y)
+        return (bits_to_int(X).astype(np.uint64) * 2 + 1, bits_to_int(Y).astype(np.uint64) * 2 + 1)
+
+    def _write_back(self, bits, lanes, before):
+
+        # Bits of the lanes that the kernel changed, the others are kept as they were
+        bits = np.array(bits)
+        changed = lanes != before
+        if bits.ndim == 1:
+            return self._int_to_bin(int(lanes[0])) if changed[0] else bits
+
+        bits[changed] = int_to_bits(lanes[changed] >> np.uint64(1), self.n//2 - 1)
+        return bits
+
+    def _found(self, winner, factor):
+
+        # A single multiplier keeps no record of its factor, test finds it again
+        pass
+
+    def samples(self):
+
+        # Bits of X and Y side by side, one row per candidate of a population
+        return np.concatenate((self.X, self.Y), axis=-1)
+
+    def run(self, loops, recorder = None):
+
+        """
+        Runs up to loops loops and returns True as soon as a factor is found, as loop does, or False. With a
+        recorder, a Sample_Recorder of the shape of samples(), the candidates are recorded after every loop.
+
+        With the numba backend, n <= 64 and the Cyclic_Schedule the loops run in the jk_loops kernel, as many per call
+        as the current block of the buffer holds uniform numbers for, drawn with draw_steps, so it follows loop
+        exactly. Any other schedule is called from Python, so it falls back to loop.
+        """
+
+        if not self._compiled():
+            for _ in range(loops):
+                if self.loop():
+                    return True
+                if recorder is not None:
+                    recorder.record(self.samples())
+            return False
+
+        X0, Y0 = self._lanes()
+        X, Y = X0.copy(), Y0.copy()
+        bits = self.n//2 - 1
+        schedule = self.schedule
+
+        # One loop per call when every loop is recorded
+        chunk = 1 if recorder is not None else loops
+        done, winner = 0, -1
+
+        while done < loops and winner < 0:
+            uniforms = self.uniforms.draw_steps(len(X) * bits, min(chunk, loops - done)).reshape(-1, len(X), bits)
+
+            ran, self.count, self.is_X_flag, winner, factor = jk_loops(
+                X, Y, np.uint64(self.N), self.count, self.is_X_flag, self.const_1, self.const_2,
+                schedule.period, schedule.low, schedule.high, np.uint64(self.wheel.modulus), self.wheel.down,
+                self.wheel.up, np.uint64(self.limit), uniforms, done + len(uniforms) < loops,
+            )
+
+            # Hand back the numbers of the loops that were not run, the winning loop stops before it samples
+            self.uniforms.undraw((len(uniforms) - ran + (winner >= 0)) * len(X) * bits)
+            done += ran
+
+            if recorder is not None and winner < 0:
+                X0, Y0 = self._lanes()
+                self.X, self.Y = self._write_back(self.X, X, X0), self._write_back(self.Y, Y, Y0)
+                recorder.record(self.samples())
+
+        # Write back the candidates that changed, as bits
+        self.X, self.Y = self._write_back(self.X, X, X0), self._write_back(self.Y, Y, Y0)
+
+        if winner < 0:
+            return False
+
+        self._found(int(winner), int(factor))
+        return True
+
+    def get_state(self) -> dict:
+
+        # Everything a loop reads that is not fixed by the constructor arguments
+        state = {
+            "kind": type(self).__name__,
+            "n": self.n,
+            "N": int(self.N),
+            "X": self.X,
+            "Y": self.Y,
+            "count": int(self.count),
+            "is_X_flag": bool(self.is_X_flag),
+            "residual": np.asarray(self.residual, dtype=float),
+        }
+        state.update(self.uniforms.get_state())
+        state.update(self.schedule.get_state())
+
+        return state
+
+    def set_state(self, state: dict):
+
+        checkpoint.check(state, kind=type(self).__name__, n=self.n, N=int(self.N))
+
+        self.X = np.array(state["X"])
+        self.Y = np.array(state["Y"])
+        self.count = state["count"]
+        self.is_X_flag = state["is_X_flag"]
+        self.residual = state["residual"] if state["residual"].ndim else float(state["residual"])
+        self.uniforms.set_state(state)
+        self.schedule.set_state(state)
+
+    def save_checkpoint(self, path, **extra):
+
+        """
+        Saves the state of the multiplier to path, together with any extra JSON values, eg. the driver's progress.
+        """
+
+        checkpoint.save(path, {**self.get_state(), **{f"extra/{k}": v for k, v in extra.items()}})
+
+    def load_checkpoint(self, path) -> dict:
+
+        """
+        Restores a checkpoint taken from a multiplier built with the same arguments, so that it continues exactly
+        where the saved one stopped. Returns the extra values saved with it.
+        """
+
+        state = checkpoint.load(path)
+        self.set_state(state)
+
+        return {k[len("extra/") :]: v for k, v in state.items() if k.startswith("extra/")}
+
+class JK_Population(JK_Multiplier):
+
+    """
+    A population of P independent JK_Multiplier candidate pairs annealed in lockstep.
+
+    X and Y hold one row of bits per candidate, and the candidates' integers are kept in vectorized lanes:
+    uint64 for n <= 64, where X * Y can not overflow, and Python ints in object arrays beyond that. Every
+    loop() computes N - X * Y and the I_k activations of the whole population at once, samples every
+    candidate in one call and stops as soon as any candidate divides N.
+
+    Attributes:
+        P (int): Number of candidate pairs.
+        factor (int): First factor found, None until then.
+        winner (int): Index of the candidate that found it.
+    """
+
+    def __init__(self, n = 64, N = 0, P = 1024, sieve_primes = (3, 5, 7), rng = None, schedule = None,
+                 backend = "numpy"):
+
+        super().__init__(n, N, sieve_primes, rng, schedule, backend)
+
+        self.P = P
+
+        # Randomly initialize the populations of factorization candidates
+        self.X = self.rng.choice([0.0,1.0], size=(P, self.n//2-1))
+        self.Y = self.rng.choice([0.0,1.0], size=(P, self.n//2-1))
+        self.I = np.zeros((P, self.n//2-1), dtype=float)
+
+        # Integer lanes
+        self.lane = np.uint64 if n <= 64 else object
+        self._N = self.lane(N) if n <= 64 else N
+
+        self.factor = None
+        self.winner = None
+
+    def _bin_to_int(self, X):
+
+        # From (P, bits) arrays to one odd integer lane per candidate (little endian)
+        return bits_to_int(X).astype(self.lane) * 2 + 1
+
+    def _int_to_bin(self, X):
+
+        # From integer lanes to (P, bits) arrays, dropping the implicit last bit
+        # Integers of 1 or less map to a single set bit, as in JK_Multiplier
+        X = np.where(X <= 1, 3, X) >> 1
+
+        return int_to_bits(X, self.n//2-1).astype(float)
+
+    def _found(self, winner, factor):
+
+        self.winner = winner
+        self.factor = factor
+
+    def get_state(self) -> dict:
+
+        state = super().get_state()
+        state.update({"P": self.P, "factor": self.factor, "winner": self.winner})
+
+        return state
+
+    def set_state(self, state: dict):
+
+        checkpoint.check(state, P=self.P)
+        super().set_state(state)
+        self.factor = state["factor"]
+        self.winner = state["winner"]
+
+    def _residual(self, XY):
+
+        # N - X * Y as floats, without wrapping the unsigned lanes
+        if self.lane is object:
+            return (self._N - XY).astype(float)
+
+        return np.where(
+            XY <= self._N,
+            (self._N - XY).astype(float),
+            -(XY - self._N).astype(float),
+        )
+
+    def compute_activation(self):
+
+        """Compute p-bit activation of every candidate as described in the paper"""
+
+        # Convert X and Y to int lanes
+        X = self._bin_to_int(self.X)
+        Y = self._bin_to_int(self.Y)
+
+        self.residual = self._residual(X * Y)
+        residual = self.residual[:, np.newaxis]
+
+        # Compute I_k
+        if self.is_X_flag:
+            self.I = self.const_1 * residual * Y.astype(float)[:, np.newaxis]
+            self.I += (2 * self.X - 1 ) * self.const_2 * (Y * Y).astype(float)[:, np.newaxis]
+        else:
+            self.I = self.const_1 * residual * X.astype(float)[:, np.newaxis]
+            self.I += (2 * self.Y - 1 ) * self.const_2 * (X * X).astype(float)[:, np.newaxis]
+
+    def sample_distribution(self):
+
+        """Sample every candidate from its distribution"""
+
+        out = (self.uniforms.draw(self.I.shape) < self._sigmoid(self.I)).astype(float)
+
+        # Update X or Y
+        if self.is_X_flag:
+            self.X = out
+        else:
+            self.Y = out
+
+    def sieve(self):
+
+        # Snap every candidate of the half that was just sampled in one batch
+        if self.is_X_flag:
+            self.X = self._int_to_bin(self.wheel.snap(self._bin_to_int(self.X), self.limit))
+        else:
+            self.Y = self._int_to_bin(self.wheel.snap(self._bin_to_int(self.Y), self.limit))
+
+    def test(self):
+
+        X = self._bin_to_int(self.X)
+        Y = self._bin_to_int(self.Y)
+
+        # Check which of the current X and Y are factors of N
+        hit_X = (self._N % X == 0) & (X > 1)
+        hit_Y = (self._N % Y == 0) & (Y > 1)
+
+        if not np.any(hit_X | hit_Y):
+            return False
+
+        # Report the first successful candidate
+        self.winner = int(np.argmax(hit_X | hit_Y))
+        self.factor = int(X[self.winner]) if hit_X[self.winner] else int(Y[self.winner])
+
+        return True
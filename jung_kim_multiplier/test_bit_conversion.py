@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from bit_conversion import MAX_LANE_BITS, bits_to_int, int_to_bits
+from jung_kim_pmultiplier import JK_Multiplier
+
+
+def _reference(value, width):
+
+    # Little endian bits through the string formatting the multipliers used to do
+    return np.array([int(b) for b in format(value, f"0{width}b")[::-1]], dtype=np.uint8)
+
+
+@pytest.mark.parametrize("width", [1, 8, 31, MAX_LANE_BITS, MAX_LANE_BITS + 1, 100, 257])
+def test_round_trip(width):
+
+    rng = np.random.default_rng(width)
+    values = [0, 1, 2 ** width - 1] + [int.from_bytes(rng.bytes(40), "little") % 2 ** width for _ in range(20)]
+
+    for value in values:
+        bits = int_to_bits(value, width)
+        np.testing.assert_array_equal(bits, _reference(value, width))
+        assert bits_to_int(bits) == value
+
+
+@pytest.mark.parametrize("width", [20, MAX_LANE_BITS, 64, 130])
+def test_lanes(width):
+
+    # A population of bit rows converts to one integer lane per row and back
+    rng = np.random.default_rng(width)
+    bits = rng.integers(0, 2, size=(2, 5, width)).astype(np.uint8)
+    lanes = bits_to_int(bits)
+
+    assert lanes.shape == (2, 5)
+    assert lanes.dtype == (np.int64 if width <= MAX_LANE_BITS else object)
+    assert [int(v) for v in lanes.ravel()] == [bits_to_int(row) for row in bits.reshape(-1, width)]
+    np.testing.assert_array_equal(int_to_bits(lanes, width), bits)
+
+
+def test_bits_above_the_width_are_dropped():
+
+    np.testing.assert_array_equal(int_to_bits(0b10110, 3), [0, 1, 1])
+    np.testing.assert_array_equal(int_to_bits(2 ** 80 + 5, 70), _reference(5, 70))
+    np.testing.assert_array_equal(int_to_bits(np.array([2 ** 70 + 3], dtype=object), 8), [[1, 1, 0, 0, 0, 0, 0, 0]])
+
+
+@pytest.mark.parametrize("n", [16, 64, 130])
+def test_multiplier_conversions_keep_the_implicit_bit(n):
+
+    # Candidates are odd, their lowest bit is implied and not stored
+    jk = JK_Multiplier(n, 15, rng=0)
+    for X in (3, 2 ** (n // 2) - 1, 2 ** (n // 2 - 1) + 1):
+        assert len(jk._int_to_bin(X)) == n // 2 - 1
+        assert jk._bin_to_int(jk._int_to_bin(X)) == X
+
+    with pytest.raises(ValueError):
+        jk._int_to_bin(2 ** (n // 2) + 1)
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from annealing import Adaptive_Schedule, Cyclic_Schedule, Linear_Schedule, Mixed_Schedule, Schedule
+from jung_kim_pmultiplier import JK_Multiplier, JK_Population
+from random_buffer import Uniform_Buffer
+
+# Semiprime of two 23 bit primes, out of reach of the few hundred loops run below
+N = 8388593 * 8388587
+
+
+def _single(schedule, rng, backend="numpy", n=48, target=N):
+    return JK_Multiplier(n, target, rng=rng, schedule=schedule, backend=backend)
+
+
+def _population(schedule, rng, backend="numpy", n=48, target=N):
+    return JK_Population(n, target, P=8, rng=rng, schedule=schedule, backend=backend)
+
+
+def _mixed():
+    return Mixed_Schedule([Adaptive_Schedule(patience=4), Linear_Schedule(steps=50, period=100)], [5, 3])
+
+
+@pytest.mark.parametrize("make, schedule", [
+    (_single, Cyclic_Schedule),
+    (_single, Adaptive_Schedule),
+    (_population, Cyclic_Schedule),
+    (_population, Adaptive_Schedule),
+    (_population, _mixed),
+])
+def test_resume_from_checkpoint(tmp_path, make, schedule):
+
+    # A multiplier restored halfway continues exactly as the saved one, including the state of its schedule
+    path = str(tmp_path / "jk.npz")
+    jk = make(schedule(), 0)
+    assert not jk.run(150)
+    jk.save_checkpoint(path, loops=150)
+
+    restored = make(schedule(), 1)
+    assert restored.load_checkpoint(path) == {"loops": 150}
+
+    assert not jk.run(250)
+    assert not restored.run(250)
+
+    np.testing.assert_array_equal(restored.X, jk.X)
+    np.testing.assert_array_equal(restored.Y, jk.Y)
+    assert restored.count == jk.count
+
+
+def test_checkpoint_of_another_population(tmp_path):
+
+    path = str(tmp_path / "jk.npz")
+    JK_Population(48, N, P=8, rng=0).save_checkpoint(path)
+
+    with pytest.raises(ValueError):
+        JK_Population(48, N, P=4, rng=0).load_checkpoint(path)
+
+
+def test_schedules_must_define_a_scale():
+
+    class Unscaled(Schedule):
+        pass
+
+    with pytest.raises(TypeError):
+        Unscaled()
+
+
+@pytest.mark.parametrize("make", [_single, _population])
+def test_numba_run_matches_numpy(make):
+
+    # Both backends take the same uniform numbers, as long as the loops fit in one block of the buffer
+    pytest.importorskip("numba")
+
+    runs = [make(Cyclic_Schedule(), 0, backend) for backend in ("numpy", "numba")]
+    for jk in runs:
+        assert not jk.run(300)
+
+    np.testing.assert_array_equal(runs[1].X, runs[0].X)
+    np.testing.assert_array_equal(runs[1].Y, runs[0].Y)
+    assert (runs[1].count, runs[1].is_X_flag) == (runs[0].count, runs[0].is_X_flag)
+
+
+@pytest.mark.parametrize("make", [_single, _population])
+@pytest.mark.parametrize("n, target", [(48, N), (16, 251 * 241)])
+def test_numba_run_matches_numpy_across_blocks(make, n, target):
+
+    # Blocks of two and a half loops, against a target the loops do not factor and one they do
+    pytest.importorskip("numba")
+
+    runs = []
+    for backend in ("numpy", "numba"):
+        jk = make(Cyclic_Schedule(), 0, backend, n, target)
+        jk.uniforms = Uniform_Buffer(0, block_size=5 * jk.I.size // 2)
+        runs.append((jk, jk.run(300)))
+
+    (numpy, found), (numba, numba_found) = runs
+    assert numba_found == found and found == (target != N)
+    np.testing.assert_array_equal(numba.X, numpy.X)
+    np.testing.assert_array_equal(numba.Y, numpy.Y)
+    assert (numba.count, numba.is_X_flag) == (numpy.count, numpy.is_X_flag)
+    np.testing.assert_array_equal(numba.uniforms.draw(7), numpy.uniforms.draw(7))
+
+
+@pytest.mark.parametrize("n, target", [(32, 65521 * 65519), (128, (2 ** 61 - 1) * (2 ** 31 - 1))])
+@pytest.mark.parametrize("is_X_flag", [True, False])
+def test_population_activations_match_single_candidates(n, target, is_X_flag):
+
+    # Every row of a population is the JK_Multiplier of that candidate pair, on uint64 or Python int lanes
+    population = JK_Population(n, target, P=6, rng=0)
+    population.is_X_flag = is_X_flag
+    population.compute_activation()
+
+    for c in range(population.P):
+        single = JK_Multiplier(n, target, rng=0)
+        single.X, single.Y, single.is_X_flag = population.X[c], population.Y[c], is_X_flag
+        single.compute_activation()
+
+        np.testing.assert_allclose(population.I[c], single.I)
+        assert population.residual[c] == single.residual
+
+
+def test_population_reports_the_winning_candidate():
+
+    population = JK_Population(16, 251 * 241, P=4, rng=0)
+    population.Y[2] = population._int_to_bin(np.array([241]))[0]
+
+    assert population.test()
+    assert population.winner == 2 and population.factor == 241
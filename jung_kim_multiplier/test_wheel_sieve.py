@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from jung_kim_pmultiplier import JK_Population
+from wheel_sieve import Wheel_Sieve
+
+
+def _admissible(V, primes):
+    return V % 2 == 1 and all(V % p for p in primes)
+
+
+@pytest.mark.parametrize("primes", [(3,), (3, 5, 7), (3, 5, 7, 11)])
+def test_admissible_residues(primes):
+
+    wheel = Wheel_Sieve(primes)
+    assert wheel.modulus == 2 * np.prod(primes)
+    assert [bool(ok) for ok in wheel.admissible] == [_admissible(r, primes) for r in range(wheel.modulus)]
+
+
+@pytest.mark.parametrize("primes, limit", [((3, 5, 7), 2 ** 9 - 1), ((3, 5, 7, 11, 13), 2 ** 15 - 1)])
+def test_snap_to_the_nearest_admissible_number(primes, limit):
+
+    # Against a brute force search of [1, limit], going down on ties
+    wheel = Wheel_Sieve(primes)
+    V = np.arange(1, limit + 1, dtype=np.int64)
+
+    admissible = V[[_admissible(int(v), primes) for v in V]]
+    above = np.searchsorted(admissible, V)
+    below = np.searchsorted(admissible, V, side="right") - 1
+    up = admissible[np.minimum(above, len(admissible) - 1)]
+    down = admissible[below]
+    expected = np.where((above < len(admissible)) & (up - V < V - down), up, down)
+
+    snapped = wheel.snap(V, limit)
+    np.testing.assert_array_equal(snapped, expected)
+    assert np.all((1 <= snapped) & (snapped <= limit))
+    assert [wheel.snap(int(v), limit) for v in V[::97]] == list(expected[::97])
+
+
+def test_snap_stays_within_range():
+
+    wheel = Wheel_Sieve((3, 5, 7))
+
+    # 0 snaps up to 1, 12 is a tie between 11 and 13 and goes down, 16 would go up to 17 but that is past the limit
+    assert wheel.snap(2) == 1 and wheel.snap(np.array([2]))[0] == 1
+    assert wheel.snap(0) == 1
+    assert wheel.snap(12, limit=13) == 11 and wheel.snap(16, limit=13) == 13
+
+
+def test_sieve_primes_that_divide_N_are_left_out():
+
+    # 11 is a factor, so a wheel over 11 would never produce it
+    jk = JK_Population(12, 11 * 131, P=64, sieve_primes=(3, 5, 7, 11, 13), rng=0)
+    assert jk.wheel.primes == (3, 5, 7, 13)
+
+    for _ in range(2000):
+        if jk.loop():
+            break
+
+    assert jk.factor in (11, 131)
@@ -0,0 +1,72 @@
+"""
+A wheel sieve over a configurable set of small primes for the JK multipliers.
+
+The wheel has modulus M = 2 * p_1 * ... * p_k, and a residue r in [0, M) is admissible when it is odd and not divisible
+by any of the primes. For every residue the distances down and up to the nearest admissible residue are tabulated once,
+wrapping around the wheel, so snapping a candidate to the nearest admissible number is one modulo and two table lookups,
+for a single Python int or a whole array of candidates at once.
+
+Snapping never returns a multiple of one of the primes, the primes themselves included, so a wheel only suits targets
+that none of its primes divide. The JK multipliers build their wheel from the sieve primes that do not divide N.
+
+The tables hold 2 * M entries, ie. 420 for the default (3, 5, 7) and 60060 for the primes up to 13.
+"""
+
+import numpy as np
+
+
+class Wheel_Sieve:
+
+    def __init__(self, primes = (3, 5, 7)):
+
+        self.primes = tuple(primes)
+        self.modulus = 2 * int(np.prod(self.primes, dtype=object))
+
+        # Admissible residues are odd and coprime with every prime
+        ok = np.ones(self.modulus, dtype=bool)
+        ok[::2] = False
+        for p in self.primes:
+            ok[::p] = False
+        self.admissible = ok
+
+        # Tile the wheel three times so that the middle copy sees its neighbors on both sides
+        idx = np.arange(3 * self.modulus)
+        tiled = np.tile(ok, 3)
+        last = np.maximum.accumulate(np.where(tiled, idx, -1))
+        following = np.minimum.accumulate(np.where(tiled, idx, 3 * self.modulus)[::-1])[::-1]
+
+        # Distance to the nearest admissible residue at or below / at or above each residue
+        self.down = (idx - last)[self.modulus : 2 * self.modulus].astype(np.int32)
+        self.up = (following - idx)[self.modulus : 2 * self.modulus].astype(np.int32)
+
+    def snap(self, V, limit = None):
+
+        """
+        Snaps V to the nearest admissible number, going down on ties. Numbers are kept at 1 or above and, if limit is
+        given, at limit or below by taking the other direction when the nearest one would leave that range.
+        """
+
+        if isinstance(V, (int, np.integer)):
+
+            r = int(V % self.modulus)
+            down, up = int(self.down[r]), int(self.up[r])
+
+            go_up = up < down
+            if go_up and limit is not None and V + up > limit:
+                go_up = False
+            if not go_up and V - down < 1:
+                go_up = True
+
+            return V + up if go_up else V - down
+
+        V = np.asarray(V)
+        r = (V % self.modulus).astype(np.int64)
+        down = self.down[r].astype(V.dtype)
+        up = self.up[r].astype(V.dtype)
+
+        go_up = up < down
+        if limit is not None:
+            go_up &= V + up <= limit
+        go_up |= V <= down
+
+        return np.where(go_up, V + up, V - down)
@@ -1,13 +1,59 @@
+import copy
+import os
+import sys
+
 import numpy as np
 
+# Siblings in this directory and the shared modules at the top of the repository, wherever this is imported from
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (_here, os.path.dirname(_here)) if path not in sys.path)
+
+import checkpoint
+from jit_kernels import onizawa_sweeps, select_backend
+from onizawa_ising import Onizawa_Ising
+from profiler import Phase_Profiler, null_phase, profiled
+from random_buffer import Uniform_Buffer
+
 """
 The following class describes a n-bit p-Multiplier that is a Multiplier with probabilistic logic.
+
+Passing `replicas` gives the p-bit states a leading replica axis so that many independent chains
+are advanced by a single call to `stochastic_iteration` or `deterministic_iteration`.
+
+Passing `profile=True` times the phases of every iteration and records the energy and the number of violated gates
+after each one, see `profile_summary`.
+
+The p-bits live in one flat state buffer, with `a`, `b` and `counters` as views into it, so that the deterministic
+mode treats every continuous p-bit as one entry of a flat parameter vector: an Adam step is a handful of in-place
+operations on preallocated buffers and a single scatter back into the state.
+
+Passing `backend="numba"` makes `run` advance many stochastic iterations per call in one compiled kernel, with the
+local fields compiled once into a sparse affine map of the flat state. Without Numba, or with the default "numpy"
+backend, `run` simply loops over stochastic_iteration.
+
+Random numbers come from the multiplier's own np.random.Generator, passed in or seeded through `rng`, and are drawn
+in large blocks that each stochastic_iteration consumes a chunk of at a time.
+
+Passing a ladder of `pseudotemperatures` turns on parallel tempering: every replica runs at one rung of the ladder,
+and `tempering_iteration` follows each sweep with Metropolis swaps of the pseudotemperatures of replicas on
+neighbouring rungs, using the energy of the explicit Ising model. Swapping the pseudotemperatures rather than the
+states keeps the exchange down to a few index updates, see `swap_rates` for the acceptance of every pair of rungs.
+
+`save_checkpoint` writes the p-bits of every replica, the Adam moments, the tempering ladders and the random state to
+one .npz file, and `load_checkpoint` restores it into a multiplier built with the same arguments, which then continues
+exactly as the saved one would have.
 """
 
 
 class Onizawa_Multiplier:
     def __init__(self, n: int, output: int = 0, pseudotemperature: float = 1.0,
-                 lr = 0.001, beta_1 = 0.9, beta_2 = 0.999, epsilon = 1e-07, and_temp = 1e-1):
+                 lr = 0.001, beta_1 = 0.9, beta_2 = 0.999, epsilon = 1e-07, and_temp = 1e-1,
+                 replicas: int = None, profile: bool = False, rng = None, pseudotemperatures = None,
+                 backend: str = "numpy"):
+
+        # Uniform numbers in [-1, +1) for sampling, drawn from the multiplier's own generator
+        self.uniforms = Uniform_Buffer(rng, -1.0, +1.0)
+        self.rng = self.uniforms.rng
 
         if n % 2 == 0:
 
@@ -19,17 +65,33 @@ class Onizawa_Multiplier:
             self.T = pseudotemperature
             self.and_temp = and_temp
 
+            # replicas is the number of independent chains advanced together,
+            # each state array then carries a leading replica axis
+            self.replicas = replicas
+            self.batch_shape = () if replicas is None else (replicas,)
+
+            # Parallel tempering runs one or more ladders of pseudotemperatures side by side
+            self.ladder = None
+            if pseudotemperatures is not None:
+                self._init_ladder(pseudotemperatures)
+
+            # Columns of the upper push that the fields of A read, and the entry that carries the first bit. Tempering
+            # reads them in the order of the Onizawa_Ising energy that its swaps use, the other modes keep the
+            # original order, which solves faster for them, see _a_field_order
+            self._a_cols, self._a_first = self._a_field_order(exact=self.ladder is not None)
+
             # Desirable output
             if output < 0 or output > 2 ** (n + 1):
                 raise ValueError(f"output={output} must be between 0 and {2 ** (n+1)}")
             else:
+                self.target = output
                 self.output = [
                     2 * int(b) - 1 for b in bin(output)[::-1][:-2].ljust(n, "0")
                 ]
 
             # Initialize the multiplier's non-recursive p-bits
-            self.a = np.random.choice([-1, +1], size=(n // 2)).astype(np.float64)
-            self.b = np.random.choice([-1, +1], size=(n // 2)).astype(np.float64)
+            self.a = self.rng.choice([-1, +1], size=self.batch_shape + (n // 2,)).astype(np.float64)
+            self.b = self.rng.choice([-1, +1], size=self.batch_shape + (n // 2,)).astype(np.float64)
             self.first_bit = self.output[0]
             self.last_bit = self.output[-1]
 
@@ -57,7 +119,10 @@ class Onizawa_Multiplier:
             ]
 
             # Initialize the counters and other computational arrays
-            self.counters = np.zeros((n - 2, max([sum(i) for i in self.counter_dims])))
+            self.counters = np.zeros(
+                self.batch_shape + (n - 2, max([sum(i) for i in self.counter_dims]))
+            )
+            self.counter_mask = np.zeros((n - 2, max([sum(i) for i in self.counter_dims])), dtype=int)
             self.counter_J = np.zeros((n - 2, max([sum(i) for i in self.counter_dims])))
             self.partial_prods = np.zeros(
                 (n - 2, max([sum(i) for i in self.counter_dims]))
@@ -71,16 +136,14 @@ class Onizawa_Multiplier:
 
                 self.counter_J[i, :a] = -1
 
-                self.counters[i, : a + b] = np.random.choice([-1, +1], size=a + b)
-                self.counters[i, a] = self.output[i+1]
+                self.counters[..., i, : a + b] = self.rng.choice([-1, +1], size=self.batch_shape + (a + b,))
+                self.counters[..., i, a] = self.output[i+1]
+                self.counter_mask[i, : a + b] = 1
 
                 self.partial_prods[i, : self.counter_dims[i][0]] = 1
 
                 for j in range(b):
                     self.counter_J[i, answers[i] + j] = 2**j
-            
-            # Create a mask for all the counters
-            self.counter_mask = (self.counters != 0).astype(int)
 
             # Create the carry maps and the or_bin
             # Carry maps map (row,col,power) to (row,col)
@@ -108,11 +171,38 @@ class Onizawa_Multiplier:
                         # If we run out of counters, push them to the or_bin
                         self.or_bin.append((i, c + j, j))
 
+            # Compile the carry maps and the or_bin into flat index tables so that
+            # activations and write-backs are single fancy-indexed expressions
+            self.map_rows = np.array([key[0] for key in self.maps.keys()], dtype=int)
+            self.map_cols = np.array([key[1] for key in self.maps.keys()], dtype=int)
+            self.map_pows = 2.0 ** np.array([key[2] for key in self.maps.keys()])
+            self.map_carry_rows = np.array([val[0] for val in self.maps.values()], dtype=int)
+            self.map_carry_cols = np.array([val[1] for val in self.maps.values()], dtype=int)
+
+            self.or_rows = np.array([o[0] for o in self.or_bin], dtype=int)
+            self.or_cols = np.array([o[1] for o in self.or_bin], dtype=int)
+            self.or_pows = 2.0 ** np.array([o[2] for o in self.or_bin])
+
+            # Procedurally generate or-gate weights
+            self.J_Cor = np.eye(len(self.or_bin)) - 1
+
+            # Precompute the gather indices of the rhombus transforms
+            self._compile_rhombus_indices()
+
         else:
             raise ValueError(f"n={n} must be even")
 
         self.a_rows = []
 
+        # Optional profiling, the phases are no-ops unless it is turned on
+        self.profiler = Phase_Profiler() if profile else None
+        self._phase = self.profiler.phase if profile else null_phase
+        self._ising = None
+
+        # Compiled sweeps, the kernel tables are built on the first run
+        self.backend = select_backend(backend)
+        self._kernel = None
+
         # Adam parameters
         self.lr = lr
         self.beta_1 = beta_1
@@ -120,79 +210,265 @@ class Onizawa_Multiplier:
         self.epsilon = epsilon
         self.timestep = 0
 
-        # First and second moment estimates initialized as 0
-        self.m_a_A, self.v_a_A = 0, 0
-        self.m_a_B, self.v_a_B = 0, 0
-        self.m_a_C, self.v_a_C = 0, 0
-        self.m_a_Cio, self.v_a_Cio = 0, 0
-        self.m_a_Cor, self.v_a_Cor = 0, 0
+        # Every continuous p-bit is one entry of a flat parameter vector, see _compile_flat_state
+        self._compile_flat_state()
+
+        # First and second moment estimates initialized as 0, with scratch space for the update
+        self.m = np.zeros(self.batch_shape + (self.param_size,))
+        self.v = np.zeros(self.batch_shape + (self.param_size,))
+        self._grad = np.empty_like(self.m)
+        self._step = np.empty_like(self.m)
+        self._scratch = np.empty_like(self.m)
+
+    def _compile_flat_state(self):
+
+        """
+        Moves a, b and counters into one contiguous buffer, a then b then the counters row by row, and leaves them as
+        views into it. The free p-bits form the parameter vector of the deterministic mode:
+
+            [A, B, partial products, carry bits, "or"-bits]
+
+        Partial products are replaced by their update and every other p-bit is incremented by it, with each carry bit
+        held twice, in the counter cell it leaves and the carry cell it enters.
+        """
+
+        half = self.n // 2
+        counters_start = 2 * half
+
+        self.state = np.concatenate(
+            (self.a, self.b, self.counters.reshape(self.batch_shape + (-1,))), axis=-1
+        )
+        self.a = self.state[..., :half]
+        self.b = self.state[..., half:counters_start]
+        self.counters = self.state[..., counters_start:].reshape(self.counters.shape)
+
+        width = self.counters.shape[-1]
+        self._pp_flat = np.flatnonzero(self.partial_prods)
+        map_flat = self.map_rows * width + self.map_cols
+        carry_flat = self.map_carry_rows * width + self.map_carry_cols
+        or_flat = self.or_rows * width + self.or_cols
+
+        # Offsets of each group in the parameter vector
+        sizes = np.cumsum([0, half, half, len(self._pp_flat), len(map_flat), len(or_flat)])
+        self.param_size = int(sizes[-1])
+        self._param_splits = sizes[1:-1]
+        A, B, C, Cio, Cor = (np.arange(a, b) for a, b in zip(sizes[:-1], sizes[1:]))
+
+        # Scatter of the parameter updates into the state
+        self._set_dst = counters_start + self._pp_flat
+        self._set_src = C
+        self._add_dst = np.concatenate((A, B, counters_start + map_flat, counters_start + carry_flat,
+                                        counters_start + or_flat))
+        self._add_src = np.concatenate((A, B, Cio, Cio, Cor))
+
+    def _bits_to_int(self, bits: np.array):
+
+        # Little endian bits to integers, one per replica when batched
+        # Object weights keep the result exact past 62 bits
+        dtype = np.int64 if bits.shape[-1] < 63 else object
+        out = (bits > 0).astype(dtype) @ (2 ** np.arange(bits.shape[-1], dtype=dtype))
+
+        return out if self.replicas is not None else int(out)
 
     def get_inputs(self):
 
-        A = sum([int(val * 2**idx) for idx, val in enumerate(self.a > 0)])
-        B = sum([int(val * 2**idx) for idx, val in enumerate(self.b > 0)])
+        A = self._bits_to_int(self.a)
+        B = self._bits_to_int(self.b)
 
         return A,B
 
     def get_output(self):
 
-        out = [self.first_bit]
-        for idx,e in enumerate(self.counter_dims):
-            out.append(self.counters[idx,e[0]+e[1]])
-        out.append(self.last_bit)
+        out = np.stack(
+            [np.broadcast_to(self.first_bit, self.batch_shape)]
+            + [self.counters[..., idx, e[0] + e[1]] for idx, e in enumerate(self.counter_dims)]
+            + [np.broadcast_to(self.last_bit, self.batch_shape)],
+            axis=-1,
+        )
+
+        return self._bits_to_int(out)
+
+    def solved(self):
+
+        # Per-replica mask of chains whose inputs multiply out to the target
+        A, B = self.get_inputs()
 
-        return sum([int(o > 0) * 2 ** idx for idx, o in enumerate(out)])
+        return A * B == self.target
 
     """
     The following functions are used to manipulate the shape of the counters
     to make it simple to run the computation required for p-bit activations.
+
+    Every transform is a fixed permutation of the cells, so the rolls are worked
+    out once as flat gather indices and each transform is then a single take.
     """
 
+    def _compile_rhombus_indices(self):
+
+        rows, cols = self.counters.shape[-2:]
+        r = np.arange(rows).reshape(-1, 1)
+        c = np.arange(cols).reshape(1, -1)
+
+        # Rolling a row right by s reads its cells from (c - s) % cols
+        lower_shift = np.where(r >= self.n // 2 - 2, r - self.n // 2 + 2, 0)
+        upper_shift = np.where(r < self.n // 2 - 2, self.n // 2 - 2 - r, 0)
+
+        self._lower_push_idx = r * cols + (c - lower_shift) % cols
+        self._upper_push_idx = r * cols + (c - upper_shift) % cols
+        self._lower_pushback_idx = r * cols + (c + lower_shift) % cols
+
+        # The square has an extra leading row and its first n // 2 columns are rolled down
+        col_shift = np.where(c < self.n // 2, c, 0)
+
+        self._square_to_lu_rhombus_idx = ((r + 1 - col_shift) % (rows + 1)) * cols + c
+
+    # Gather the trailing two axes of array through a flat index table
+    def _gather(self, array: np.array, idx: np.array) -> np.array:
+        return np.take(array.reshape(array.shape[:-2] + (-1,)), idx, axis=-1)
+
     # Right isoceles to north-west rhombus
     def _lower_push(self, array: np.array) -> np.array:
-        temp = array.copy()
-        for i in range(self.n // 2 - 2, self.n - 2):
-            temp[i] = np.roll(temp[i], i - self.n // 2 + 2)
-        return temp
+        return self._gather(array, self._lower_push_idx)
 
     # Right isoceles to north-east rhombus
     def _upper_push(self, array: np.array) -> np.array:
-        temp = array.copy()
-        for i in range((self.n) // 2 - 2):
-            temp[i] = np.roll(temp[i], (self.n) // 2 - 2 - i)
-        return temp
-
-    # North-west rhombus to square
-    def _lu_rhombus_to_square(self, array: np.array) -> np.array:
-        temp = array.copy()
-        temp = np.vstack((np.zeros(temp.shape[1]), temp))
-        for i in range(self.n // 2):
-            temp[:, i] = np.roll(temp[:, i], -i)
-        return temp
+        return self._gather(array, self._upper_push_idx)
 
     # Square to north-west rhombus
     def _square_to_lu_rhombus(self, array: np.array) -> np.array:
-        temp = array.copy()
-        for i in range(self.n // 2):
-            temp[:, i] = np.roll(temp[:, i], i)
-        return temp[1:]
+        return self._gather(array, self._square_to_lu_rhombus_idx)
 
     # North-west rhombus to right isoceles
     def _lower_pushback(self, array: np.array) -> np.array:
-        temp = array.copy()
-        for i in range(self.n // 2 - 2, self.n - 2):
-            temp[i] = np.roll(temp[i], self.n // 2 - 2 - i)
-        return temp
+        return self._gather(array, self._lower_pushback_idx)
 
     # Multiply by pseudotemperature and apply tanh
     def _mult_n_tanh(self, array: np.array):
 
+        if self.ladder is not None:
+            # One pseudotemperature per replica, broadcast over the p-bits
+            return np.tanh(self.T.reshape(self.batch_shape + (1,) * (array.ndim - 1)) * array)
+
         return np.tanh(self.T * array)
 
+    """
+    The following functions implement parallel tempering.
+
+    Replica r of ladder c sits at rung rung[r] and ladders[c, l] is the replica at rung l of ladder c. The
+    pseudotemperature multiplies the local fields, so it acts as an inverse temperature and states are weighted by
+    exp(-T E). Swapping the rungs of replicas r and s is accepted with probability min(1, exp((T_r - T_s)(E_r - E_s))).
+    """
+
+    def _init_ladder(self, pseudotemperatures):
+
+        self.ladder = np.sort(np.asarray(pseudotemperatures, dtype=np.float64))
+        rungs = len(self.ladder)
+
+        if self.replicas is None:
+            self.replicas = rungs
+            self.batch_shape = (rungs,)
+        elif self.replicas % rungs != 0:
+            raise ValueError(f"replicas={self.replicas} must be a multiple of the {rungs} pseudotemperatures")
+
+        self.ladders = np.arange(self.replicas).reshape(-1, rungs)
+        self.rung = np.tile(np.arange(rungs), len(self.ladders))
+        self.T = self.ladder[self.rung]
+
+        # Attempted and accepted swaps between rungs l and l + 1
+        self.swap_attempts = np.zeros(rungs - 1, dtype=np.int64)
+        self.swap_accepts = np.zeros(rungs - 1, dtype=np.int64)
+        self._swap_parity = 0
+
+    def _a_field_order(self, exact: bool):
+
+        """
+        The upper push lines the partial products of a_x up in column n/2 - 1 - x. The original fields read column x
+        into a_x and add the first bit to a_{n/2 - 1}, dynamics that follow no single energy but that solve plain
+        stochastic runs several times more often than the exact fields. The exact order reads column n/2 - 1 - x and
+        adds the first bit to a_0, matching Onizawa_Ising, so that the Metropolis swaps of tempering are correct.
+        """
+
+        cols = np.arange(self.n // 2)
+        if exact:
+            cols = cols[::-1]
+
+        return cols, int(np.flatnonzero(cols == self.n // 2 - 1)[0])
+
+    def energy(self) -> np.array:
+
+        # Energy of every replica in the explicit Ising model of the multiplier
+        if self._ising is None:
+            self._ising = Onizawa_Ising(self)
+
+        return self._ising.energy(self._ising.spins(self))
+
+    @profiled
+    def exchange(self):
+
+        """
+        Attempts Metropolis swaps between neighbouring rungs of every ladder, alternating between the even and the odd
+        pairs of rungs so that all the swaps of one call are independent of each other.
+        """
+
+        if self.ladder is None:
+            raise RuntimeError("parallel tempering is off, construct the multiplier with pseudotemperatures")
+
+        E = self.energy()
+
+        lower = np.arange(self._swap_parity, len(self.ladder) - 1, 2)
+        self._swap_parity ^= 1
+
+        r = self.ladders[:, lower]
+        s = self.ladders[:, lower + 1]
+
+        # Log acceptance of every swap, swapping when it beats the log of a uniform number
+        log_accept = (self.ladder[lower] - self.ladder[lower + 1]) * (E[r] - E[s])
+        accept = np.log(self.rng.random(r.shape)) < log_accept
+
+        self.ladders[:, lower] = np.where(accept, s, r)
+        self.ladders[:, lower + 1] = np.where(accept, r, s)
+
+        self.swap_attempts[lower] += len(self.ladders)
+        self.swap_accepts[lower] += np.sum(accept, axis=0)
+
+        # Move the pseudotemperatures with the swapped replicas
+        self.rung[self.ladders] = np.arange(len(self.ladder))
+        self.T = self.ladder[self.rung]
+
+    def swap_rates(self) -> np.array:
+
+        # Fraction of accepted swaps between every pair of neighbouring rungs
+        return self.swap_accepts / np.maximum(self.swap_attempts, 1)
+
+    def coldest(self) -> np.array:
+
+        # Replicas at the largest pseudotemperature, one per ladder
+        return self.ladders[:, -1]
+
+    @profiled
     def compute_activations(self):
 
         """
-        This function computes the activations of the p-bits in the multiplier. It does so by performing the following steps:
+        This function computes the activations of the p-bits in the multiplier by multiplying the local fields
+        from compute_fields by the pseudotemperature and taking the tanh.
+        """
+
+        a_A, a_B, a_C, a_Cio, a_Cor = self.compute_fields()
+
+        # Multiply everything by the pseudotemperature and take the tanh
+        with self._phase("compute_activations.tanh"):
+            return (
+                self._mult_n_tanh(a_A),
+                self._mult_n_tanh(a_B),
+                self._mult_n_tanh(a_C),
+                self._mult_n_tanh(a_Cio),
+                self._mult_n_tanh(a_Cor),
+            )
+
+    def compute_fields(self):
+
+        """
+        This function computes the local fields of the p-bits in the multiplier. It does so by performing the following steps:
 
         1. Isolates the partial products (right_iso) based on the shape of counters and partial_prods.
         2. Computes the activation of components A (a_A) and B (a_B) by applying upper_push and lower_push operations on right_iso, respectively.
@@ -202,102 +478,95 @@ class Onizawa_Multiplier:
         6. Computes the activation of the "or"-bits (a_cor) by procedurally generating or-gate weights and computing the "or_bin" output.
         7. Correctly attaches the "or"-gate output to the carry bits.
 
-        The function returns a tuple containing activations of components A, B, the first bit, partial product bits, carry bits, and "or"-bits.
+        The function returns a tuple containing the local fields of components A, B, the first bit, partial product bits, carry bits, and "or"-bits.
         """
 
-        # Isolate the partial products - called right iso because of its shape
-        right_iso = self.counters * self.partial_prods
-
-        # a_A and a_B are activations of the inputs A/B into an AND-Gate Array
+        with self._phase("compute_fields.rhombus"):
+            # Isolate the partial products - called right iso because of its shape
+            right_iso = self.counters * self.partial_prods
 
-        # Compute activation of A
-        a_A = (
-            2 * np.sum(self._upper_push(right_iso), axis=0)[: self.n // 2]
-            - np.sum(self.b)
-            + self.n // 2
-        )
-        a_A[-1] += 2 * self.first_bit
-
-        # Compute activation of B
-        a_B = (
-            2 * np.sum(self._lower_push(right_iso), axis=0)[: self.n // 2]
-            - np.sum(self.a)
-            + self.n // 2
-        )
-        a_B[0] += 2 * self.first_bit
-
-        # Compute the activation of partial product bits
-        self.a_rows = np.sum(self.counters * self.counter_J, axis=1).reshape(-1, 1)
-
-        # These are the outer products of a and b, aka. partial product activations
-        AB_outer = np.pad(
-            np.add.outer(self.a.T, self.b),
-            (
-                (0, self.n // 2 - 1),
-                (0, max([i[1] + i[2] for i in self.counter_dims]) - 1),
-            ),
-            "constant",
-        )
+            # a_A and a_B are activations of the inputs A/B into an AND-Gate Array
 
-        # Combine partial product activations and counter activations
+            # Compute activation of A, in the column order of _a_field_order
+            a_A = (
+                2 * np.sum(self._upper_push(right_iso), axis=-2)[..., self._a_cols]
+                - np.sum(self.b, axis=-1, keepdims=True)
+                + self.n // 2
+            )
+            a_A[..., self._a_first] += 2 * self.first_bit
 
-        # Bias terms are -2 from partial products and -1 from counters
-        # This gives the final bias terms as -3 for each partial product
-        a_C = (
-            self._lower_pushback(
-                (
-                    self._lower_push((self.a_rows + self.counters) * self.partial_prods)
-                    + 2 * self._square_to_lu_rhombus(AB_outer)
+            # Compute activation of B
+            a_B = (
+                2 * np.sum(self._lower_push(right_iso), axis=-2)[..., : self.n // 2]
+                - np.sum(self.a, axis=-1, keepdims=True)
+                + self.n // 2
+            )
+            a_B[..., 0] += 2 * self.first_bit
+
+            # Compute the activation of partial product bits
+            self.a_rows = np.sum(self.counters * self.counter_J, axis=-1)[..., np.newaxis]
+
+            # These are the outer products of a and b, aka. partial product activations
+            # Padded out to the full counter width so that it lines up with the counters
+            AB_outer = np.pad(
+                self.a[..., :, np.newaxis] + self.b[..., np.newaxis, :],
+                ((0, 0),) * len(self.batch_shape)
+                + (
+                    (0, self.n // 2 - 1),
+                    (0, self.counters.shape[-1] - self.n // 2),
                 ),
+                "constant",
             )
-            - 3 * self.partial_prods
-        )
 
-        # Compute the activation of the carry bits
-        a_Cio = []
+            # Combine partial product activations and counter activations
+
+            # Bias terms are -2 from partial products and -1 from counters
+            # This gives the final bias terms as -3 for each partial product
+            a_C = (
+                self._lower_pushback(
+                    (
+                        self._lower_push((self.a_rows + self.counters) * self.partial_prods)
+                        + 2 * self._square_to_lu_rhombus(AB_outer)
+                    ),
+                )
+                - 3 * self.partial_prods
+            )
 
-        for key, val in self.maps.items():
+        with self._phase("compute_fields.carry"):
+            a_rows = self.a_rows[..., 0]
 
-            current = self.counters[key[0], key[1]]
-            cio = (
+            # Compute the activation of the carry bits
+            current = self.counters[..., self.map_rows, self.map_cols]
+            a_Cio = (
                 # This segment reflects ordinary behavior from the carry cell
-                self.a_rows[val[0]]
+                a_rows[..., self.map_carry_rows]
                 + current
                 - 1
                 # This segment characterizes more complicated role as a counter cell
                 # I've checked this formula a number of times and it does do what it should do
-                - (2 ** key[2] * (self.a_rows[key[0]] - 2 ** key[2] * current - 1))
+                - (self.map_pows * (a_rows[..., self.map_rows] - self.map_pows * current - 1))
             )
 
-            a_Cio.append(cio[0])
+        with self._phase("compute_fields.or_gate"):
+            # Compute the activation of the "or"-bits
+            Cor = self.counters[..., self.or_rows, self.or_cols]
 
-        a_Cio = np.array(a_Cio)
+            # Compute "or_bin" output
+            a_Cor = Cor @ self.J_Cor.T - np.ones(len(self.or_bin))
 
-        # Compute the activation of the "or"-bits
-        Cor = []
-        for o in self.or_bin:
-            Cor.append(self.counters[o[0], o[1]])
+            # Correctly attach the "or"-gate output to the carry bits
+            a_Cor += -(self.or_pows * (a_rows[..., self.or_rows] - self.or_pows * Cor - 1))
+            a_Cor += 2 * self.last_bit
 
-        # Procedurally generate or-gate weights and compute "or_bin" output
-        J_Cor = np.eye(len(self.or_bin)) - 1
-
-        a_Cor = J_Cor @ np.array(Cor) - np.ones(len(self.or_bin))
-
-        # Correctly attach the "or"-gate output to the carry bits
-        for i, o in enumerate(self.or_bin):
-            current = self.counters[o[0], o[1]]
-            a_Cor[i] += -(2 ** o[2] * (self.a_rows[o[0]] - 2 ** o[2] * current - 1))
-            a_Cor[i] += 2 * self.last_bit
-
-        # Multiply everything by the pseudotemperature and take the tanh
         return (
-            self._mult_n_tanh(a_A),
-            self._mult_n_tanh(a_B),
-            self._mult_n_tanh(a_C),
-            self._mult_n_tanh(a_Cio),
-            self._mult_n_tanh(a_Cor),
+            a_A,
+            a_B,
+            a_C,
+            a_Cio,
+            a_Cor,
         )
 
+    @profiled
     def compute_gradients(self):
 
         """
@@ -314,92 +583,85 @@ class Onizawa_Multiplier:
         The function returns a tuple containing activations of components A, B, the first bit, partial product bits, carry bits, and "or"-bits.
         """
 
-        # Isolate the partial products - called right iso because of its shape
-        right_iso = self.counters * self.partial_prods
+        with self._phase("compute_gradients.rhombus"):
+            # Isolate the partial products - called right iso because of its shape
+            right_iso = self.counters * self.partial_prods
 
-        # a_A and a_B are activations of the inputs A/B into an AND-Gate Array
+            # a_A and a_B are activations of the inputs A/B into an AND-Gate Array
 
-        # Compute activation of A
-        a_A = (
-            np.sum(self._upper_push(right_iso), axis=0)[: self.n // 2]
-            - np.sum(self.b) / 2
-            + self.n // 2
-        )
-        a_A[-1] += self.first_bit
-
-        # Compute activation of B
-        a_B = (
-            np.sum(self._lower_push(right_iso), axis=0)[: self.n // 2]
-            - np.sum(self.a) / 2
-            + self.n // 2
-        )
-        a_B[0] += self.first_bit
-
-        # Compute the activation of partial product bits
-        self.a_rows = np.sum(self.counters * self.counter_J, axis=1).reshape(-1, 1)
-
-        # These are the outer products of a and b, aka. partial product activations
-        AB_outer = np.pad(
-            np.add.outer(self.a.T, self.b),
-            (
-                (0, self.n // 2 - 1),
-                (0, max([i[1] + i[2] for i in self.counter_dims]) - 1),
-            ),
-            "constant",
-        )
+            # Compute activation of A, in the column order of _a_field_order
+            a_A = (
+                np.sum(self._upper_push(right_iso), axis=-2)[..., self._a_cols]
+                - np.sum(self.b, axis=-1, keepdims=True) / 2
+                + self.n // 2
+            )
+            a_A[..., self._a_first] += self.first_bit
 
-        AB_outer *= self.and_temp
+            # Compute activation of B
+            a_B = (
+                np.sum(self._lower_push(right_iso), axis=-2)[..., : self.n // 2]
+                - np.sum(self.a, axis=-1, keepdims=True) / 2
+                + self.n // 2
+            )
+            a_B[..., 0] += self.first_bit
+
+            # Compute the activation of partial product bits
+            self.a_rows = np.sum(self.counters * self.counter_J, axis=-1)[..., np.newaxis]
+
+            # These are the outer products of a and b, aka. partial product activations
+            # Padded out to the full counter width so that it lines up with the counters
+            AB_outer = np.pad(
+                self.a[..., :, np.newaxis] + self.b[..., np.newaxis, :],
+                ((0, 0),) * len(self.batch_shape)
+                + (
+                    (0, self.n // 2 - 1),
+                    (0, self.counters.shape[-1] - self.n // 2),
+                ),
+                "constant",
+            )
 
-        # Combine partial product activations and counter activations
+            AB_outer *= self.and_temp
 
-        # Bias terms are -2 from partial products and -1 from counters
-        # This gives the final bias terms as -3 for each partial product
-        a_C = (
-            self._lower_pushback(
-                (
-                    self._lower_push((self.a_rows + self.counters) * self.partial_prods)
-                    + 2 * self._square_to_lu_rhombus(AB_outer)
-                ),
-            ) / 2
-            - 3 * self.partial_prods
-        )
+            # Combine partial product activations and counter activations
 
+            # Bias terms are -2 from partial products and -1 from counters
+            # This gives the final bias terms as -3 for each partial product
+            a_C = (
+                self._lower_pushback(
+                    (
+                        self._lower_push((self.a_rows + self.counters) * self.partial_prods)
+                        + 2 * self._square_to_lu_rhombus(AB_outer)
+                    ),
+                ) / 2
+                - 3 * self.partial_prods
+            )
 
-        # Compute the activation of the carry bits
-        a_Cio = []
 
-        for key, val in self.maps.items():
+        with self._phase("compute_gradients.carry"):
+            a_rows = self.a_rows[..., 0]
 
-            current = self.counters[key[0], key[1]]
-            cio = (
+            # Compute the activation of the carry bits
+            current = self.counters[..., self.map_rows, self.map_cols]
+            a_Cio = (
                 # This segment reflects ordinary behavior from the carry cell
-                self.a_rows[val[0]] / 2
+                a_rows[..., self.map_carry_rows] / 2
                 + current / 2
                 - 1
                 # This segment characterizes more complicated role as a counter cell
                 # I've checked this formula a number of times and it does do what it should do
-                - (2 ** key[2] * (self.a_rows[key[0]] / 2 - 2 ** ( key[2] - 1 ) * current - 1))
+                - (self.map_pows * (a_rows[..., self.map_rows] / 2 - self.map_pows / 2 * current - 1))
             )
 
-            a_Cio.append(cio[0])
-
-        a_Cio = np.array(a_Cio)
-
-        # Compute the activation of the "or"-bits
-        Cor = []
-        for o in self.or_bin:
-            Cor.append(self.counters[o[0], o[1]])
+        with self._phase("compute_gradients.or_gate"):
+            # Compute the activation of the "or"-bits
+            Cor = self.counters[..., self.or_rows, self.or_cols]
 
-        # Procedurally generate or-gate weights and compute "or_bin" output
-        J_Cor = np.eye(len(self.or_bin)) - 1
+            # Compute "or_bin" output
+            a_Cor = Cor @ self.J_Cor.T - np.ones(len(self.or_bin))
 
-        a_Cor = J_Cor @ np.array(Cor) - np.ones(len(self.or_bin))
-
-        # Correctly attach the "or"-gate output to the carry bits
-        for i, o in enumerate(self.or_bin):
-            current = self.counters[o[0], o[1]]
-            a_Cor[i] += -(2 ** o[2] * (self.a_rows[o[0]] / 2 - 2 ** ( o[2] - 1 ) * current - 1))
-            a_Cor[i] += self.last_bit
+            # Correctly attach the "or"-gate output to the carry bits
+            a_Cor += -(self.or_pows * (a_rows[..., self.or_rows] / 2 - self.or_pows / 2 * Cor - 1))
+            a_Cor += self.last_bit
 
         return (
             a_A,
@@ -409,72 +671,55 @@ class Onizawa_Multiplier:
             a_Cor,
         )
     
+    @profiled
     def descent(self, grad_a_A, grad_a_B, grad_a_C, grad_a_Cio, grad_a_Cor):
 
-        # Update timestep
-        self.timestep += 1
-
-        # Update bias-corrected first moment estimate for each activation
-        self.m_a_A = self.beta_1 * self.m_a_A + (1 - self.beta_1) * grad_a_A
-        self.m_a_B = self.beta_1 * self.m_a_B + (1 - self.beta_1) * grad_a_B
-        self.m_a_C = self.beta_1 * self.m_a_C + (1 - self.beta_1) * grad_a_C
-        self.m_a_Cio = self.beta_1 * self.m_a_Cio + (1 - self.beta_1) * grad_a_Cio
-        self.m_a_Cor = self.beta_1 * self.m_a_Cor + (1 - self.beta_1) * grad_a_Cor
-
-        # Update bias-corrected second raw moment estimate for each activation
-        self.v_a_A = self.beta_2 * self.v_a_A + (1 - self.beta_2) * np.square(grad_a_A)
-        self.v_a_B = self.beta_2 * self.v_a_B + (1 - self.beta_2) * np.square(grad_a_B)
-        self.v_a_C = self.beta_2 * self.v_a_C + (1 - self.beta_2) * np.square(grad_a_C)
-        self.v_a_Cio = self.beta_2 * self.v_a_Cio + (1 - self.beta_2) * np.square(grad_a_Cio)
-        self.v_a_Cor = self.beta_2 * self.v_a_Cor + (1 - self.beta_2) * np.square(grad_a_Cor)
-
-        # Compute bias-corrected estimates
-        m_a_A_corr = self.m_a_A / (1 - np.power(self.beta_1, self.timestep))
-        m_a_B_corr = self.m_a_B / (1 - np.power(self.beta_1, self.timestep))
-        m_a_C_corr = self.m_a_C / (1 - np.power(self.beta_1, self.timestep))
-        m_a_Cio_corr = self.m_a_Cio / (1 - np.power(self.beta_1, self.timestep))
-        m_a_Cor_corr = self.m_a_Cor / (1 - np.power(self.beta_1, self.timestep))
-
-        v_a_A_corr = self.v_a_A / (1 - np.power(self.beta_2, self.timestep))
-        v_a_B_corr = self.v_a_B / (1 - np.power(self.beta_2, self.timestep))
-        v_a_C_corr = self.v_a_C / (1 - np.power(self.beta_2, self.timestep))
-        v_a_Cio_corr = self.v_a_Cio / (1 - np.power(self.beta_2, self.timestep))
-        v_a_Cor_corr = self.v_a_Cor / (1 - np.power(self.beta_2, self.timestep))
-
-        # Calculate updated gradients
-        grad_a_A_updated = m_a_A_corr / (np.sqrt(v_a_A_corr) + self.epsilon)
-        grad_a_B_updated = m_a_B_corr / (np.sqrt(v_a_B_corr) + self.epsilon)
-        grad_a_C_updated = m_a_C_corr / (np.sqrt(v_a_C_corr) + self.epsilon)
-        grad_a_Cio_updated = m_a_Cio_corr / (np.sqrt(v_a_Cio_corr) + self.epsilon)
-        grad_a_Cor_updated = m_a_Cor_corr / (np.sqrt(v_a_Cor_corr) + self.epsilon)
-
-        # Use updated gradients to update class data structures
-        self.a += self.lr * grad_a_A_updated
-        self.b += self.lr * grad_a_B_updated
-
-        # Null out partial products and replace
-        self.counters *= 1 - self.partial_prods
-        self.counters += self.lr * grad_a_C_updated * self.partial_prods
-
-        # The remaining are a little more complicated
-        new_Cio = self.lr * grad_a_Cio_updated
-        new_Cor = self.lr * grad_a_Cor_updated
-
-        # Update the carry/counter bits
-        for idx, (count, carry) in enumerate(self.maps.items()):
-            self.counters[count[0], count[1]] += new_Cio[idx]
-            self.counters[carry[0], carry[1]] += new_Cio[idx]
-
-        # Update the carry-or bits
-        for idx, Cor in enumerate(self.or_bin):
-            self.counters[Cor[0], Cor[1]] += new_Cor[idx]
-
-        # Apply tanh to all activations
-        self.a = np.clip(self.a, -1, +1)
-        self.b = np.clip(self.b, -1, +1)
-        self.counters = np.clip(self.counters, -1, +1)
+        with self._phase("descent.adam"):
+            # Update timestep
+            self.timestep += 1
 
+            # Pack the gradients of the free p-bits into the flat gradient vector
+            g, m, v, step, scratch = self._grad, self.m, self.v, self._step, self._scratch
+            np.concatenate(
+                (
+                    grad_a_A,
+                    grad_a_B,
+                    grad_a_C.reshape(self.batch_shape + (-1,))[..., self._pp_flat],
+                    grad_a_Cio,
+                    grad_a_Cor,
+                ),
+                axis=-1,
+                out=g,
+            )
 
+            # Update biased first moment estimate
+            m *= self.beta_1
+            np.multiply(g, 1 - self.beta_1, out=scratch)
+            m += scratch
+
+            # Update biased second raw moment estimate
+            v *= self.beta_2
+            np.square(g, out=scratch)
+            scratch *= 1 - self.beta_2
+            v += scratch
+
+            # Bias-corrected step, lr * m_corr / (sqrt(v_corr) + epsilon)
+            np.divide(v, 1 - np.power(self.beta_2, self.timestep), out=scratch)
+            np.sqrt(scratch, out=scratch)
+            scratch += self.epsilon
+            np.divide(m, 1 - np.power(self.beta_1, self.timestep), out=step)
+            step /= scratch
+            step *= self.lr
+
+        with self._phase("descent.write_back"):
+            # Partial products are replaced, the other p-bits are incremented
+            self.state[..., self._set_dst] = step[..., self._set_src]
+            self.state[..., self._add_dst] += step[..., self._add_src]
+
+            # Keep every p-bit in [-1, +1]
+            np.clip(self.state, -1, +1, out=self.state)
+
+    @profiled
     def sample(self,a_A, a_B, a_C, a_Cio, a_Cor):
 
         """
@@ -485,40 +730,244 @@ class Onizawa_Multiplier:
         3. Complete the comparison and return the updated state of the multiplier.
         """
 
-        # Compute random numbers
-        r_A = np.random.uniform(-1, +1, size=self.a.shape)
-        r_B = np.random.uniform(-1, +1, size=self.b.shape)
-        r_C = np.random.uniform(-1, +1, size=self.partial_prods.shape)
-        r_Cio = np.random.uniform(-1, +1, size=len(a_Cio))
-        r_Cor = np.random.uniform(-1, +1, size=len(a_Cor))
+        with self._phase("sample.rng"):
+            # Take one random number per free p-bit from the pre-filled buffer, in the parameter vector layout
+            r = self.uniforms.draw(self.batch_shape + (self.param_size,))
+            r_A, r_B, r_C, r_Cio, r_Cor = np.split(r, self._param_splits, axis=-1)
+
+        with self._phase("sample.write_back"):
+            # Complete comparison, in place to keep a and b views of the state
+            np.sign(r_A + a_A, out=self.a)
+            np.sign(r_B + a_B, out=self.b)
+
+            # Replace the partial products
+            a_C = a_C.reshape(self.batch_shape + (-1,))[..., self._pp_flat]
+            self.state[..., self._set_dst] = np.sign(r_C + a_C)
 
-        # Complete comparison
-        self.a = np.sign(r_A + a_A)
-        self.b = np.sign(r_B + a_B)
+            # The remaining are a little more complicated
+            new_Cio = np.sign(r_Cio + a_Cio)
+            new_Cor = np.sign(r_Cor + a_Cor)
 
-        # Null out partial products and replace
-        self.counters *= 1 - self.partial_prods
-        self.counters += np.sign(r_C + a_C) * self.partial_prods
+            # Update the carry/counter bits
+            self.counters[..., self.map_rows, self.map_cols] = new_Cio
+            self.counters[..., self.map_carry_rows, self.map_carry_cols] = new_Cio
 
-        # The remaining are a little more complicated
-        new_Cio = np.sign(r_Cio + a_Cio)
-        new_Cor = np.sign(r_Cor + a_Cor)
+            # Update the carry-or bits
+            self.counters[..., self.or_rows, self.or_cols] = new_Cor
 
-        # Update the carry/counter bits
-        for idx, (count, carry) in enumerate(self.maps.items()):
-            self.counters[count[0], count[1]] = new_Cio[idx]
-            self.counters[carry[0], carry[1]] = new_Cio[idx]
+    def _record_iteration(self):
 
-        # Update the carry-or bits
-        for idx, Cor in enumerate(self.or_bin):
-            self.counters[Cor[0], Cor[1]] = new_Cor[idx]
+        # The explicit Ising model of the multiplier gives the energy and the gate checks
+        energy = self.energy()
+        violations = self._ising.violations(self)
+
+        # Averaged over the replicas when batched
+        self.profiler.record(
+            energy=np.mean(energy),
+            violations=np.mean(sum(violations.values())),
+            **{f"{gate}_violations": np.mean(count) for gate, count in violations.items()},
+            solved=np.mean(self.solved()),
+        )
+
+    def profile_summary(self, series: bool = False) -> dict:
+
+        """
+        Returns the per-phase wall time and call counts and the per-iteration energy and violated gate counts
+        collected since the multiplier was created, see Phase_Profiler.summary.
+        """
+
+        if self.profiler is None:
+            raise RuntimeError("profiling is off, construct the multiplier with profile=True")
+
+        return self.profiler.summary(series)
 
     def deterministic_iteration(self):
 
         a_A, a_B, a_C, a_Cio, a_Cor = self.compute_gradients()
         self.descent(a_A, a_B, a_C, a_Cio, a_Cor)
 
+        if self.profiler is not None:
+            self._record_iteration()
+
     def stochastic_iteration(self):
 
         a_A, a_B, a_C, a_Cio, a_Cor = self.compute_activations()
-        self.sample(a_A, a_B, a_C, a_Cio, a_Cor)
\ No newline at end of file
+        self.sample(a_A, a_B, a_C, a_Cio, a_Cor)
+
+        if self.profiler is not None:
+            self._record_iteration()
+
+    def _compile_kernel(self):
+
+        """
+        Compiles the local fields of the parameters into a CSR matrix over the flat state plus an offset, by evaluating
+        compute_fields on the zero state and on every unit state at once, since every field is affine in the state.
+        Also tabulates where each parameter reads its uniform number and which state cells it writes.
+        """
+
+        size = self.state.shape[-1]
+        half = self.n // 2
+
+        probes = np.vstack((np.zeros(size), np.eye(size)))
+        shadow = copy.copy(self)
+        shadow.batch_shape = (size + 1,)
+        shadow._phase = null_phase
+        shadow.a = probes[:, :half]
+        shadow.b = probes[:, half : 2 * half]
+        shadow.counters = probes[:, 2 * half :].reshape((size + 1,) + self.counters.shape[-2:])
+
+        a_A, a_B, a_C, a_Cio, a_Cor = Onizawa_Multiplier.compute_fields(shadow)
+        fields = np.concatenate((a_A, a_B, a_C.reshape(size + 1, -1)[:, self._pp_flat], a_Cio, a_Cor), axis=1)
+
+        offset = fields[0]
+        rows, cols = np.nonzero((fields[1:] - offset).T)
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=self.param_size))))
+        data = (fields[1:] - offset).T[rows, cols]
+
+        # Uniform numbers of a sweep are laid out as sample draws them, one parameter vector per replica
+        replicas = int(np.prod(self.batch_shape))
+        u_base = np.arange(self.param_size)
+        u_stride = np.full(self.param_size, self.param_size)
+        self._sweep_uniforms = replicas * self.param_size
+
+        # State cells written by every parameter, two for each carry bit
+        src = np.concatenate((self._set_src, self._add_src))
+        dst = np.concatenate((self._set_dst, self._add_dst))
+        order = np.argsort(src, kind="stable")
+        dst_ptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=self.param_size))))
+
+        self._kernel = (indptr, cols, data, offset, u_base, u_stride, dst_ptr, dst[order])
+
+    def run(self, sweeps: int, stop_when_solved: bool = True, recorder = None) -> int:
+
+        """
+        Runs up to sweeps stochastic iterations, stopping after the first one that solves a replica unless
+        stop_when_solved is False, and returns the number of iterations that were run. With a recorder, a
+        Sample_Recorder of the shape of state, the p-bits are recorded after every iteration.
+
+        The numba backend runs as many iterations per call as the current block of the buffer holds uniform numbers
+        for, drawn with draw_steps, so both backends take the same numbers and follow each other exactly.
+        """
+
+        if self.backend == "numpy":
+            for sweep in range(sweeps):
+                self.stochastic_iteration()
+                if recorder is not None:
+                    recorder.record(self.state)
+                if stop_when_solved and np.any(self.solved()):
+                    return sweep + 1
+            return sweeps
+
+        if self._kernel is None:
+            self._compile_kernel()
+
+        half = self.n // 2
+        state = self.state.reshape(-1, self.state.shape[-1])
+        T = np.ascontiguousarray(np.broadcast_to(self.T, state.shape[:1]), dtype=np.float64)
+
+        # Products past 62 bits are checked once the kernel returns
+        target = self.target if stop_when_solved and self.n <= 62 else -1
+
+        # One sweep per call when every sweep is recorded, or checked for a solution outside of the kernel
+        chunk = 1 if recorder is not None or (stop_when_solved and target < 0) else sweeps
+        done = 0
+
+        with self._phase("run"):
+            while done < sweeps:
+                uniforms = self.uniforms.draw_steps(self._sweep_uniforms, min(chunk, sweeps - done))
+                ran = onizawa_sweeps(
+                    state, T, *self._kernel, uniforms, np.arange(half), np.arange(half, 2 * half), target
+                )
+
+                # Hand back the numbers of the sweeps after the one that solved
+                self.uniforms.undraw((len(uniforms) - ran) * self._sweep_uniforms)
+                done += ran
+
+                if recorder is not None:
+                    recorder.record(self.state)
+
+                if ran < len(uniforms) or (stop_when_solved and np.any(self.solved())):
+                    break
+
+        return done
+
+    def tempering_iteration(self):
+
+        self.stochastic_iteration()
+        self.exchange()
+
+    """
+    The following functions implement checkpoints.
+    """
+
+    def get_state(self) -> dict:
+
+        # Everything an iteration reads that is not fixed by the constructor arguments
+        state = {
+            "kind": type(self).__name__,
+            "n": self.n,
+            "N": int(self.target),
+            "batch_shape": list(self.batch_shape),
+            "state": self.state,
+            "T": np.asarray(self.T, dtype=np.float64),
+            "m": self.m,
+            "v": self.v,
+            "timestep": int(self.timestep),
+        }
+
+        if self.ladder is not None:
+            state.update({
+                "ladder": self.ladder,
+                "ladders": self.ladders,
+                "swap_attempts": self.swap_attempts,
+                "swap_accepts": self.swap_accepts,
+                "swap_parity": int(self._swap_parity),
+            })
+
+        state.update(self.uniforms.get_state())
+
+        return state
+
+    def set_state(self, state: dict):
+
+        checkpoint.check(
+            state, kind=type(self).__name__, n=self.n, N=int(self.target), batch_shape=list(self.batch_shape)
+        )
+
+        # a, b and counters are views into the flat state, which is overwritten in place
+        self.state[...] = state["state"]
+        self.m[...] = state["m"]
+        self.v[...] = state["v"]
+        self.timestep = state["timestep"]
+        self.T = state["T"] if state["T"].ndim else float(state["T"])
+
+        if self.ladder is not None:
+            if not np.array_equal(state.get("ladder"), self.ladder):
+                raise ValueError("checkpoint was taken on a different ladder of pseudotemperatures")
+            self.ladders[...] = state["ladders"]
+            self.rung[self.ladders] = np.arange(len(self.ladder))
+            self.swap_attempts[...] = state["swap_attempts"]
+            self.swap_accepts[...] = state["swap_accepts"]
+            self._swap_parity = state["swap_parity"]
+
+        self.uniforms.set_state(state)
+
+    def save_checkpoint(self, path, **extra):
+
+        """
+        Saves the state of the multiplier to path, together with any extra JSON values, eg. the driver's progress.
+        """
+
+        checkpoint.save(path, {**self.get_state(), **{f"extra/{k}": v for k, v in extra.items()}})
+
+    def load_checkpoint(self, path) -> dict:
+
+        """
+        Restores a checkpoint taken from a multiplier built with the same arguments, so that it continues exactly
+        where the saved one stopped. Returns the extra values saved with it.
+        """
+
+        state = checkpoint.load(path)
+        self.set_state(state)
+
+        return {k[len("extra/") :]: v for k, v in state.items() if k.startswith("extra/")}
@@ -0,0 +1,186 @@
+import os
+import sys
+
+import numpy as np
+
+# Siblings in this directory and the shared modules at the top of the repository, wherever this is imported from
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (_here, os.path.dirname(_here)) if path not in sys.path)
+
+from sparse_ising import Sparse_Ising
+
+"""
+The following class lowers an Onizawa_Multiplier to an explicit sparse Ising model.
+
+The multiplier only encodes its couplings implicitly through counter_J, partial_prods, maps, or_bin and
+the hand-written activation formulas. Here the same network is built gate by gate:
+
+1. An AND gate between a_x, b_y and every partial product cell, and between a_0, b_0 and the first bit.
+2. A counter per row, with energy (a_row - 1)^2 / 2 where a_row is the counter_J weighted sum of the row.
+3. An OR gate between the "or"-bits with the last bit as its output.
+
+The free spins are laid out as [a, b, partial products, carry bits, "or"-bits], with each carry bit shared by
+the counter cell it leaves and the carry cell it enters. The clamped output bits are folded into the biases.
+"""
+
+
+class Onizawa_Ising(Sparse_Ising):
+    def __init__(self, multiplier):
+
+        m = multiplier
+        self.n = m.n
+
+        # Partial product cells in row-major order
+        self.pp_cells = np.argwhere(m.partial_prods > 0)
+
+        # Offsets of each group of spins
+        n_a = m.n // 2
+        n_pp = len(self.pp_cells)
+        self.groups = {
+            "A": slice(0, n_a),
+            "B": slice(n_a, 2 * n_a),
+            "C": slice(2 * n_a, 2 * n_a + n_pp),
+            "Cio": slice(2 * n_a + n_pp, 2 * n_a + n_pp + len(m.maps)),
+            "Cor": slice(2 * n_a + n_pp + len(m.maps), 2 * n_a + n_pp + len(m.maps) + len(m.or_bin)),
+        }
+        size = self.groups["Cor"].stop
+
+        # Map every counter cell to its spin, -1 for cells that are not free p-bits
+        cell_spin = -np.ones(m.counter_J.shape, dtype=int)
+        cell_spin[self.pp_cells[:, 0], self.pp_cells[:, 1]] = np.arange(self.groups["C"].start, self.groups["C"].stop)
+        cio = np.arange(self.groups["Cio"].start, self.groups["Cio"].stop)
+        cell_spin[m.map_rows, m.map_cols] = cio
+        cell_spin[m.map_carry_rows, m.map_carry_cols] = cio
+        cell_spin[m.or_rows, m.or_cols] = np.arange(self.groups["Cor"].start, self.groups["Cor"].stop)
+        self.cell_spin = cell_spin
+
+        rows, cols, vals = [], [], []
+        h = np.zeros(size)
+
+        def couple(i, j, w):
+            rows.extend([i, j])
+            cols.extend([j, i])
+            vals.extend([w, w])
+
+        # AND gates, the partial product of a_x and b_y is read off the rhombus transforms
+        square = m._square_to_lu_rhombus_idx.ravel()[m._lower_pushback_idx]
+        width = m.counter_J.shape[1]
+
+        # Inputs a_x and b_y of every partial product cell
+        self.pp_x, self.pp_y = np.divmod(square[self.pp_cells[:, 0], self.pp_cells[:, 1]], width)
+
+        for spin, x, y in zip(cell_spin[self.pp_cells[:, 0], self.pp_cells[:, 1]], self.pp_x, self.pp_y):
+            couple(x, n_a + y, -1)
+            couple(x, spin, 2)
+            couple(n_a + y, spin, 2)
+            h[[x, n_a + y]] += 1
+            h[spin] += -2
+
+        # The AND gate of a_0 and b_0 outputs the clamped first bit
+        couple(0, n_a, -1)
+        h[[0, n_a]] += 1 + 2 * m.first_bit
+
+        # Counters
+        for i in range(m.n - 2):
+
+            weights = m.counter_J[i]
+            members = np.nonzero(weights)[0]
+            free = members[cell_spin[i, members] >= 0]
+            fixed = members[cell_spin[i, members] < 0]
+
+            # Clamped output bits of the counter
+            clamp = np.sum(weights[fixed] * m.output[i + 1])
+
+            for k in free:
+                h[cell_spin[i, k]] += weights[k] * (1 - clamp)
+
+                for l in free:
+                    if l > k:
+                        couple(cell_spin[i, k], cell_spin[i, l], -weights[k] * weights[l])
+
+        # OR gate into the clamped last bit
+        ors = np.arange(self.groups["Cor"].start, self.groups["Cor"].stop)
+        for k in ors:
+            h[k] += -1 + 2 * m.last_bit
+            for l in ors:
+                if l > k:
+                    couple(k, l, -1)
+
+        coo = Sparse_Ising.from_coo(rows, cols, vals, h)
+        super().__init__(coo.indptr, coo.indices, coo.data, coo.h)
+
+    def spins(self, multiplier) -> np.array:
+
+        """
+        Reads the free p-bits of a multiplier into the flat spin layout, with a leading replica axis when batched.
+        """
+
+        m = multiplier
+        cells = m.counters[..., self.pp_cells[:, 0], self.pp_cells[:, 1]]
+
+        return np.concatenate(
+            (
+                m.a,
+                m.b,
+                cells,
+                m.counters[..., m.map_rows, m.map_cols],
+                m.counters[..., m.or_rows, m.or_cols],
+            ),
+            axis=-1,
+        )
+
+    def load(self, multiplier, s: np.array):
+
+        """
+        Writes a flat spin state back into the multiplier's a, b and counters.
+        """
+
+        m = multiplier
+        m.a[...] = s[..., self.groups["A"]]
+        m.b[...] = s[..., self.groups["B"]]
+
+        m.counters[..., self.pp_cells[:, 0], self.pp_cells[:, 1]] = s[..., self.groups["C"]]
+        m.counters[..., m.map_rows, m.map_cols] = s[..., self.groups["Cio"]]
+        m.counters[..., m.map_carry_rows, m.map_carry_cols] = s[..., self.groups["Cio"]]
+        m.counters[..., m.or_rows, m.or_cols] = s[..., self.groups["Cor"]]
+
+    def check(self, multiplier) -> dict:
+
+        """
+        Cross-checks the hand-derived local fields of the multiplier against the compiled model at the multiplier's
+        current state, returning the largest absolute deviation for each group of p-bits.
+        """
+
+        m = multiplier
+        compiled = self.fields(self.spins(m))
+
+        a_A, a_B, a_C, a_Cio, a_Cor = m.compute_fields()
+        a_C = a_C[..., self.pp_cells[:, 0], self.pp_cells[:, 1]]
+
+        return {
+            name: float(np.max(np.abs(hand - compiled[..., self.groups[name]]), initial=0.0))
+            for name, hand in zip(["A", "B", "C", "Cio", "Cor"], [a_A, a_B, a_C, a_Cio, a_Cor])
+        }
+
+    def violations(self, multiplier) -> dict:
+
+        """
+        Counts the gates of the multiplier whose logic is broken at its current state, reading every p-bit by its
+        sign, ie. AND gates whose partial product is not a_x AND b_y, counter rows whose input bits do not add up to
+        their output bits, and the OR gate into the last bit. Counts are per replica when batched.
+        """
+
+        m = multiplier
+        a, b = m.a > 0, m.b > 0
+        bits = m.counters > 0
+        cells = bits[..., self.pp_cells[:, 0], self.pp_cells[:, 1]]
+
+        gates = np.sum(cells != (a[..., self.pp_x] & b[..., self.pp_y]), axis=-1)
+        gates += (a[..., 0] & b[..., 0]) != (m.first_bit > 0)
+
+        # Inputs carry a weight of -1 and outputs 2^j, so a row adds up when the weighted bits sum to zero
+        counters = np.sum(np.sum(bits * m.counter_J, axis=-1) != 0, axis=-1)
+
+        ors = np.any(bits[..., m.or_rows, m.or_cols], axis=-1) != (m.last_bit > 0)
+
+        return {"AND": gates, "counter": counters, "OR": ors.astype(int)}
@@ -0,0 +1,124 @@
+import functools
+import time
+from collections import defaultdict
+
+import numpy as np
+
+"""
+The following class describes a lightweight phase profiler for the p-multipliers.
+
+Code is split into named phases with `with profiler.phase(name):` blocks, and each block adds its wall time and a call
+to that phase's totals. Phases may nest, in which case the outer phase's time includes the inner ones. Alongside the
+phases, per-iteration counters such as the energy or the number of violated constraints are appended to a series.
+
+When profiling is turned off the solvers use `null_phase` instead, which hands back one shared do-nothing context, so
+the instrumented code pays a function call and an empty with block per phase and nothing else.
+"""
+
+
+class _Phase:
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.seconds[self.name] += time.perf_counter() - self.start
+        self.profiler.calls[self.name] += 1
+        return False
+
+
+class _Null_Phase:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _Null_Phase()
+
+
+def null_phase(name: str):
+    return _NULL_PHASE
+
+
+def profiled(method):
+
+    # Times a whole method as a phase named after it, through the instance's _phase
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._phase(name):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Phase_Profiler:
+    def __init__(self):
+
+        # Accumulated wall time and call count of every phase
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+        # One value per iteration for every counter
+        self.series = defaultdict(list)
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def record(self, **values):
+
+        # Append one value to each named per-iteration counter
+        for name, value in values.items():
+            self.series[name].append(float(value))
+
+    def reset(self):
+
+        self.seconds.clear()
+        self.calls.clear()
+        self.series.clear()
+
+    def summary(self, series: bool = False) -> dict:
+
+        """
+        Returns the totals of every phase, sorted by time spent, and the first, last, min, mean and max of every
+        per-iteration counter, as plain Python types that can be dumped to JSON. Passing series=True also includes
+        the full per-iteration values.
+        """
+
+        phases = {
+            name: {
+                "calls": self.calls[name],
+                "seconds": self.seconds[name],
+                "mean_us": 1e6 * self.seconds[name] / self.calls[name],
+            }
+            for name in sorted(self.seconds, key=self.seconds.get, reverse=True)
+        }
+
+        counters = {}
+        for name, values in self.series.items():
+            values = np.asarray(values)
+            counters[name] = {
+                "iterations": len(values),
+                "first": float(values[0]),
+                "last": float(values[-1]),
+                "min": float(np.min(values)),
+                "mean": float(np.mean(values)),
+                "max": float(np.max(values)),
+            }
+            if series:
+                counters[name]["series"] = values.tolist()
+
+        return {"phases": phases, "counters": counters}
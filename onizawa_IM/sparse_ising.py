@@ -0,0 +1,184 @@
+import os
+import sys
+
+import numpy as np
+
+# Siblings in this directory and the shared modules at the top of the repository, wherever this is imported from
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (_here, os.path.dirname(_here)) if path not in sys.path)
+
+from random_buffer import Uniform_Buffer
+
+"""
+The following classes describe an explicit sparse Ising model and a generic p-bit sampler for it.
+
+The couplings are held in compressed sparse row (CSR) form, ie. the non-zero couplings of spin i are
+data[indptr[i]:indptr[i+1]] to the spins indices[indptr[i]:indptr[i+1]], so that the local fields
+I = J s + h of a whole batch of states are a single gather and segmented sum.
+"""
+
+
+class Sparse_Ising:
+    def __init__(self, indptr: np.array, indices: np.array, data: np.array, h: np.array):
+
+        # CSR representation of the symmetric coupling matrix J
+        self.indptr = np.asarray(indptr, dtype=int)
+        self.indices = np.asarray(indices, dtype=int)
+        self.data = np.asarray(data, dtype=np.float64)
+
+        # Biases
+        self.h = np.asarray(h, dtype=np.float64)
+
+        # Number of spins
+        self.size = len(self.h)
+
+        if len(self.indptr) != self.size + 1:
+            raise ValueError(f"indptr has {len(self.indptr)} entries, expected {self.size + 1}")
+
+    @classmethod
+    def from_coo(cls, rows: np.array, cols: np.array, vals: np.array, h: np.array):
+
+        """
+        Builds the model from (row, col, value) triplets, summing duplicate entries and dropping zeros.
+        """
+
+        size = len(h)
+        rows = np.asarray(rows, dtype=int)
+        cols = np.asarray(cols, dtype=int)
+        vals = np.asarray(vals, dtype=np.float64)
+
+        # Sum duplicates by collapsing each (row, col) pair to one flat key
+        keys, inverse = np.unique(rows * size + cols, return_inverse=True)
+        summed = np.bincount(inverse.ravel(), weights=vals, minlength=len(keys))
+
+        keep = summed != 0
+        keys, summed = keys[keep], summed[keep]
+
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(keys // size, minlength=size))))
+
+        return cls(indptr, keys % size, summed, h)
+
+    @classmethod
+    def from_dense(cls, J: np.array, h: np.array):
+
+        rows, cols = np.nonzero(J)
+
+        return cls.from_coo(rows, cols, J[rows, cols], h)
+
+    def to_dense(self) -> np.array:
+
+        J = np.zeros((self.size, self.size))
+        rows = np.repeat(np.arange(self.size), np.diff(self.indptr))
+        J[rows, self.indices] = self.data
+
+        return J
+
+    def submodel(self, rows: np.array):
+
+        """
+        Returns the CSR arrays (indptr, indices, data) of the couplings of the given rows only, so that
+        the fields of a block of spins can be updated without touching the rest of the matrix.
+        """
+
+        rows = np.asarray(rows, dtype=int)
+        starts, stops = self.indptr[rows], self.indptr[rows + 1]
+        picks = np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)] + [np.zeros(0, dtype=int)])
+
+        indptr = np.concatenate(([0], np.cumsum(stops - starts)))
+
+        return indptr, self.indices[picks], self.data[picks]
+
+    def _segment_sum(self, contrib: np.array, indptr: np.array) -> np.array:
+
+        # Sum each row's slice of contrib, with empty rows summing to zero
+        empty = np.diff(indptr) == 0
+        padded = np.concatenate((contrib, np.zeros(contrib.shape[:-1] + (1,))), axis=-1)
+        out = np.add.reduceat(padded, np.minimum(indptr[:-1], contrib.shape[-1]), axis=-1)
+        out[..., empty] = 0
+
+        return out
+
+    def fields(self, s: np.array, rows: np.array = None) -> np.array:
+
+        """
+        Computes the local fields I = J s + h for a state, or a batch of states along leading axes.
+        If rows is given only the fields of those spins are computed.
+        """
+
+        if rows is None:
+            indptr, indices, data = self.indptr, self.indices, self.data
+            h = self.h
+        else:
+            indptr, indices, data = self.submodel(rows)
+            h = self.h[rows]
+
+        return self._segment_sum(data * s[..., indices], indptr) + h
+
+    def energy(self, s: np.array) -> np.array:
+
+        """
+        Computes the Ising energy E = -1/2 s.J.s - h.s of a state, or a batch of states.
+        """
+
+        return -0.5 * np.sum(s * (self.fields(s) + self.h), axis=-1)
+
+
+class Sparse_PBit_Sampler:
+    def __init__(self, model: Sparse_Ising, pseudotemperature: float = 1.0, replicas: int = None,
+                 blocks: list = None, clamped: dict = None, rng = None):
+
+        """
+        A generic p-bit sampler over a Sparse_Ising model.
+
+        blocks is a list of arrays of spin indices that are updated one after the other within a step,
+        by default all spins form a single block and are updated synchronously. clamped maps spin
+        indices to fixed values that are never resampled. rng is a np.random.Generator or a seed for one.
+        """
+
+        self.model = model
+        self.T = pseudotemperature
+
+        self.replicas = replicas
+        self.batch_shape = () if replicas is None else (replicas,)
+
+        # Uniform numbers in [-1, +1) for sampling, drawn from the sampler's own generator
+        self.uniforms = Uniform_Buffer(rng, -1.0, +1.0)
+        self.rng = self.uniforms.rng
+
+        # Randomly initialize the spins
+        self.s = self.rng.choice([-1, +1], size=self.batch_shape + (model.size,)).astype(np.float64)
+
+        # Clamped spins are held at their value and left out of every block
+        self.clamped = {} if clamped is None else dict(clamped)
+        for idx, val in self.clamped.items():
+            self.s[..., idx] = val
+
+        free = np.ones(model.size, dtype=bool)
+        free[list(self.clamped.keys())] = False
+
+        if blocks is None:
+            blocks = [np.arange(model.size)]
+
+        # Precompute the row slices of J for every block
+        self.blocks = []
+        for block in blocks:
+            block = np.asarray(block, dtype=int)
+            block = block[free[block]]
+            self.blocks.append((block,) + model.submodel(block))
+
+    def step(self):
+
+        """
+        Updates every block in turn by comparing tanh of the scaled local field with uniform noise.
+        """
+
+        for block, indptr, indices, data in self.blocks:
+
+            I = self.model._segment_sum(data * self.s[..., indices], indptr) + self.model.h[block]
+            r = self.uniforms.draw(self.batch_shape + (len(block),))
+
+            self.s[..., block] = np.sign(np.tanh(self.T * I) + r)
+
+    def energy(self) -> np.array:
+
+        return self.model.energy(self.s)
@@ -0,0 +1,234 @@
+import numpy as np
+import pytest
+
+from folded_onizawa_pmultiplier import Onizawa_Multiplier
+from random_buffer import Uniform_Buffer
+
+
+class Recording_Buffer(Uniform_Buffer):
+
+    # Keeps a copy of every chunk as it is handed out
+    def draw(self, shape):
+        chunk = super().draw(shape)
+        self.chunks.append(chunk.copy())
+        return chunk
+
+
+def test_sample_across_a_block_boundary():
+
+    # Blocks of a step and a half, so that every other step crosses into a new block
+    m = Onizawa_Multiplier(12, 35 * 37, rng=0, replicas=3)
+    m.uniforms = Recording_Buffer(0, -1.0, +1.0, block_size=3 * m.param_size * 3 // 2)
+    m.uniforms.chunks = []
+
+    for _ in range(6):
+        fields = m.compute_activations()
+        m.sample(*fields)
+
+        # Every p-bit is the sign of its own uniform number plus its activation
+        r = m.uniforms.chunks[-1]
+        a_A, a_B, a_C, a_Cio, a_Cor = fields
+        a_C = a_C.reshape(3, -1)[:, m._pp_flat]
+        expected = np.sign(r + np.concatenate((a_A, a_B, a_C, a_Cio, a_Cor), axis=-1))
+
+        state = np.zeros_like(expected)
+        state[:, m._set_src] = m.state[:, m._set_dst]
+        state[:, m._add_src] = m.state[:, m._add_dst]
+        np.testing.assert_array_equal(state, expected)
+
+
+def test_one_uniform_per_free_pbit():
+
+    m = Onizawa_Multiplier(16, 251 * 241, rng=1, replicas=2)
+    m.uniforms = Recording_Buffer(1, -1.0, +1.0)
+    m.uniforms.chunks = []
+    m.stochastic_iteration()
+
+    assert [chunk.shape for chunk in m.uniforms.chunks] == [(2, m.param_size)]
+
+
+@pytest.mark.parametrize("kwargs, iteration", [
+    ({"replicas": 3}, "stochastic_iteration"),
+    ({"replicas": 3}, "deterministic_iteration"),
+    ({"pseudotemperatures": [0.5, 0.75, 1.0]}, "tempering_iteration"),
+])
+def test_resume_from_checkpoint(tmp_path, kwargs, iteration):
+
+    # A multiplier restored halfway continues exactly as the saved one, whatever generator it was built with
+    path = str(tmp_path / "onizawa.npz")
+    m = Onizawa_Multiplier(12, 35 * 37, rng=0, **kwargs)
+    for _ in range(7):
+        getattr(m, iteration)()
+    m.save_checkpoint(path, sweep=7)
+
+    restored = Onizawa_Multiplier(12, 35 * 37, rng=1, **kwargs)
+    assert restored.load_checkpoint(path) == {"sweep": 7}
+
+    for _ in range(11):
+        getattr(m, iteration)()
+        getattr(restored, iteration)()
+
+    np.testing.assert_array_equal(restored.state, m.state)
+    np.testing.assert_array_equal(restored.m, m.m)
+
+
+def test_resume_numba_run(tmp_path):
+
+    pytest.importorskip("numba")
+
+    path = str(tmp_path / "onizawa.npz")
+    m = Onizawa_Multiplier(12, 35 * 37, rng=0, replicas=2, backend="numba")
+    m.run(5, stop_when_solved=False)
+    m.save_checkpoint(path)
+
+    restored = Onizawa_Multiplier(12, 35 * 37, rng=1, replicas=2, backend="numba")
+    restored.load_checkpoint(path)
+    m.run(20, stop_when_solved=False)
+    restored.run(20, stop_when_solved=False)
+
+    np.testing.assert_array_equal(restored.state, m.state)
+
+
+def test_checkpoint_of_another_multiplier(tmp_path):
+
+    path = str(tmp_path / "onizawa.npz")
+    Onizawa_Multiplier(12, 35 * 37, rng=0).save_checkpoint(path)
+
+    with pytest.raises(ValueError):
+        Onizawa_Multiplier(12, 35 * 41, rng=0).load_checkpoint(path)
+
+
+@pytest.mark.parametrize("n, N, replicas", [(8, 143, 4), (12, 35 * 37, None), (16, 251 * 241, 2)])
+def test_numba_run_matches_numpy(n, N, replicas):
+
+    # Both backends take the same uniform numbers, as long as the sweeps fit in one block of the buffer
+    pytest.importorskip("numba")
+
+    runs = [Onizawa_Multiplier(n, N, rng=0, replicas=replicas, backend=backend) for backend in ("numpy", "numba")]
+    for m in runs:
+        m.run(60, stop_when_solved=False)
+
+    np.testing.assert_array_equal(runs[1].state, runs[0].state)
+
+
+def test_plain_fields_of_A_keep_the_original_order():
+
+    # Column x of the upper push into a_x and the first bit into the last entry, as the original multiplier did
+    m = Onizawa_Multiplier(12, 35 * 37, rng=0, replicas=3)
+    m.stochastic_iteration()
+    half = m.n // 2
+
+    expected = 2 * np.sum(m._upper_push(m.counters * m.partial_prods), axis=-2)[..., :half]
+    expected += half - np.sum(m.b, axis=-1, keepdims=True)
+    expected[..., -1] += 2 * m.first_bit
+
+    np.testing.assert_array_equal(m.compute_fields()[0], expected)
+
+
+def test_plain_runs_keep_their_solve_rate():
+
+    # Regression check of the plain stochastic dynamics, the original A fields solve 335 replica-sweeps here against
+    # 69 with the exact fields that tempering uses
+    m = Onizawa_Multiplier(8, 143, pseudotemperature=0.3, replicas=64, rng=0)
+
+    hits = 0
+    for _ in range(2000):
+        m.stochastic_iteration()
+        hits += int(np.sum(m.solved()))
+
+    assert hits >= 200
+
+
+@pytest.mark.parametrize("stop_when_solved", [False, True])
+def test_numba_run_matches_numpy_across_blocks(stop_when_solved):
+
+    # Blocks of two and a half sweeps, so that the kernel gets one or two sweeps per call and stops inside a block
+    pytest.importorskip("numba")
+
+    runs = []
+    for backend in ("numpy", "numba"):
+        m = Onizawa_Multiplier(8, 143, rng=0, replicas=4, backend=backend)
+        m.uniforms = Uniform_Buffer(0, -1.0, +1.0, block_size=5 * 4 * m.param_size // 2)
+        runs.append((m, m.run(200, stop_when_solved=stop_when_solved)))
+
+    (numpy, ran), (numba, numba_ran) = runs
+    assert numba_ran == ran
+    np.testing.assert_array_equal(numba.state, numpy.state)
+
+    # Both continue from the same place in the stream
+    np.testing.assert_array_equal(numba.uniforms.draw(7), numpy.uniforms.draw(7))
+
+
+def _random_state(m, seed):
+
+    # Continuous p-bits, so that every coefficient of the fields shows
+    m.state[...] = np.random.default_rng(seed).uniform(-1, 1, m.state.shape)
+
+
+@pytest.mark.parametrize("n, N", [(8, 143), (12, 35 * 37), (16, 251 * 241)])
+def test_carry_and_or_fields_match_the_maps(n, N):
+
+    # The index tables give the fields that the original loops over maps and or_bin did
+    m = Onizawa_Multiplier(n, N, rng=0)
+    _random_state(m, n)
+    _, _, _, a_Cio, a_Cor = m.compute_fields()
+    rows = np.sum(m.counters * m.counter_J, axis=-1)
+
+    expected = [
+        rows[carry[0]] + m.counters[count[0], count[1]] - 1
+        - 2 ** count[2] * (rows[count[0]] - 2 ** count[2] * m.counters[count[0], count[1]] - 1)
+        for count, carry in m.maps.items()
+    ]
+    np.testing.assert_allclose(a_Cio, expected)
+
+    ors = np.array([m.counters[o[0], o[1]] for o in m.or_bin])
+    expected = (np.eye(len(ors)) - 1) @ ors - 1 + 2 * m.last_bit
+    expected -= [2 ** o[2] * (rows[o[0]] - 2 ** o[2] * m.counters[o[0], o[1]] - 1) for o in m.or_bin]
+    np.testing.assert_allclose(a_Cor, expected)
+
+
+def test_carry_bits_are_written_to_both_cells():
+
+    m = Onizawa_Multiplier(16, 251 * 241, rng=0, replicas=3)
+    for _ in range(5):
+        m.stochastic_iteration()
+        for count, carry in m.maps.items():
+            np.testing.assert_array_equal(m.counters[:, count[0], count[1]], m.counters[:, carry[0], carry[1]])
+
+
+def _rolled(m, name, array):
+
+    # The rhombus transforms as the original multiplier wrote them, with np.roll on a single state
+    half, temp = m.n // 2, array.copy()
+
+    if name == "_lower_push":
+        for i in range(half - 2, m.n - 2):
+            temp[i] = np.roll(temp[i], i - half + 2)
+    elif name == "_upper_push":
+        for i in range(half - 2):
+            temp[i] = np.roll(temp[i], half - 2 - i)
+    elif name == "_lower_pushback":
+        for i in range(half - 2, m.n - 2):
+            temp[i] = np.roll(temp[i], half - 2 - i)
+    else:
+        for i in range(half):
+            temp[:, i] = np.roll(temp[:, i], i)
+        temp = temp[1:]
+
+    return temp
+
+
+@pytest.mark.parametrize("n", [8, 12, 16, 24])
+@pytest.mark.parametrize("name", ["_lower_push", "_upper_push", "_lower_pushback", "_square_to_lu_rhombus"])
+def test_rhombus_transforms_match_rolls(n, name):
+
+    m = Onizawa_Multiplier(n, rng=0)
+    rows, cols = m.counters.shape
+    rng = np.random.default_rng(n)
+
+    # The square has one more row than the counters
+    batch = rng.normal(size=(3, rows + (name == "_square_to_lu_rhombus"), cols))
+    transformed = getattr(m, name)(batch)
+
+    for array, result in zip(batch, transformed):
+        np.testing.assert_array_equal(result, _rolled(m, name, array))
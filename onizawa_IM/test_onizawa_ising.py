@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from folded_onizawa_pmultiplier import Onizawa_Multiplier
+from onizawa_ising import Onizawa_Ising
+
+
+@pytest.mark.parametrize("n, N", [(8, 143), (12, 35 * 37), (16, 251 * 241)])
+def test_fields_match_compiled_model(n, N):
+
+    # Under tempering, the hand-written fields that sample() uses are the local fields of the Ising model behind energy()
+    m = Onizawa_Multiplier(n, N, rng=0, replicas=4, pseudotemperatures=[0.5, 1.0])
+    ising = Onizawa_Ising(m)
+
+    for _ in range(5):
+        m.tempering_iteration()
+        assert all(deviation == 0.0 for deviation in ising.check(m).values())
+
+
+def test_plain_fields_differ_only_on_A():
+
+    # Without tempering, the fields of A keep their original order, everything else still matches the model
+    m = Onizawa_Multiplier(12, 35 * 37, rng=0, replicas=4)
+    m.stochastic_iteration()
+    deviations = Onizawa_Ising(m).check(m)
+
+    assert deviations.pop("A") > 0
+    assert all(deviation == 0.0 for deviation in deviations.values())
+
+
+def test_energy_changes_follow_sampled_fields():
+
+    # Flipping one p-bit changes the energy used by exchange() by 2 s_i times the field that sample() sees
+    m = Onizawa_Multiplier(12, 35 * 37, rng=1, pseudotemperatures=[0.5, 1.0])
+    m.tempering_iteration()
+    ising = Onizawa_Ising(m)
+    s = ising.spins(m)
+    E = ising.energy(s)
+
+    a_A, a_B, a_C, a_Cio, a_Cor = m.compute_fields()
+    a_C = a_C[..., ising.pp_cells[:, 0], ising.pp_cells[:, 1]]
+    fields = np.concatenate((a_A, a_B, a_C, a_Cio, a_Cor), axis=-1)
+
+    for i in range(s.shape[-1]):
+        flipped = s.copy()
+        flipped[..., i] *= -1
+        np.testing.assert_allclose(ising.energy(flipped) - E, 2 * s[..., i] * fields[..., i])
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+
+from folded_onizawa_pmultiplier import Onizawa_Multiplier
+from profiler import Phase_Profiler, null_phase
+
+
+def test_phases_accumulate_and_nest():
+
+    profiler = Phase_Profiler()
+    for _ in range(3):
+        with profiler.phase("outer"):
+            with profiler.phase("inner"):
+                pass
+
+    summary = profiler.summary()["phases"]
+    assert summary["outer"]["calls"] == summary["inner"]["calls"] == 3
+    assert summary["outer"]["seconds"] >= summary["inner"]["seconds"]
+    assert list(summary) == ["outer", "inner"]
+
+
+def test_counters_and_reset():
+
+    profiler = Phase_Profiler()
+    for value in (3, 1, 2):
+        profiler.record(energy=value)
+
+    counters = profiler.summary(series=True)["counters"]["energy"]
+    assert (counters["first"], counters["last"], counters["min"], counters["max"]) == (3, 2, 1, 3)
+    assert counters["mean"] == 2 and counters["series"] == [3, 1, 2]
+
+    profiler.reset()
+    assert profiler.summary() == {"phases": {}, "counters": {}}
+
+
+def test_null_phase_is_shared():
+    assert null_phase("a") is null_phase("b")
+
+
+def test_multiplier_profile():
+
+    # Every iteration is timed by phase and records its energy and gate counts, as JSON
+    m = Onizawa_Multiplier(12, 35 * 37, rng=0, replicas=4, profile=True)
+    for _ in range(5):
+        m.stochastic_iteration()
+
+    summary = json.loads(json.dumps(m.profile_summary()))
+    assert {"compute_activations", "compute_fields.carry", "sample", "sample.rng"} <= set(summary["phases"])
+    assert all(phase["calls"] == 5 for phase in summary["phases"].values())
+    assert summary["counters"]["energy"]["iterations"] == 5
+    assert summary["counters"]["violations"]["min"] >= 0
+
+
+def test_profiling_does_not_change_the_chain():
+
+    runs = [Onizawa_Multiplier(12, 35 * 37, rng=0, replicas=4, profile=profile) for profile in (False, True)]
+    for m in runs:
+        for _ in range(5):
+            m.stochastic_iteration()
+
+    np.testing.assert_array_equal(runs[0].state, runs[1].state)
+
+    with pytest.raises(RuntimeError):
+        runs[0].profile_summary()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from sparse_ising import Sparse_Ising, Sparse_PBit_Sampler
+
+
+def _random_model(size, seed):
+
+    # Symmetric couplings with a few spins left uncoupled
+    rng = np.random.default_rng(seed)
+    J = np.triu(rng.integers(-2, 3, size=(size, size)) * (rng.random((size, size)) < 0.3), 1)
+    J[:, :2] = J[:2, :] = 0
+    return J + J.T, rng.normal(size=size)
+
+
+def test_from_coo_sums_duplicates():
+
+    model = Sparse_Ising.from_coo([0, 0, 1, 1, 2], [1, 1, 0, 2, 1], [1.0, 2.0, 3.0, -1.0, 0.0], np.zeros(3))
+    np.testing.assert_array_equal(model.to_dense(), [[0, 3, 0], [3, 0, -1], [0, 0, 0]])
+
+
+def test_fields_and_energy_match_dense():
+
+    J, h = _random_model(12, 0)
+    model = Sparse_Ising.from_dense(J, h)
+    s = np.random.default_rng(1).choice([-1.0, 1.0], size=(5, 12))
+
+    # Rows without couplings, 0 and 1, get only their bias
+    np.testing.assert_allclose(model.fields(s), s @ J + h)
+    np.testing.assert_allclose(model.fields(s, rows=[1, 4, 7]), (s @ J + h)[:, [1, 4, 7]])
+    np.testing.assert_allclose(model.energy(s), -0.5 * np.einsum("ri,ij,rj->r", s, J, s) - s @ h)
+
+
+def test_sampler_keeps_clamps():
+
+    J, h = _random_model(10, 2)
+    sampler = Sparse_PBit_Sampler(Sparse_Ising.from_dense(J, h), replicas=3, blocks=[range(5), range(5, 10)],
+                                  clamped={3: -1, 8: 1}, rng=0)
+    for _ in range(20):
+        sampler.step()
+
+    assert np.all(sampler.s[:, 3] == -1) and np.all(sampler.s[:, 8] == 1)
+    assert set(np.unique(sampler.s)) <= {-1.0, 1.0}
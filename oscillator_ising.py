@@ -0,0 +1,272 @@
+"""
+This module packages the oscillator Ising machine of the Wang-Roychowdhury notebook as a batched engine.
+
+Every oscillator follows the inhomogeneous Kuramoto model
+
+    d theta_i / dt = - K sum_j J_ij sin(theta_i - theta_j),
+
+which minimizes E = - K sum_ij J_ij cos(theta_i - theta_j), the Ising energy once phases settle at 0 (+1) or pi (-1).
+Biases are folded into J with one extra oscillator held at phase 0, see augment.
+
+Rather than building the (n, n) matrix of sin(theta_i - theta_j) every step, the coupling is expanded as
+
+    sum_j J_ij sin(theta_i - theta_j) = sin(theta_i) (J cos theta)_i - cos(theta_i) (J sin theta)_i,
+
+so a step is two products with J, which is either a dense matrix or a Sparse_Ising for multiplier sized networks.
+Phases carry any number of leading batch axes, eg. thousands of initial conditions or input combinations of a gate,
+and several different gates integrate together as one block diagonal J. Clamped oscillators are held where they are
+put, per replica if need be. Trajectories go into one preallocated buffer, every record_every steps, instead of a list,
+or as bit-packed spins into a Sample_Recorder for runs too long to keep in memory.
+
+Attributes:
+    theta (numpy.array): Phases, of shape batch_shape + (n,).
+    clamped (numpy.array): Mask of the oscillators that are held, broadcastable to theta.
+    t (float): Time integrated so far.
+    dt (float): Time step, adapted by the rk45 method.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# The sparse Ising model lives with the Onizawa multiplier
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend(path for path in (os.path.join(_here, "onizawa_IM"),) if path not in sys.path)
+
+from sparse_ising import Sparse_Ising
+
+# Dormand-Prince 5(4) tableau
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_DP_E = np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+
+METHODS = ("euler", "rk4", "rk45")
+
+
+def bin2phase(bits) -> np.array:
+
+    # 1 is phase 0 and 0 is phase pi
+    bits = np.asarray(bits)
+    if np.any((bits != 0) & (bits != 1)):
+        raise ValueError("Only 0/1 allowed!")
+
+    return (1 - bits) * np.pi
+
+
+def phase2spin(theta: np.array) -> np.array:
+
+    # Rounds phases to the nearest of 0 (+1) and pi (-1)
+    return np.where(np.cos(theta) >= 0, 1, -1).astype(np.int8)
+
+
+def augment(J: np.array, h: np.array) -> np.array:
+
+    """
+    Folds the biases into a bias-free coupling matrix over one extra oscillator, which must be held at phase 0:
+
+        J' = [[2 J, h], [h^T, 0]]
+    """
+
+    J = np.asarray(J, dtype=float)
+    h = np.asarray(h, dtype=float).reshape(-1, 1)
+
+    return np.block([[2 * J, h], [h.T, np.zeros((1, 1))]])
+
+
+def block_diagonal(Js: list) -> Sparse_Ising:
+
+    """
+    Stacks several gates into one sparse block diagonal network, so that they integrate together. The oscillators of
+    gate k start at the sum of the sizes of the gates before it.
+    """
+
+    rows, cols, vals = [], [], []
+    offset = 0
+
+    for J in Js:
+        J = J.to_dense() if isinstance(J, Sparse_Ising) else np.asarray(J, dtype=float)
+        r, c = np.nonzero(J)
+        rows.append(r + offset)
+        cols.append(c + offset)
+        vals.append(J[r, c])
+        offset += len(J)
+
+    return Sparse_Ising.from_coo(np.concatenate(rows), np.concatenate(cols), np.concatenate(vals), np.zeros(offset))
+
+
+class Kuramoto_Ising:
+    def __init__(
+        self,
+        J,
+        K: float = 0.1,
+        dt: float = 1e-2,
+        replicas = None,
+        method: str = "rk4",
+        rtol: float = 1e-6,
+        atol: float = 1e-8,
+        rng = None,
+    ):
+
+        """
+        A batch of oscillator networks sharing the couplings J, a dense array or a Sparse_Ising.
+
+        replicas is an int or a tuple giving the batch shape. method is "euler", as in the notebook, "rk4" or the
+        adaptive "rk45", which keeps the error of every step within rtol and atol of the phases of all replicas. rng
+        is a np.random.Generator or a seed for the initial phases.
+        """
+
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+
+        if isinstance(J, Sparse_Ising):
+            self.size = J.size
+            self._matvec = lambda x: J._segment_sum(J.data * x[..., J.indices], J.indptr)
+        else:
+            J = np.asarray(J, dtype=float)
+            self.size = len(J)
+            self._matvec = lambda x: x @ J
+
+        self.J = J
+        self.K = K
+        self.dt = dt
+        self.method = method
+        self.rtol = rtol
+        self.atol = atol
+
+        self.batch_shape = () if replicas is None else tuple(np.atleast_1d(replicas))
+        self.rng = np.random.default_rng(rng)
+
+        self.clamped = np.zeros(self.size, dtype=bool)
+        self.randomize()
+
+    def randomize(self, low: float = 0.0, high: float = np.pi):
+
+        # Draws the phases of the free oscillators uniformly, as in the notebook
+        theta = self.rng.uniform(low, high, self.batch_shape + (self.size,))
+        self.theta = theta if not np.any(self.clamped) else np.where(self.clamped, self.theta, theta)
+        self.t = 0.0
+
+    def clamp(self, idx, phase):
+
+        """
+        Holds the oscillators at idx at the given phases, which broadcast over the batch, eg. one input combination
+        per replica. Use bin2phase for logic values.
+        """
+
+        self.clamped = np.broadcast_to(self.clamped, self.theta.shape).copy()
+        self.clamped[..., idx] = True
+        self.theta[..., idx] = phase
+
+    def unclamp(self, idx = slice(None)):
+
+        self.clamped = np.broadcast_to(self.clamped, self.theta.shape).copy()
+        self.clamped[..., idx] = False
+
+    def derivative(self, theta: np.array) -> np.array:
+
+        s, c = np.sin(theta), np.cos(theta)
+        dtheta = -self.K * (s * self._matvec(c) - c * self._matvec(s))
+
+        dtheta[np.broadcast_to(self.clamped, theta.shape)] = 0
+
+        return dtheta
+
+    def energy(self, theta: np.array = None) -> np.array:
+
+        # Lyapunov function of every replica
+        theta = self.theta if theta is None else theta
+        s, c = np.sin(theta), np.cos(theta)
+
+        return -self.K * np.sum(c * self._matvec(c) + s * self._matvec(s), axis=-1)
+
+    def spins(self) -> np.array:
+        return phase2spin(self.theta)
+
+    def step(self):
+
+        """
+        Advances every replica by one step of the selected method.
+        """
+
+        f, theta, dt = self.derivative, self.theta, self.dt
+
+        if self.method == "euler":
+            self.theta = theta + dt * f(theta)
+
+        elif self.method == "rk4":
+            k1 = f(theta)
+            k2 = f(theta + 0.5 * dt * k1)
+            k3 = f(theta + 0.5 * dt * k2)
+            k4 = f(theta + dt * k3)
+            self.theta = theta + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+        else:
+            self._adaptive_step()
+            return
+
+        self.t += dt
+
+    def _adaptive_step(self):
+
+        # Retry with smaller steps until the embedded error estimate is within tolerance
+        while True:
+            dt = self.dt
+            k = [self.derivative(self.theta)]
+            for a in _DP_A[1:]:
+                k.append(self.derivative(self.theta + dt * sum(c * ki for c, ki in zip(a, k) if c)))
+
+            # The 7th stage is evaluated at the 5th order solution
+            new = self.theta + dt * sum(c * ki for c, ki in zip(_DP_A[-1], k) if c)
+            error = dt * sum(c * ki for c, ki in zip(_DP_E, k) if c)
+            scale = self.atol + self.rtol * np.maximum(np.abs(self.theta), np.abs(new))
+            norm = np.sqrt(np.mean((error / scale) ** 2))
+
+            factor = 0.9 * norm ** -0.2 if norm > 0 else 5.0
+            self.dt = dt * min(5.0, max(0.2, factor))
+
+            if norm <= 1.0:
+                self.theta = new
+                self.t += dt
+                return
+
+    def run(self, steps: int, record_every: int = 0, out: np.array = None, recorder = None):
+
+        """
+        Runs steps steps, recording the phases every record_every steps into out, a preallocated array, or a memory
+        map, of shape (steps // record_every,) + theta.shape, which is allocated as float32 when not given.
+
+        With a recorder, a Sample_Recorder of shape theta.shape, the rounded spins of every record are streamed to it
+        instead, and the phases are only kept if out is given.
+
+        Returns the times of the records and the records, or the times and None when only the recorder keeps them.
+        """
+
+        records = steps // record_every if record_every else 0
+
+        if out is None and recorder is None:
+            out = np.empty((records,) + self.theta.shape, dtype=np.float32)
+        elif out is not None and len(out) < records:
+            raise ValueError(f"out holds {len(out)} records, {records} are needed")
+
+        times = np.empty(records)
+
+        for i in range(steps):
+            self.step()
+
+            if record_every and (i + 1) % record_every == 0:
+                r = (i + 1) // record_every - 1
+                times[r] = self.t
+                if out is not None:
+                    out[r] = self.theta
+                if recorder is not None:
+                    recorder.record(self.spins())
+
+        return times, None if out is None else out[:records]
@@ -0,0 +1,149 @@
+"""
+This module packages the p-bit network from the invertible logic notebook as an array-backed engine.
+
+In the notebook every p-bit is sampled and then all activations are refreshed at once from J @ sample + h, which
+is not a proper Gibbs update: p-bits that are coupled to each other flip simultaneously. Here a graph coloring of J
+is computed once, so that no two p-bits of the same color are coupled. Each color class is then updated as a single
+vectorized block from the current state of the others, which is how p-computer hardware clocks its p-bits and gives
+sequential Gibbs semantics at close to full-array throughput.
+
+The p-bits themselves live in a pbits array rather than one Python object per p-bit: spins are int8, activations
+are floats and clamping is a boolean mask, so sampling a set of p-bits is one vectorized sgn(tanh(I) + U).
+
+Attributes:
+    J (numpy.array): Symmetric coupling matrix.
+    h (numpy.array): Biases.
+    colors (list): Index arrays of the p-bits in each color class.
+    pbits (pbits): Spins, activations and clamps of the network, with a leading replica axis when batched.
+"""
+
+import numpy as np
+
+from random_buffer import Uniform_Buffer
+
+
+def greedy_coloring(J: np.array) -> list:
+
+    """
+    Colors the coupling graph of J greedily, largest degree first, and returns the index array of each color.
+    """
+
+    adjacency = (J != 0) | (J.T != 0)
+    np.fill_diagonal(adjacency, False)
+
+    colors = -np.ones(len(J), dtype=int)
+
+    for i in np.argsort(-np.sum(adjacency, axis=1), kind="stable"):
+
+        # Smallest color not taken by a neighbor
+        taken = np.zeros(len(J) + 1, dtype=bool)
+        taken[colors[adjacency[i] & (colors >= 0)]] = True
+        colors[i] = np.argmin(taken)
+
+    return [np.nonzero(colors == c)[0] for c in range(colors.max() + 1)]
+
+
+class pbits:
+    def __init__(self, size: int, replicas: int = None, rng = None):
+
+        self.size = size
+        self.batch_shape = () if replicas is None else (replicas,)
+
+        # Uniform numbers in [-1, +1) for sampling, drawn from the p-bits' own generator
+        self.uniforms = Uniform_Buffer(rng, -1.0, +1.0)
+        self.rng = self.uniforms.rng
+
+        self.states = self.rng.choice(np.array([-1, +1], dtype=np.int8), size=self.batch_shape + (size,))
+        self.activations = np.zeros(self.batch_shape + (size,))
+
+        # Clamped p-bits always sample to their clamp value
+        self.clamped = np.zeros(size, dtype=bool)
+        self.clamp_values = np.zeros(size, dtype=np.int8)
+
+    def clamp(self, idx, value):
+
+        self.clamped[idx] = True
+        self.clamp_values[idx] = value
+        self.states[..., idx] = value
+
+    def unclamp(self, idx):
+
+        self.clamped[idx] = False
+
+    def sample(self, idx = slice(None)):
+
+        """
+        Samples the p-bits at idx from their activations, leaving clamped p-bits at their clamp value.
+        """
+
+        I = self.activations[..., idx]
+        r = self.uniforms.draw(I.shape)
+
+        self.states[..., idx] = np.where(
+            self.clamped[idx],
+            self.clamp_values[idx],
+            np.where(r + np.tanh(I) > 0, 1, -1),
+        )
+
+        return self.states[..., idx]
+
+
+class pbit_network:
+    def __init__(self, J: np.array, h: np.array, replicas: int = None, rng = None):
+
+        self.J = np.asarray(J, dtype=np.float64)
+        self.h = np.asarray(h, dtype=np.float64).reshape(-1)
+        self.size = len(self.h)
+
+        # replicas is the number of independent networks sampled together
+        self.replicas = replicas
+        self.batch_shape = () if replicas is None else (replicas,)
+
+        # Color the network once and cache the rows of J for every color class
+        self.colors = greedy_coloring(self.J)
+        self.J_colors = [self.J[block] for block in self.colors]
+
+        self.pbits = pbits(self.size, replicas, rng)
+
+    def step(self, dt = 1):
+
+        """
+        One Gibbs sweep: every color class in turn samples from the local fields of the current state.
+        """
+
+        for block, J_block in zip(self.colors, self.J_colors):
+
+            self.pbits.activations[..., block] = (self.pbits.states @ J_block.T + self.h[block]) * dt
+            self.pbits.sample(block)
+
+    def run(self, sweeps: int, recorder = None, dt = 1):
+
+        """
+        Runs sweeps Gibbs sweeps, recording the states after every one of them to recorder, a Sample_Recorder of
+        shape batch_shape + (size,), when given.
+        """
+
+        for _ in range(sweeps):
+            self.step(dt)
+            if recorder is not None:
+                recorder.record(self.pbits.states)
+
+    def clamp(self, idx, value):
+        self.pbits.clamp(idx, value)
+
+    def unclamp(self, idx):
+        self.pbits.unclamp(idx)
+
+    def sample(self):
+        return self.pbits.states.copy()
+
+
+class AND(pbit_network):
+
+    def __init__(self, replicas: int = None, rng = None):
+
+        # Note in this format we take the first two pbits to be inputs A,B
+        # and the final pbit to be the output C = AND(A,B)
+        J = np.array([[0, -1, 2], [-1, 0, 2], [2, 2, 0]])
+        h = np.array([1, 1, -2])
+        super().__init__(J, h, replicas, rng)
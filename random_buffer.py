@@ -0,0 +1,126 @@
+"""
+Buffered uniform random numbers for the p-bit samplers.
+
+Every sampler needs a fresh uniform number per p-bit per step. Rather than asking the generator for a handful of small
+arrays each step, a Uniform_Buffer fills one large block at a time from a np.random.Generator and hands out consecutive
+chunks of it, refilling only once the block is used up. The chunks are views into the block, and every refill draws
+into a newly allocated block, so a chunk keeps its numbers even when a later draw of the same step starts a new block.
+
+Each solver owns its generator, created from the `rng` argument of its constructor: a Generator is used as is and
+anything else (None, an int or a SeedSequence) seeds a new one, so independently seeded workers never share a stream.
+
+draw_steps hands out the draws of many steps at once for compiled loops, exactly as step by step draws would, and
+undraw gives back those of the steps a loop did not get to.
+
+get_state and set_state capture the generator together with the position in the current block, for checkpoints.
+"""
+
+import math
+
+import numpy as np
+
+# Default number of values per block, ie. 512 kB of float64
+BLOCK_SIZE = 2 ** 16
+
+# A block grows to hold this many of the largest draw, up to MAX_BLOCK_SIZE values
+CHUNKS_PER_BLOCK = 16
+MAX_BLOCK_SIZE = 2 ** 22
+
+
+class Uniform_Buffer:
+    def __init__(self, rng = None, low: float = 0.0, high: float = 1.0, block_size: int = BLOCK_SIZE):
+
+        self.rng = np.random.default_rng(rng)
+        self.low = low
+        self.high = high
+
+        self._block = np.empty(block_size)
+        self._position = block_size
+
+        # State of the generator before the current block was drawn, for checkpoints
+        self._block_state = None
+
+    def _refill(self, size: int):
+
+        # Grow the block if a single draw does not fit in it
+        block_size = len(self._block)
+        if size > block_size:
+            block_size = max(size, min(CHUNKS_PER_BLOCK * size, MAX_BLOCK_SIZE))
+
+        # Always a new block, chunks handed out from the old one may still be in use
+        self._block = np.empty(block_size)
+
+        self._block_state = self.rng.bit_generator.state
+        self.rng.random(out=self._block)
+
+        if self.low != 0.0 or self.high != 1.0:
+            self._block *= self.high - self.low
+            self._block += self.low
+
+        self._position = 0
+
+    def draw(self, shape) -> np.array:
+
+        """
+        Returns the next uniform numbers in [low, high) with the given shape, as a view into the current block.
+        """
+
+        size = shape if isinstance(shape, int) else math.prod(shape)
+
+        if self._position + size > len(self._block):
+            self._refill(size)
+
+        chunk = self._block[self._position : self._position + size]
+        self._position += size
+
+        return chunk.reshape(shape)
+
+    def draw_steps(self, size: int, steps: int) -> np.array:
+
+        """
+        Returns up to steps consecutive draws of size numbers, as one (draws, size) view into the current block. These
+        are the numbers that as many calls of draw(size) would return: the block is refilled only when not even one
+        draw fits, and the draws stop at the end of the block, so that compiled loops follow the same stream.
+        """
+
+        if self._position + size > len(self._block):
+            self._refill(size)
+
+        steps = min(steps, (len(self._block) - self._position) // size)
+        chunk = self._block[self._position : self._position + steps * size]
+        self._position += steps * size
+
+        return chunk.reshape(steps, size)
+
+    def undraw(self, size: int):
+
+        # Hands back the last size numbers of the current block, eg. the draws of the steps a loop did not get to
+        if size > self._position:
+            raise ValueError(f"can not hand back {size} numbers, only {self._position} were drawn from this block")
+
+        self._position -= size
+
+    def get_state(self, prefix: str = "uniforms/") -> dict:
+
+        """
+        The state of the generator and of the current block, as a flat dict for checkpoint.save. The block is not
+        stored but drawn again from the state the generator had when it was filled.
+        """
+
+        return {
+            prefix + "rng": self.rng.bit_generator.state,
+            prefix + "block_rng": self._block_state,
+            prefix + "block_size": len(self._block),
+            prefix + "position": self._position,
+        }
+
+    def set_state(self, state: dict, prefix: str = "uniforms/"):
+
+        self._block = np.empty(state[prefix + "block_size"])
+
+        if state[prefix + "block_rng"] is not None:
+            self.rng.bit_generator.state = state[prefix + "block_rng"]
+            self._refill(len(self._block))
+
+        self.rng.bit_generator.state = state[prefix + "rng"]
+        self._position = state[prefix + "position"]
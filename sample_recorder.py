@@ -0,0 +1,209 @@
+"""
+Bit-packed, memory-mapped recording of spin samples.
+
+Collecting samples as lists of arrays keeps every sample in memory as 8 bytes or more per spin. A Sample_Recorder
+instead streams them into a preallocated file at one bit per spin: samples are gathered into a fixed-size chunk,
+packed with np.packbits once the chunk is full and copied into a memory map of the file, which grows by doubling when
+it runs out of room. A Sample_Reader maps the same file read-only and unpacks it one chunk at a time, so billions of
+samples can be analysed offline without ever holding them in RAM.
+
+A sample is any array of spins, eg. the (replicas, n) states of a batched p-bit network, and every sample of a file
+has the same shape. Spins above zero are stored as 1 and the rest as 0, so -1/+1 spins, 0/1 bits and the continuous
+p-bits of the deterministic Onizawa mode all record as their sign. Readers return int8 spins of -1/+1.
+
+The packed bits are a raw (samples, bytes per sample) uint8 array, with the sample shape, the number of samples and
+the chunk size in a JSON file next to it, at path + ".json".
+
+Usage:
+    with Sample_Recorder("and.bits", (3,)) as recorder:
+        network.run(10 ** 6, recorder)
+
+    for chunk in Sample_Reader("and.bits"):
+        ...
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+# Default number of samples per chunk
+CHUNK_SIZE = 4096
+
+
+def _meta_path(path: str) -> str:
+    return path + ".json"
+
+
+class Sample_Recorder:
+    def __init__(self, path: str, shape, capacity: int = 2 ** 20, chunk_size: int = CHUNK_SIZE):
+
+        """
+        Creates, or overwrites, the file at path for samples of the given shape, with room for capacity samples
+        before it first has to grow.
+        """
+
+        self.path = path
+        self.shape = (int(shape),) if isinstance(shape, (int, np.integer)) else tuple(shape)
+        self.size = math.prod(self.shape)
+        self.bytes = -(-self.size // 8)
+        self.chunk_size = chunk_size
+
+        # Samples are gathered unpacked, then packed and written a whole chunk at a time
+        self._chunk = np.zeros((chunk_size, self.size), dtype=bool)
+        self._position = 0
+        self.count = 0
+
+        self.capacity = max(capacity, chunk_size)
+        self._map = np.memmap(path, dtype=np.uint8, mode="w+", shape=(self.capacity, self.bytes))
+        self._write_meta()
+
+    def record(self, samples: np.array):
+
+        """
+        Records one sample of the recorder's shape, or a stack of them along a leading axis.
+        """
+
+        samples = np.asarray(samples)
+        if samples.shape == self.shape:
+            samples = samples[np.newaxis]
+        elif samples.shape[1:] != self.shape:
+            raise ValueError(f"samples of shape {samples.shape} do not match the sample shape {self.shape}")
+
+        samples = samples.reshape(len(samples), self.size) > 0
+
+        while len(samples):
+            take = min(len(samples), self.chunk_size - self._position)
+            self._chunk[self._position : self._position + take] = samples[:take]
+            self._position += take
+            samples = samples[take:]
+
+            if self._position == self.chunk_size:
+                self._write_chunk()
+
+    def _write_chunk(self):
+
+        if self.count + self._position > self.capacity:
+            self._grow(self.count + self._position)
+
+        packed = np.packbits(self._chunk[: self._position], axis=1, bitorder="little")
+        self._map[self.count : self.count + self._position] = packed
+
+        self.count += self._position
+        self._position = 0
+
+    def _grow(self, needed: int):
+
+        # Double the file until the samples fit, then map it again
+        while self.capacity < needed:
+            self.capacity *= 2
+
+        self._map.flush()
+        del self._map
+        with open(self.path, "r+b") as f:
+            f.truncate(self.capacity * self.bytes)
+        self._map = np.memmap(self.path, dtype=np.uint8, mode="r+", shape=(self.capacity, self.bytes))
+
+    def _write_meta(self):
+
+        meta = {"shape": list(self.shape), "count": self.count, "chunk_size": self.chunk_size}
+
+        # Write then rename, so that a reader never sees a partial file
+        temp = f"{_meta_path(self.path)}.{os.getpid()}.tmp"
+        with open(temp, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp, _meta_path(self.path))
+
+    def flush(self):
+
+        """
+        Writes out the partial chunk and the sample count, after which a Sample_Reader sees every sample so far.
+        """
+
+        if self._map is None:
+            return
+
+        if self._position:
+            self._write_chunk()
+
+        self._map.flush()
+        self._write_meta()
+
+    def close(self):
+
+        # Drop the unused end of the file, closing twice does nothing
+        if self._map is None:
+            return
+
+        self.flush()
+        self._map = None
+        with open(self.path, "r+b") as f:
+            f.truncate(self.count * self.bytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Sample_Reader:
+    def __init__(self, path: str, chunk_size: int = None):
+
+        """
+        Maps a recorded file read-only. Iterating over the reader yields the samples chunk by chunk, as int8 arrays
+        of shape (samples in the chunk,) + shape, defaulting to the chunk size they were recorded with.
+        """
+
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.shape = tuple(meta["shape"])
+        self.size = math.prod(self.shape)
+        self.count = meta["count"]
+        self.chunk_size = chunk_size or meta["chunk_size"]
+
+        # Empty files can not be mapped
+        bytes_per_sample = -(-self.size // 8)
+        self.packed = (
+            np.memmap(path, dtype=np.uint8, mode="r", shape=(self.count, bytes_per_sample))
+            if self.count else np.zeros((0, bytes_per_sample), dtype=np.uint8)
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _unpack(self, packed: np.array) -> np.array:
+
+        bits = np.unpackbits(packed, axis=1, count=self.size, bitorder="little")
+        return (2 * bits.astype(np.int8) - 1).reshape((len(packed),) + self.shape)
+
+    def __getitem__(self, idx) -> np.array:
+
+        # Samples idx, a slice or an index array, unpacked
+        if isinstance(idx, (int, np.integer)):
+            return self._unpack(self.packed[[idx]])[0]
+
+        return self._unpack(self.packed[idx])
+
+    def chunks(self, start: int = 0, stop: int = None):
+
+        # Unpacks the samples start to stop lazily, one chunk at a time
+        stop = self.count if stop is None else min(stop, self.count)
+
+        for first in range(start, stop, self.chunk_size):
+            yield self._unpack(self.packed[first : min(first + self.chunk_size, stop)])
+
+    def __iter__(self):
+        return self.chunks()
+
+    def mean(self) -> np.array:
+
+        # Mean spin of every site over all samples, in one streaming pass
+        total = np.zeros(self.shape)
+        for chunk in self:
+            total += chunk.sum(axis=0)
+
+        return total / max(self.count, 1)
@@ -0,0 +1,67 @@
+"""
+Seeded semiprime generation for benchmarking the p-multipliers.
+
+This is the Miller-Rabin generator from the JK test notebook, drawing from a random.Random instance so that every
+bit width and trial maps to a reproducible factorization target.
+"""
+
+import random
+
+
+def miller_rabin(n, k, rng = random): # number of tests to run
+    if n == 2 or n == 3:
+        return True
+
+    if n <= 1 or n % 2 == 0:
+        return False
+
+    # write n-1 as 2^r * d
+    r, d = 0, n - 1
+    while d % 2 == 0:
+        r += 1
+        d //= 2
+
+    # witness loop
+    for _ in range(k):
+        a = rng.randrange(2, n - 1)
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def generate_large_prime(n_bits, k=10, rng = random, balanced = True):
+    while True:
+        p = rng.getrandbits(n_bits)
+        # Setting the top bit keeps both factors the full n_bits wide
+        if balanced:
+            p |= 1 << (n_bits - 1)
+        if miller_rabin(p, k, rng):
+            return p
+
+
+def generate_semiprime(N, seed = None, balanced = True):
+
+    """
+    Returns (prime1, prime2, semiprime) with two distinct N//2-bit primes whose product is less than 2**N.
+    """
+
+    rng = random.Random(seed)
+
+    while True:
+
+        # Generate two large primes
+        prime1 = generate_large_prime(N//2, rng=rng, balanced=balanced)
+        prime2 = generate_large_prime(N//2, rng=rng, balanced=balanced)
+
+        # Test if:
+        # 1. They are not equal
+        # 2. Their product is less than 2^N
+        if prime1 != prime2 and prime1 * prime2 < 2 ** N:
+            return prime1, prime2, prime1 * prime2
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import benchmark
+
+
+@pytest.mark.parametrize("engine", ["jk", "onizawa_stochastic"])
+def test_trials_solve_small_semiprimes(engine):
+
+    result = benchmark.run_trial(engine, 143, 2000, seed=0)
+    assert result["solved"] and 1 <= result["sweeps"] <= 2000
+
+
+def test_onizawa_trials_run_replicas():
+
+    # A sweep advances every replica and any of them solves the trial, where a single chain solves none of these
+    solved = [benchmark.run_trial("onizawa_stochastic", 35 * 37, 2000, seed)["solved"] for seed in range(4)]
+    assert all(solved)
+
+
+def test_unknown_engine():
+
+    with pytest.raises(ValueError):
+        benchmark.run_trial("annealer", 143, 10, seed=0)
+
+
+def test_summarize():
+
+    runs = [
+        {"solved": True, "sweeps": 10, "seconds": 1.0},
+        {"solved": True, "sweeps": 30, "seconds": 3.0},
+        {"solved": False, "sweeps": 100, "seconds": 8.0},
+        {"solved": False, "sweeps": 100, "seconds": 8.0},
+    ]
+    summary = benchmark.summarize(runs)
+
+    assert summary["success_probability"] == 0.5
+    assert summary["sweeps_per_second"] == 240 / 20
+    assert summary["median_sweeps"] == 20 and summary["median_seconds"] == 2.0
+    np.testing.assert_allclose(summary["tts99_seconds"], 5.0 * np.log(0.01) / np.log(0.5))
+
+    assert "median_seconds" not in benchmark.summarize(runs[2:])
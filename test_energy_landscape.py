@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from energy_landscape import energy_blocks, is_valid_gate, verify
+from gate_synthesis import AND, OR, spin_states
+
+# The AND gate of Camsari et al., inputs A, B then output C
+AND_J = np.array([[0, -1, 2], [-1, 0, 2], [2, 2, 0]])
+AND_H = np.array([1, 1, -2])
+
+
+def _random_gate(n, seed):
+
+    rng = np.random.default_rng(seed)
+    J = np.triu(rng.integers(-3, 4, size=(n, n)), 1)
+    return J + J.T, rng.integers(-3, 4, size=n)
+
+
+def _brute_force(J, h, T):
+
+    # Every state and every single flip one at a time, H(m) = - h.m - m.J.m / 2
+    n = len(h)
+    states = spin_states(n).astype(float)
+    energy = lambda s: -s @ h - 0.5 * s @ J @ s
+
+    energies = np.array([energy(s) for s in states])
+    flipped = np.array([[energy(s * np.where(np.arange(n) == i, -1, 1)) for i in range(n)] for s in states])
+
+    weights = np.exp(-(energies - energies.min()) / T)
+    return energies, np.all(flipped >= energies[:, None], axis=1), weights / weights.sum(), states
+
+
+def test_blocks_cover_every_state():
+
+    J, h = _random_gate(7, 0)
+    blocks = list(energy_blocks(J, h, chunk_size=24))
+
+    assert [start for start, *_ in blocks] == list(range(0, 128, 24))
+    energies = np.concatenate([e for _, _, e, _ in blocks])
+    np.testing.assert_allclose(energies, _brute_force(J, h, 1.0)[0])
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("chunk_size", [3, 16, 2 ** 16])
+def test_landscape_matches_brute_force(seed, chunk_size):
+
+    J, h = _random_gate(8, seed)
+    energies, local, p, states = _brute_force(J, h, 1.5)
+    report = verify(J, h, T=1.5, chunk_size=chunk_size, max_minima=5)
+
+    ground = energies.min()
+    levels = np.unique(energies)
+    spurious = np.nonzero(local & (energies > ground + 1e-9))[0]
+
+    assert report["ground_energy"] == ground
+    np.testing.assert_array_equal(np.sort(report["ground_states"]), np.nonzero(energies == ground)[0])
+    assert report["gap"] == (levels[1] - ground if len(levels) > 1 else np.inf)
+    assert report["spurious_minima"] == len(spurious)
+    assert [e for _, e in report["lowest_spurious_minima"]] == sorted(energies[spurious])[:5]
+    np.testing.assert_allclose(report["marginals"], p @ (states > 0))
+
+
+def test_the_and_gate_is_valid():
+
+    report = verify(AND_J, AND_H, AND(), T=1.0)
+
+    assert report["correct"] and report["degeneracy"] == 4
+    assert len(report["missing_states"]) == len(report["invalid_ground_states"]) == 0
+    assert report["valid_gap"] == 4 and report["spurious_minima"] == 0
+
+    # The exact probability of sampling a valid state at T = 1
+    energies = -spin_states(3) @ AND_H - 0.5 * np.einsum("si,ij,sj->s", spin_states(3), AND_J, spin_states(3))
+    weights = np.exp(-energies)
+    assert report["p_valid"] == pytest.approx(weights[AND()].sum() / weights.sum())
+
+    assert is_valid_gate(AND_J, AND_H, AND())
+    assert is_valid_gate(AND_J, AND_H, AND(), gap=4) and not is_valid_gate(AND_J, AND_H, AND(), gap=5)
+
+
+def test_broken_gates_fail():
+
+    # Without the bias on C, 1 AND 1 is left as the only ground state and the other valid states are missing
+    report = verify(AND_J, AND_H * [1, 1, 0], AND(), T=None)
+    assert not report["correct"] and list(report["ground_states"]) == [7]
+    assert list(report["missing_states"]) == [0, 2, 4] and len(report["invalid_ground_states"]) == 0
+    assert not is_valid_gate(AND_J, AND_H * [1, 1, 0], AND())
+
+    # A correct AND is not an OR, 0 OR 1 is missing and 0 AND 1 is an invalid ground state
+    report = verify(AND_J, AND_H, OR(), T=None)
+    assert not report["correct"] and len(report["missing_states"]) == len(report["invalid_ground_states"]) == 2
+
+
+def test_auxiliary_pbits_are_marginalized():
+
+    # A spare p-bit coupled to nothing doubles every state but changes neither validity nor p_valid
+    J, h = np.zeros((4, 4)), np.append(AND_H, 0)
+    J[:3, :3] = AND_J
+
+    report = verify(J, h, AND(), T=1.0, chunk_size=4)
+    assert report["correct"] and report["degeneracy"] == 8
+    assert report["p_valid"] == pytest.approx(verify(AND_J, AND_H, AND())["p_valid"])
+
+
+def test_bad_inputs():
+
+    with pytest.raises(ValueError):
+        verify(np.ones((3, 3)), np.zeros(3))
+    with pytest.raises(ValueError):
+        verify(np.array([[0, 1], [0, 0]]), np.zeros(2))
+    with pytest.raises(ValueError):
+        verify(AND_J, AND_H, np.ones(16, dtype=bool))
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+import factor
+
+
+def test_portfolio_spreads_settings():
+
+    configs = factor.portfolio(8, ("jk", "onizawa"), seed=0)
+
+    assert [c["engine"] for c in configs] == ["jk", "onizawa"] * 4
+    assert len({c["seed"] for c in configs}) == 8
+    assert len({c["schedule"] for c in configs if c["engine"] == "jk"}) == 4
+    assert len({c["pseudotemperature"] for c in configs if c["engine"] == "onizawa"}) == 4
+
+
+@pytest.mark.parametrize("engine", ["jk", "onizawa", "tempering"])
+def test_solve(engine):
+
+    config = factor.portfolio(1, (engine,), seed=0)[0]
+    result = factor.solve(143, config, max_iterations=20000)
+
+    assert result is not None and result["factor"] * result["cofactor"] == 143
+    assert result["factor"] in (11, 13)
+
+
+def test_solve_gives_up():
+
+    config = factor.portfolio(1, ("onizawa",), seed=0)[0]
+    assert factor.solve(251 * 241, config, max_iterations=3) is None
+
+
+def test_factor_returns_a_factor():
+
+    result = factor.factor(35 * 37, workers=2, engines=("jk",), seed=0, timeout=60)
+
+    assert result is not None and 1 < result["factor"] < 35 * 37
+    assert result["factor"] * result["cofactor"] == 35 * 37
+
+
+def _failing_solve(*args):
+    raise RuntimeError("solver failed")
+
+
+def _dying_solve(*args):
+    os._exit(1)
+
+
+def test_factor_reports_failed_workers(monkeypatch):
+
+    # Workers fork with the patched solve
+    monkeypatch.setattr(factor, "solve", _failing_solve)
+
+    with pytest.warns(UserWarning, match="solver failed"):
+        assert factor.factor(143, workers=2, engines=("jk",), seed=0) is None
+
+
+def test_factor_stops_waiting_for_dead_workers(monkeypatch):
+
+    # Workers that die without reporting back must not leave factor waiting forever
+    monkeypatch.setattr(factor, "solve", _dying_solve)
+    assert factor.factor(143, workers=2, engines=("jk",), seed=0) is None
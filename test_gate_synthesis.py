@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import gate_synthesis
+from energy_landscape import is_valid_gate
+from gate_synthesis import AND, XOR, counter, full_adder, half_adder, spin_states, synthesize, synthesize_all
+
+pytest.importorskip("pulp")
+
+
+def test_spin_states_spell_their_index():
+
+    states = spin_states(3)
+    assert states.shape == (8, 3) and states.dtype == np.int8
+    np.testing.assert_array_equal(states[0], [-1, -1, -1])
+    np.testing.assert_array_equal(states[6], [1, 1, -1])
+
+
+def test_truth_tables():
+
+    bits = spin_states(5) > 0
+    valid = full_adder()
+
+    # A, B, Cin then S, Cout, least significant first
+    total = bits[:, :3].sum(axis=1)
+    np.testing.assert_array_equal(valid, (bits[:, 3] == total % 2) & (bits[:, 4] == total // 2))
+    assert np.count_nonzero(AND()) == 4 and np.count_nonzero(half_adder()) == 4
+    assert len(counter(3)) == 2 ** 5 and np.count_nonzero(counter(3)) == 8
+
+
+@pytest.mark.parametrize("valid", [AND(), half_adder(), full_adder(), counter(3)], ids=["AND", "HA", "FA", "counter3"])
+def test_synthesized_gates_are_valid(valid):
+
+    result = synthesize(valid)
+    assert result["status"] == "Optimal"
+    assert np.all(np.abs(result["J"]) <= 100) and np.all(result["J"] == result["J"].T)
+    assert is_valid_gate(result["J"], result["h"], valid)
+
+
+def test_xor_needs_an_auxiliary_pbit():
+
+    assert synthesize(XOR())["status"] == "Infeasible"
+
+    result = synthesize(XOR(), aux=1)
+    assert result["status"] == "Optimal" and len(result["h"]) == 4
+    assert is_valid_gate(result["J"], result["h"], XOR())
+
+
+def test_gates_are_solved_once(tmp_path, monkeypatch):
+
+    gates = {"AND": AND(), "HA": half_adder(), "XOR": (XOR(), 1)}
+    first = synthesize_all(gates, cache_dir=str(tmp_path), processes=2)
+    assert len(list(tmp_path.iterdir())) == 3
+
+    # Every gate now loads from the cache, solving again would fail
+    def solve(*args, **kwargs):
+        raise AssertionError("solved a cached gate")
+
+    monkeypatch.setattr(gate_synthesis, "synthesize", solve)
+    second = synthesize_all(gates, cache_dir=str(tmp_path))
+
+    assert list(second) == list(gates)
+    for name in gates:
+        np.testing.assert_array_equal(second[name]["J"], first[name]["J"])
+        np.testing.assert_array_equal(second[name]["h"], first[name]["h"])
+
+    assert gate_synthesis.gate(AND(), cache_dir=str(tmp_path))["status"] == "Optimal"
+
+
+def test_cache_key_depends_on_the_settings():
+
+    keys = {
+        gate_synthesis.cache_key(AND()),
+        gate_synthesis.cache_key(AND(), aux=1),
+        gate_synthesis.cache_key(AND(), gap=2),
+        gate_synthesis.cache_key(gate_synthesis.OR()),
+    }
+    assert len(keys) == 4
+
+
+def test_bad_truth_tables():
+
+    with pytest.raises(ValueError):
+        synthesize(np.ones(6, dtype=bool))
+    with pytest.raises(ValueError):
+        synthesize(np.zeros(8, dtype=bool))
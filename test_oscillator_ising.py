@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from oscillator_ising import Kuramoto_Ising, augment, bin2phase, block_diagonal, phase2spin
+from sparse_ising import Sparse_Ising
+
+# The AND gate of Camsari et al., inputs A, B then output C
+AND_J = np.array([[0, -1, 2], [-1, 0, 2], [2, 2, 0]])
+AND_H = np.array([1, 1, -2])
+
+
+def _random_couplings(size, seed):
+
+    rng = np.random.default_rng(seed)
+    J = np.triu(rng.normal(size=(size, size)) * (rng.random((size, size)) < 0.3), 1)
+    return J + J.T
+
+
+def test_derivative_is_the_kuramoto_model():
+
+    # Against the (n, n) matrix of sin(theta_i - theta_j)
+    J = _random_couplings(10, 0)
+    machine = Kuramoto_Ising(J, K=0.3, replicas=4, rng=1)
+    theta = machine.theta
+
+    expected = -0.3 * np.sum(J * np.sin(theta[:, :, None] - theta[:, None, :]), axis=-1)
+    np.testing.assert_allclose(machine.derivative(theta), expected, atol=1e-12)
+
+    energy = -0.3 * np.sum(J * np.cos(theta[:, :, None] - theta[:, None, :]), axis=(1, 2))
+    np.testing.assert_allclose(machine.energy(), energy)
+
+
+@pytest.mark.parametrize("method", ["euler", "rk4", "rk45"])
+def test_dense_and_sparse_trajectories_match(method):
+
+    J = _random_couplings(30, 2)
+    runs = [Kuramoto_Ising(couplings, K=0.5, replicas=(2, 3), method=method, rng=3)
+            for couplings in (J, Sparse_Ising.from_dense(J, np.zeros(30)))]
+
+    for machine in runs:
+        machine.clamp([0, 5], [0.0, np.pi])
+    records = [machine.run(60, record_every=10) for machine in runs]
+
+    np.testing.assert_allclose(records[0][0], records[1][0])
+    np.testing.assert_allclose(records[0][1], records[1][1], rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(runs[0].spins(), runs[1].spins())
+    assert records[0][1].shape == (6, 2, 3, 30)
+
+
+def test_and_gate_settles_to_its_truth_table():
+
+    # One input combination per replica row, the bias oscillator held at phase 0
+    A, B = np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1])
+    machine = Kuramoto_Ising(augment(AND_J, AND_H), K=1.0, dt=0.05, replicas=(4, 8), rng=0)
+    machine.clamp([0], bin2phase(A)[:, None, None])
+    machine.clamp([1], bin2phase(B)[:, None, None])
+    machine.clamp([3], 0.0)
+
+    clamped = machine.theta[..., [0, 1, 3]].copy()
+    energies = [machine.energy()]
+    for _ in range(10):
+        machine.run(50)
+        energies.append(machine.energy())
+
+    # The energy never rises, the clamps hold and C is A AND B in every replica
+    assert np.all(np.diff(energies, axis=0) <= 1e-9)
+    np.testing.assert_array_equal(machine.theta[..., [0, 1, 3]], clamped)
+    np.testing.assert_array_equal(machine.spins()[..., 2], np.broadcast_to(2 * (A & B)[:, None] - 1, (4, 8)))
+
+
+def test_block_diagonal():
+
+    Js = [AND_J, _random_couplings(4, 4), Sparse_Ising.from_dense(_random_couplings(3, 5), np.zeros(3))]
+    stacked = block_diagonal(Js).to_dense()
+
+    assert stacked.shape == (10, 10)
+    np.testing.assert_array_equal(stacked[:3, :3], AND_J)
+    np.testing.assert_array_equal(stacked[3:7, 3:7], Js[1])
+    np.testing.assert_array_equal(stacked[7:, 7:], Js[2].to_dense())
+    assert np.count_nonzero(stacked) == sum(np.count_nonzero(J) for J in (AND_J, Js[1], Js[2].to_dense()))
+
+
+def test_phases_and_spins():
+
+    np.testing.assert_array_equal(bin2phase([1, 0]), [0, np.pi])
+    np.testing.assert_array_equal(phase2spin(np.array([0.1, np.pi - 0.1, -0.1, 1.5 * np.pi + 0.1])), [1, -1, 1, 1])
+
+    with pytest.raises(ValueError):
+        bin2phase([2])
+    with pytest.raises(ValueError):
+        Kuramoto_Ising(AND_J, method="midpoint")
+
+
+def test_run_checks_the_buffer():
+
+    machine = Kuramoto_Ising(AND_J, replicas=2, rng=0)
+    with pytest.raises(ValueError):
+        machine.run(10, record_every=2, out=np.empty((4, 2, 3)))
+
+    out = np.zeros((5, 2, 3))
+    times, records = machine.run(10, record_every=2, out=out)
+    assert np.shares_memory(records, out) and np.allclose(times, 0.02 * np.arange(1, 6))
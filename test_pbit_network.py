@@ -0,0 +1,114 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pbit_network import AND, greedy_coloring, pbit_network, pbits
+
+
+def _boltzmann(J, h):
+
+    # Exact distribution over every state, p(s) proportional to exp(s.J.s / 2 + h.s)
+    states = np.array(list(itertools.product([-1, 1], repeat=len(h))))
+    weights = np.exp(0.5 * np.einsum("si,ij,sj->s", states, J, states) + states @ h)
+    return states, weights / weights.sum()
+
+
+def _frequencies(network, states, sweeps):
+
+    counts = np.zeros(len(states))
+    for _ in range(sweeps):
+        network.step()
+        counts += np.all(network.sample()[:, np.newaxis] == states, axis=-1).sum(axis=0)
+
+    return counts / counts.sum()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_coloring_is_valid(seed):
+
+    rng = np.random.default_rng(seed)
+    J = np.triu(rng.normal(size=(30, 30)) * (rng.random((30, 30)) < 0.2), 1)
+    J = J + J.T
+    colors = greedy_coloring(J)
+
+    # Every p-bit has exactly one color, and no two p-bits of a color are coupled
+    assert sorted(np.concatenate(colors)) == list(range(30))
+    for block in colors:
+        assert not np.any(J[np.ix_(block, block)])
+
+
+def test_uncoupled_bits_share_a_color():
+
+    assert len(greedy_coloring(np.zeros((5, 5)))) == 1
+    assert len(greedy_coloring(np.ones((4, 4)))) == 4
+
+
+def test_gibbs_sweeps_sample_the_boltzmann_distribution():
+
+    network = AND(replicas=256, rng=0)
+    states, expected = _boltzmann(network.J, network.h)
+
+    np.testing.assert_allclose(_frequencies(network, states, 1000), expected, atol=0.02)
+
+
+def test_gibbs_sweeps_on_a_frustrated_network():
+
+    # A triangle of antiferromagnetic couplings needs three colors, the sweeps still sample the exact distribution
+    J = -0.5 * (np.ones((3, 3)) - np.eye(3))
+    h = np.array([0.3, -0.2, 0.1])
+    network = pbit_network(J, h, replicas=64, rng=1)
+    states, expected = _boltzmann(J, h)
+
+    assert len(network.colors) == 3
+    np.testing.assert_allclose(_frequencies(network, states, 500), expected, atol=0.02)
+
+
+def test_clamped_output_inverts_the_gate():
+
+    # With the output of the AND gate clamped to 1, both inputs settle at 1
+    network = AND(replicas=64, rng=2)
+    network.clamp(2, 1)
+    network.run(200)
+
+    assert np.mean(network.sample()[:, :2] == 1) > 0.9
+
+
+def test_pbits_sample_their_activations():
+
+    # Strong activations pin the p-bits to their sign, zero activations leave them at even odds
+    bits = pbits(4, replicas=2000, rng=3)
+    bits.activations[...] = [20.0, -20.0, 0.0, 0.0]
+    states = bits.sample()
+
+    assert states.dtype == np.int8 and states.shape == (2000, 4)
+    assert np.all(states[:, 0] == 1) and np.all(states[:, 1] == -1)
+    assert abs(np.mean(states[:, 2:])) < 0.05
+
+
+def test_pbits_hold_their_clamps():
+
+    bits = pbits(3, replicas=5, rng=4)
+    bits.activations[...] = -20.0
+    bits.clamp(1, 1)
+
+    # Only the sampled index is touched, and a clamped p-bit ignores its activation until it is released
+    before = bits.states.copy()
+    bits.sample([0])
+    np.testing.assert_array_equal(bits.states[:, 1:], before[:, 1:])
+
+    assert np.all(bits.sample()[:, 1] == 1)
+    bits.unclamp(1)
+    assert np.all(bits.sample()[:, 1] == -1)
+
+
+def test_networks_follow_their_seed():
+
+    runs = []
+    for _ in range(2):
+        network = AND(rng=5)
+        network.run(50)
+        runs.append(network.sample())
+
+    np.testing.assert_array_equal(runs[0], runs[1])
+    assert runs[0].shape == (3,)
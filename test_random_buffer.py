@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from random_buffer import Uniform_Buffer
+
+
+def test_chunks_survive_a_refill():
+
+    # A draw that starts a new block must not overwrite the chunks handed out before it
+    buffer = Uniform_Buffer(0, block_size=10)
+    first = buffer.draw(7)
+    kept = first.copy()
+    second = buffer.draw(5)
+
+    np.testing.assert_array_equal(first, kept)
+    assert not np.shares_memory(first, second)
+
+
+def test_draws_follow_the_generator():
+
+    # Blocks are consecutive draws of the generator, the end of a block that a chunk does not fit in is skipped
+    buffer = Uniform_Buffer(1, block_size=10)
+    reference = np.random.default_rng(1).random(30)
+
+    np.testing.assert_array_equal(buffer.draw(4), reference[:4])
+    np.testing.assert_array_equal(buffer.draw(4), reference[4:8])
+    np.testing.assert_array_equal(buffer.draw(4), reference[10:14])
+
+
+def test_large_draws_grow_the_block():
+
+    buffer = Uniform_Buffer(2, -1.0, 1.0, block_size=8)
+    chunk = buffer.draw((3, 5))
+
+    assert chunk.shape == (3, 5)
+    assert np.all((chunk >= -1.0) & (chunk < 1.0))
+    np.testing.assert_array_equal(chunk.ravel(), 2 * np.random.default_rng(2).random(15) - 1)
+
+
+def test_draw_steps_follow_single_draws():
+
+    # Steps stop at the end of a block and the next call refills it, as step by step draws would
+    steps = Uniform_Buffer(3, block_size=10)
+    single = Uniform_Buffer(3, block_size=10)
+
+    for count in (2, 5, 1, 4, 3):
+        drawn = steps.draw_steps(3, count)
+        assert 1 <= len(drawn) <= count
+        for row in drawn:
+            np.testing.assert_array_equal(row, single.draw(3))
+
+
+def test_undraw_hands_numbers_back():
+
+    buffer = Uniform_Buffer(4, block_size=12)
+    drawn = buffer.draw_steps(2, 5).copy()
+    buffer.undraw(6)
+
+    np.testing.assert_array_equal(buffer.draw(6), drawn[2:].ravel())
+    with pytest.raises(ValueError):
+        buffer.undraw(13)
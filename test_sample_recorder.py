@@ -0,0 +1,62 @@
+import numpy as np
+
+from pbit_network import AND
+from sample_recorder import Sample_Reader, Sample_Recorder
+
+
+def test_round_trip(tmp_path):
+
+    # An odd sample shape, a partial last chunk and a file that has to grow twice
+    path = str(tmp_path / "samples.bits")
+    rng = np.random.default_rng(0)
+    samples = rng.choice(np.array([-1, 1], dtype=np.int8), size=(70, 3, 5))
+
+    with Sample_Recorder(path, (3, 5), capacity=16, chunk_size=16) as recorder:
+        recorder.record(samples[0])
+        recorder.record(samples[1:45])
+        for sample in samples[45:]:
+            recorder.record(sample)
+
+    reader = Sample_Reader(path, chunk_size=32)
+    assert len(reader) == 70 and reader.shape == (3, 5)
+
+    np.testing.assert_array_equal(np.concatenate(list(reader)), samples)
+    np.testing.assert_array_equal([len(chunk) for chunk in reader], [32, 32, 6])
+    np.testing.assert_array_equal(reader[7], samples[7])
+    np.testing.assert_array_equal(reader[10:20], samples[10:20])
+    np.testing.assert_array_equal(reader[[3, 1, 4]], samples[[3, 1, 4]])
+    np.testing.assert_array_equal(np.concatenate(list(reader.chunks(5, 50))), samples[5:50])
+    np.testing.assert_allclose(reader.mean(), samples.mean(axis=0))
+
+
+def test_flush_shows_samples_to_readers(tmp_path):
+
+    # Samples of an unfinished chunk are visible once flushed, the file is trimmed when closed
+    path = str(tmp_path / "samples.bits")
+    recorder = Sample_Recorder(path, 9, chunk_size=8)
+    recorder.record(np.ones((3, 9)))
+    recorder.flush()
+    assert len(Sample_Reader(path)) == 3
+
+    recorder.record(-np.ones(9))
+    recorder.close()
+    recorder.close()
+    recorder.flush()
+
+    reader = Sample_Reader(path)
+    assert len(reader) == 4
+    np.testing.assert_array_equal(reader.mean(), np.full(9, 0.5))
+
+
+def test_network_run(tmp_path):
+
+    # A recorder passed to run() keeps the state after every sweep
+    path = str(tmp_path / "and.bits")
+    network = AND(replicas=4, rng=0)
+
+    with Sample_Recorder(path, network.batch_shape + (network.size,), chunk_size=16) as recorder:
+        network.run(50, recorder)
+
+    reader = Sample_Reader(path)
+    assert len(reader) == 50
+    np.testing.assert_array_equal(reader[49], network.sample())